@@ -1,7 +1,9 @@
 import logging
 import os
 from financial_package.postgres_utils import  DataExporter
-from config import DB_CONFIG, TICKERS, SAVE_EXCEL, EMAIL_CONFIG
+from financial_package.db_pool import ConnectionPool
+from config import (DB_CONFIG, TICKERS, SAVE_EXCEL, EMAIL_CONFIG, DB_POOL_SIZE, DB_LAYOUT, EXPORT_FORMATS,
+                    EXPORT_MAX_ATTACHMENT_MB)
 import smtplib
 from email.message import EmailMessage
 
@@ -45,24 +47,32 @@ def send_email_with_attachment(subject: str, body: str, filename: str):
 def main():
     logging.info("Starting the intraday data export process.")
 
-    exporter = DataExporter(
-        dbname=DB_CONFIG["dbname"],
-        user=DB_CONFIG["user"],
-        password=DB_CONFIG["password"],
-        host=DB_CONFIG["host"],
-        port=DB_CONFIG["port"],
-        save_path=SAVE_EXCEL
-    )
-    exporter.connect()
-    exporter.export_all_tables(TICKERS)
-    exporter.close()
-    logging.info("Intraday data export completed.")
+    with ConnectionPool(**DB_CONFIG, size=DB_POOL_SIZE) as pool:
+        exporter = DataExporter(
+            dbname=DB_CONFIG["dbname"],
+            user=DB_CONFIG["user"],
+            password=DB_CONFIG["password"],
+            host=DB_CONFIG["host"],
+            port=DB_CONFIG["port"],
+            save_path=SAVE_EXCEL,
+            pool=pool,
+            layout=DB_LAYOUT
+        )
+        # The preferred format of the recipient, unless a cheaper one is needed to fit in an email
+        try:
+            report = exporter.export_for_recipient(
+                TICKERS, "Today_Data", EXPORT_FORMATS, max_bytes=EXPORT_MAX_ATTACHMENT_MB * 1024 * 1024
+            )
+        finally:
+            # The borrowed connection goes back to the pool before it is closed
+            exporter.close()
+    logging.info(f"Intraday data export completed: {report['rows']} rows, {report['bytes']} bytes "
+                 f"in {report['seconds']:.2f}s ({report['format']}).")
 
-    excel_filepath = os.path.join(SAVE_EXCEL, "Today_Data.xlsx")
     send_email_with_attachment(
         subject="Intraday Stock Data",
-        body="Please find the attached Excel file with today's intraday stock data.",
-        filename=excel_filepath
+        body=f"Please find the attached {report['format']} file with today's intraday stock data.",
+        filename=report["path"]
     )
 
 if __name__ == "__main__":
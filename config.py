@@ -17,6 +17,99 @@ TICKERS = ['AI.PA','AIR.PA','ALO.PA','MT.AS','CS.PA','BNP.PA','EN.PA','CAP.PA','
 
 SAVE_DIRECTORY = "./financial_data_lake"
 
+# Format du datalake : "csv" (un fichier CSV par ticker) ou "columnar" (colonnes NumPy typées, lues en memory-map)
+LAKE_FORMAT = "csv"
+# Options du format, ex. {"compression": True} pour le format "columnar",
+# ou {"compact_after": 20} : nombre de segments ajoutés avant leur fusion dans le fichier principal
+LAKE_OPTIONS = {}
+
+# Nombre de tickers récupérés en parallèle
+FETCH_WORKERS = 8
+
+# Mise à jour quotidienne : nombre de tickers validés en parallèle, et nombre maximal de tickers
+# en attente entre deux étapes (récupération -> validation -> chargement)
+VALIDATE_WORKERS = 2
+PIPELINE_QUEUE_SIZE = 16
+# Nombre maximal de tickers validés ensemble, en un seul passage sur le panel (ticker, "Date")
+VALIDATE_BATCH_SIZE = 10
+
+# Fichier CSV où s'accumulent les lignes rejetées par la validation, avec le ticker et les règles enfreintes
+QUARANTINE_PATH = "./quarantine/invalid_rows.csv"
+
+# Détection d'anomalies sur les rendements logarithmiques : z-score par rapport aux `window` jours
+# précédents (au moins `min_periods`), seuil au-delà duquel la ligne est mise en quarantaine, et nombre
+# de jours consécutifs sans volume à partir duquel les lignes sont suspectes
+ANOMALY_THRESHOLDS = {"window": 60, "zscore_threshold": 8.0, "min_periods": 20, "max_zero_volume_days": 5}
+# État glissant de la détection (derniers rendements de chaque ticker), conservé entre deux mises à jour
+ANOMALY_STATE_PATH = "./quarantine/anomaly_state.json"
+
+# Features techniques précalculées pour l'entraînement des modèles, stockées dans leur propre datalake
+# (même format que LAKE_FORMAT), et fenêtres de chaque feature en jours de cotation
+FEATURE_DIRECTORY = "./feature_store"
+FEATURE_WINDOWS = {
+    "volatility": [20],
+    "sma": [20, 50],
+    "ema": [12, 26],
+    "rsi": [14],
+    "atr": [14],
+    "volume_zscore": [20],
+}
+
+# Jeu d'entraînement : fenêtres de DATASET_WINDOW jours consécutifs des features DATASET_COLUMNS,
+# écrites en fichiers .npy lus en memory-map et complétées chaque jour par la mise à jour quotidienne
+DATASET_DIRECTORY = "./datasets/windows"
+DATASET_WINDOW = 60
+DATASET_COLUMNS = ["log_return", "volatility_20", "rsi_14", "atr_14", "volume_zscore_20"]
+
+# Cache en mémoire de PriceStore (lectures tickers x période x colonnes) : taille maximale en Mo,
+# les historiques les moins récemment lus étant évincés en premier.
+# Ex. PriceStore(get_lake(LAKE_FORMAT, SAVE_DIRECTORY), max_bytes=PRICE_CACHE_MAX_MB * 1024 * 1024)
+PRICE_CACHE_MAX_MB = 256
+
+# Nombre de jours re-téléchargés avant la dernière date stockée, pour récupérer les révisions
+FETCH_OVERLAP_DAYS = 5
+
+# Détection des trous de cotation (repair_gaps.py) : jours de cotation Euronext absents du datalake
+# depuis GAP_SCAN_SINCE, fermetures exceptionnelles du marché à ajouter au calendrier (dates "AAAA-MM-JJ"),
+# écart maximal en jours entre deux plages manquantes re-téléchargées en une seule requête,
+# et rapport de complétude par ticker
+GAP_SCAN_SINCE = "2005-01-01"
+GAP_EXTRA_CLOSURES = []
+GAP_MAX_SPAN_DAYS = 31
+GAP_REPORT_PATH = "./quarantine/completeness_report.csv"
+
+# Contrôle d'intégrité nocturne (reconcile_warehouse.py) : nombre de lignes et somme de contrôle par ticker
+# et par mois, comparés entre le datalake et PostgreSQL, hors lignes mises en quarantaine ; si RECONCILE_RESYNC
+# est vrai, seuls les mois divergents sont rechargés (désactivé par défaut : rapport seul). Rapport des mois divergents
+RECONCILE_RESYNC = False
+RECONCILE_REPORT_PATH = "./quarantine/reconciliation_report.csv"
+
+# Cache local des réponses de yfinance (relances de main.py, backfills, tests)
+CACHE_DIRECTORY = "./fetch_cache"
+CACHE_MAX_SIZE_MB = 500
+
+# Limitation du débit des requêtes yfinance (requêtes/seconde) et relances en cas d'erreur transitoire (429, timeout)
+FETCH_RATE_LIMIT = 2.0
+FETCH_MAX_ATTEMPTS = 4
+FETCH_RETRY_BASE_DELAY = 2.0
+
+# Chargement PostgreSQL : nombre de tables chargées par transaction, et nombre de lignes
+# à partir duquel un DataFrame est envoyé avec COPY plutôt qu'avec des INSERT multi-lignes
+LOAD_BATCH_SIZE = 10
+COPY_MIN_ROWS = 1000
+# Nombre de lignes d'un fichier du datalake lues puis envoyées à la fois lors du chargement complet (main.py) :
+# la mémoire utilisée ne dépend ni de la longueur des historiques ni du nombre de tickers
+LOAD_CHUNK_ROWS = 50000
+
+# Pool de connexions PostgreSQL partagé par le chargement et l'export, et nombre de connexions
+# utilisées en parallèle (le pool limite le nombre de backends sollicités en même temps)
+DB_POOL_SIZE = 4
+DB_WORKERS = 4
+
+# Organisation des tables : "per_ticker" (une table stocks."<TICKER>" par ticker) ou "unified"
+# (une seule table stocks.prices de clé (ticker, "Date"), partitionnée par année et indexée sur "Date")
+DB_LAYOUT = "per_ticker"
+
 SAVE_EXCEL = "./intraday_directory"
 
 EMAIL_CONFIG = {
@@ -28,3 +121,9 @@ EMAIL_CONFIG = {
     "smtp_password": "your_password"
 }
 
+
+# Formats de la pièce jointe que le destinataire sait ouvrir, par ordre de préférence :
+# "xlsx", "csv", "csv.gz" ou "npz". Le premier format dont le fichier ne dépasse pas la taille
+# maximale (en Mo) est envoyé ; si aucun ne convient, le fichier le plus petit est envoyé.
+EXPORT_FORMATS = ["xlsx", "csv.gz"]
+EXPORT_MAX_ATTACHMENT_MB = 20
@@ -2,9 +2,22 @@ import logging
 import os
 import pandas as pd
 from financial_package.get_historical_data import CAC40HistoricalData
-from financial_package.postgres_utils import PostgresInserter, DataExporter
-from financial_package.etl import StockDataETL
-from config import DB_CONFIG, TICKERS, SAVE_DIRECTORY, SAVE_EXCEL
+from financial_package.rate_limit import AdaptiveRateLimiter, RetryPolicy
+from financial_package.postgres_utils import PostgresInserter
+from financial_package.db_pool import ConnectionPool
+from financial_package.pipeline import Pipeline, Stage
+from financial_package.etl import PanelETL, QuarantineStore
+from financial_package.anomalies import AnomalyDetector
+from financial_package.features import FeatureStore
+from financial_package.datasets import WindowDatasetBuilder
+from financial_package.price_store import invalidate_price_stores
+from financial_package.lake import get_lake
+from config import (DB_CONFIG, TICKERS, SAVE_DIRECTORY, SAVE_EXCEL, FETCH_WORKERS, FETCH_OVERLAP_DAYS,
+                    FETCH_RATE_LIMIT, FETCH_MAX_ATTEMPTS, FETCH_RETRY_BASE_DELAY, LAKE_FORMAT, LAKE_OPTIONS,
+                    LOAD_BATCH_SIZE, COPY_MIN_ROWS, DB_POOL_SIZE, DB_WORKERS, DB_LAYOUT, VALIDATE_WORKERS,
+                    PIPELINE_QUEUE_SIZE, VALIDATE_BATCH_SIZE, QUARANTINE_PATH, ANOMALY_THRESHOLDS,
+                    ANOMALY_STATE_PATH, FEATURE_DIRECTORY, FEATURE_WINDOWS,
+                    DATASET_DIRECTORY, DATASET_WINDOW, DATASET_COLUMNS)
 
 # Setup logging
 log_directory = os.path.abspath("logs")
@@ -20,45 +33,141 @@ logging.basicConfig(
     filemode='w'  # Overwrite the log file every time the script runs
 )
 
-def main():
-    logging.info("Starting the daily data update process.")
+def build_pipeline(cac40_data: CAC40HistoricalData, inserter: PostgresInserter,
+                   detector: AnomalyDetector, feature_store: FeatureStore,
+                   dataset: WindowDatasetBuilder) -> Pipeline:
+    """
+    Builds the fetch -> validate -> load -> features pipeline of the daily update.
 
-    # Création d'une instance de CAC40HistoricalData
-    cac40_data = CAC40HistoricalData(tickers_list=TICKERS, save_path=SAVE_DIRECTORY)
-    logging.info("CAC40HistoricalData instance created.")
+    The items are (ticker, last stored date) pairs. Each stage runs on its own threads, so that
+    the network waits of the fetch, the validation and the database writes overlap. The new rows
+    are screened by the detector against the rolling state of their ticker.
+    """
+    quarantine = QuarantineStore(QUARANTINE_PATH)
+    # Factors of the new splits and dividends of each ticker, applied to its stored rows by the load
+    adjustments = {}
+    # Tickers whose features are computed again over their whole re-adjusted history
+    rebuilt = set()
 
-    # Création d'une instance de PostgresInserter
-    inserter = PostgresInserter(
-        dbname=DB_CONFIG["dbname"],
-        user=DB_CONFIG["user"],
-        password=DB_CONFIG["password"],
-        host=DB_CONFIG["host"],
-        port=DB_CONFIG["port"],
-        save_path=SAVE_DIRECTORY
-    )
-    logging.info("PostgresInserter instance created.")
+    def fetch(ticker, last_date):
+        # Only the days missing since the last stored date, transient errors being retried
+        return cac40_data.call_with_retries(cac40_data.fetch_since, ticker, last_date, FETCH_OVERLAP_DAYS)
+
+    def validate(batch):
+        frames = {}
+        for ticker, data in batch:
+            if 'Date' not in data.columns:
+                logging.error(f"Column 'Date' not found in the data for ticker: {ticker}")
+                continue
+
+            # A new split or dividend re-adjusts the stored history of this ticker only
+            try:
+                factors = cac40_data.readjust_history(data, ticker)
+            except Exception as e:
+                logging.error(f"Failed to re-adjust the history of {ticker} for its corporate actions: {e}")
+                continue
+            if factors is not None:
+                adjustments[ticker] = factors
+                rebuilt.add(ticker)
+
+            # Without a saved state, the rolling statistics are rebuilt from the end of the stored history,
+            # as they are after a re-adjustment
+            if factors is not None or not detector.has_state(ticker):
+                try:
+                    detector.prime_from_lake(ticker, cac40_data.lake)
+                except Exception as e:
+                    logging.error(f"Failed to read the stored history of {ticker} for the anomaly detection: {e}")
+
+            frames[ticker] = data
+
+        # Every fetched row is kept: after an outage, all the days missed since the watermark are loaded.
+        # The tickers of the batch are validated together, the invalid and anomalous rows being quarantined.
+        panel = PanelETL.from_frames(frames, all_rows=True, quarantine=quarantine, detector=detector)
+        validated = panel.process()
+        for ticker, errors in panel.summary[panel.summary['invalid'] > 0]['errors'].items():
+            logging.error(f"Invalid rows quarantined for ticker {ticker}: {errors}")
 
-    inserter.connect()
+        # Keep the lake up to date with the validated rows only, as the load does: the quarantined
+        # rows reach neither the lake nor the features built from it
+        for ticker, rows in validated.items():
+            try:
+                cac40_data.append_data(rows, ticker)
+            except Exception as e:
+                logging.error(f"Failed to append data to the lake for ticker {ticker}: {e}")
+        return validated
 
-    # Process and insert the latest data for each ticker
-    for ticker in TICKERS:
-        data = cac40_data.fetch_data(ticker)
+    def load(batch):
+        # Merged on the "Date" key, one transaction per batch of tables: a rerun does not duplicate rows
+        batch_adjustments = {ticker: adjustments.pop(ticker) for ticker, _ in batch if ticker in adjustments}
+        loaded = inserter.call_on_pool(lambda worker, tables: worker.merge_tables(tables, batch_adjustments), dict(batch))
+        for ticker in set(batch_adjustments) - set(loaded):
+            logging.error(f"Corporate action of {ticker} not applied to the database, reload it with load_table(force=True).")
+        # The cached histories of the written tickers are read again on the next query
+        invalidate_price_stores(loaded)
+        return {ticker: True for ticker in loaded}
 
-        if 'Date' not in data.columns:
-            logging.error(f"Column 'Date' not found in the data for ticker: {ticker}")
-            continue
+    def features(ticker, loaded):
+        # Only the new days are computed, from the end of the price history in the lake;
+        # after a re-adjustment the whole history of the ticker is computed again
+        written_rows = feature_store.update(ticker, cac40_data.lake, FETCH_OVERLAP_DAYS, rebuild=ticker in rebuilt)
+        # The new days are appended to the training windows
+        dataset.extend([ticker], feature_store.lake, rewrite=ticker in rebuilt)
+        return written_rows
+
+    return Pipeline([
+        Stage("fetch", fetch, workers=FETCH_WORKERS),
+        Stage("validate", validate, workers=VALIDATE_WORKERS, batch_size=VALIDATE_BATCH_SIZE),
+        Stage("load", load, workers=DB_WORKERS, batch_size=LOAD_BATCH_SIZE),
+        Stage("features", features),
+    ], queue_size=PIPELINE_QUEUE_SIZE)
+
+
+def main():
+    logging.info("Starting the daily data update process.")
+
+    # Création d'une instance de CAC40HistoricalData
+    cac40_data = CAC40HistoricalData(
+        tickers_list=TICKERS,
+        save_path=SAVE_DIRECTORY,
+        max_workers=FETCH_WORKERS,
+        rate_limiter=AdaptiveRateLimiter(rate=FETCH_RATE_LIMIT),
+        retry_policy=RetryPolicy(max_attempts=FETCH_MAX_ATTEMPTS, base_delay=FETCH_RETRY_BASE_DELAY),
+        lake=get_lake(LAKE_FORMAT, SAVE_DIRECTORY, **LAKE_OPTIONS)
+    )
+    logging.info("CAC40HistoricalData instance created.")
 
-        etl_processor = StockDataETL(data)
-        latest_data = etl_processor.process()
+    with ConnectionPool(**DB_CONFIG, size=DB_POOL_SIZE) as pool:
+        # Création d'une instance de PostgresInserter, les lots sont chargés en parallèle sur le pool
+        inserter = PostgresInserter(
+            dbname=DB_CONFIG["dbname"],
+            user=DB_CONFIG["user"],
+            password=DB_CONFIG["password"],
+            host=DB_CONFIG["host"],
+            port=DB_CONFIG["port"],
+            save_path=SAVE_DIRECTORY,
+            batch_size=LOAD_BATCH_SIZE,
+            copy_threshold=COPY_MIN_ROWS,
+            pool=pool,
+            max_workers=DB_WORKERS,
+            layout=DB_LAYOUT
+        )
+        logging.info("PostgresInserter instance created.")
 
-        if isinstance(latest_data, pd.DataFrame):
-            inserter.insert_data(ticker, latest_data)
-        else:
-            logging.error(f"Failed to process data for ticker: {ticker}")
+        inserter.connect()
+        watermarks = inserter.get_last_dates(TICKERS)
+        inserter.close()
 
-    inserter.close()
+        detector = AnomalyDetector(**ANOMALY_THRESHOLDS, state_path=ANOMALY_STATE_PATH)
+        feature_store = FeatureStore(get_lake(LAKE_FORMAT, FEATURE_DIRECTORY, **LAKE_OPTIONS), FEATURE_WINDOWS)
+        dataset = WindowDatasetBuilder(DATASET_DIRECTORY, DATASET_COLUMNS, DATASET_WINDOW)
+        pipeline = build_pipeline(cac40_data, inserter, detector, feature_store, dataset)
+        loaded = pipeline.run((ticker, watermarks.get(ticker)) for ticker in TICKERS)
+        detector.save_state()
 
-    logging.info("Daily data update process completed.")
+    logging.info(f"Stage timings: {pipeline.timings}")
+    if pipeline.failures:
+        logging.error(f"Tickers not updated, by failing stage: {pipeline.failures}")
+    logging.info(f"Daily data update process completed: {len(loaded)}/{len(TICKERS)} tickers loaded.")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,239 @@
+import os
+import json
+import logging
+import threading
+from collections import deque
+from datetime import timedelta
+from typing import Dict, Optional
+import numpy as np
+import pandas as pd
+
+# Reasons reported for the anomalous rows
+RETURN_ZSCORE = "Return z-score"
+OHLC_INCONSISTENT = "OHLC"
+ZERO_VOLUME = "Zero volume"
+
+# Relative tolerance of the OHLC consistency checks, prices being stored in single precision
+OHLC_TOLERANCE = 1e-4
+
+
+def _shift(values: np.ndarray, periods: int, fill=np.nan) -> np.ndarray:
+    # Values of `periods` rows before, like pd.Series.shift
+    periods = min(periods, len(values))
+    return np.concatenate([np.full(periods, fill, dtype=values.dtype), values[:len(values) - periods]])
+
+
+class AnomalyDetector:
+    """
+    Flags the bad ticks of daily histories: extreme log returns, inconsistent OHLC prices and long
+    runs of days without volume.
+
+    A return is extreme when its z-score against the returns of the `window` previous days exceeds
+    `zscore_threshold`; the day after a flagged tick is not flagged if its price is back in line
+    with the day before the tick. Whole histories are screened with vectorized rolling statistics.
+    Once a ticker was screened, its rolling state (last returns, last close, current run of days
+    without volume) is kept, so that the next rows are checked against it without reading the
+    stored history again. The state can be saved to a JSON file between runs.
+
+    Attributes:
+        window (int): Number of previous returns the z-score is computed against.
+        zscore_threshold (float): Absolute z-score above which a return is anomalous.
+        min_periods (int): Minimum number of previous returns needed to compute a z-score.
+        max_zero_volume_days (int): Length from which a run of days without volume is anomalous.
+        state_path (str): JSON file the rolling states are saved to, if any.
+    """
+
+    def __init__(self, window: int = 60, zscore_threshold: float = 8.0, min_periods: int = 20,
+                 max_zero_volume_days: int = 5, state_path: Optional[str] = None):
+        self.window = window
+        self.zscore_threshold = zscore_threshold
+        self.min_periods = min_periods
+        self.max_zero_volume_days = max_zero_volume_days
+        self.state_path = state_path
+        self._states = {}
+        self._lock = threading.Lock()
+        if state_path is not None and os.path.exists(state_path):
+            with open(state_path, "r") as f:
+                self._states = {
+                    ticker: dict(state, returns=deque(state["returns"], maxlen=window),
+                                 last_date=pd.Timestamp(state["last_date"]))
+                    for ticker, state in json.load(f).items()
+                }
+
+    def has_state(self, ticker_symbol: str) -> bool:
+        """
+        Tells whether the rolling state of a ticker is known.
+        """
+        with self._lock:
+            return ticker_symbol in self._states
+
+    def screen(self, ticker_symbol: str, rows: pd.DataFrame) -> pd.Series:
+        """
+        Flags the anomalous rows of a ticker, incrementally if its rolling state is known, over the
+        whole frame otherwise; the rolling state is updated with the rows either way.
+
+        Args:
+            ticker_symbol (str): The ticker of the rows.
+            rows (pd.DataFrame): Rows with Date, Open, High, Low, Close and Volume columns.
+
+        Returns:
+            pd.Series: The reasons each row is anomalous, comma-separated, or '' for a normal row.
+        """
+        if self.has_state(ticker_symbol):
+            return self.check(ticker_symbol, rows)
+        reasons = self.detect(rows)
+        self.prime(ticker_symbol, rows[reasons == ""])
+        return reasons
+
+    def detect(self, history: pd.DataFrame) -> pd.Series:
+        """
+        Flags the anomalous rows of a whole history, with vectorized rolling statistics.
+
+        Returns:
+            pd.Series: The reasons each row is anomalous, comma-separated, or '' for a normal row.
+        """
+        original_index = history.index
+        history = history.sort_values("Date")
+        closes = history["Close"].to_numpy(dtype="float64")
+        log_closes = np.log(np.where(closes > 0, closes, np.nan))
+        returns = np.diff(log_closes, prepend=np.nan)
+        mean, std = self._rolling_stats(returns)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            spikes = (std > 0) & (np.abs(returns - mean) / std > self.zscore_threshold)
+            # The day after a bad tick comes back in line with the day before it: only the tick is flagged,
+            # the two-day return being compared with the statistics from before the tick
+            two_day_returns = log_closes - _shift(log_closes, 2)
+            two_day_zscores = (two_day_returns - 2 * _shift(mean, 1)) / (np.sqrt(2) * _shift(std, 1))
+        spikes &= ~(_shift(spikes, 1, fill=False) & (np.abs(two_day_zscores) <= self.zscore_threshold))
+
+        volumes = history["Volume"].to_numpy(dtype="float64") if "Volume" in history.columns else np.ones(len(history))
+        flags = {
+            RETURN_ZSCORE: spikes,
+            OHLC_INCONSISTENT: self._ohlc_inconsistent(history),
+            ZERO_VOLUME: self._zero_volume_runs(volumes == 0, 0) >= self.max_zero_volume_days,
+        }
+        return pd.Series(self._reasons(flags), index=history.index).reindex(original_index)
+
+    def check(self, ticker_symbol: str, rows: pd.DataFrame) -> pd.Series:
+        """
+        Flags the anomalous new rows of a ticker against its rolling state, and updates the state.
+
+        The rows dated before the state (re-fetched overlap) only go through the OHLC checks.
+
+        Returns:
+            pd.Series: The reasons each row is anomalous, comma-separated, or '' for a normal row.
+        """
+        original_index = rows.index
+        rows = rows.sort_values("Date")
+        ohlc = self._ohlc_inconsistent(rows)
+        with self._lock:
+            state = self._states[ticker_symbol]
+            spikes = np.zeros(len(rows), dtype=bool)
+            zero_volume = np.zeros(len(rows), dtype=bool)
+            volumes = rows["Volume"].to_numpy(dtype="float64") if "Volume" in rows.columns else np.ones(len(rows))
+            for position, (date, close) in enumerate(zip(rows["Date"], rows["Close"].to_numpy(dtype="float64"))):
+                if date <= state["last_date"] or ohlc[position]:
+                    continue
+                state["zero_run"] = state["zero_run"] + 1 if volumes[position] == 0 else 0
+                zero_volume[position] = state["zero_run"] >= self.max_zero_volume_days
+                log_return = np.log(close / state["last_close"]) if close > 0 and state["last_close"] else np.nan
+                previous = np.asarray(state["returns"])
+                if len(previous) >= self.min_periods and not np.isnan(log_return):
+                    std = previous.std(ddof=1)
+                    spikes[position] = std > 0 and abs(log_return - previous.mean()) / std > self.zscore_threshold
+                state["last_date"] = date
+                # A bad tick is left out of the state: the next return is computed from the last good close
+                if not spikes[position] and not np.isnan(log_return):
+                    state["returns"].append(log_return)
+                    state["last_close"] = close
+        flags = {RETURN_ZSCORE: spikes, OHLC_INCONSISTENT: ohlc, ZERO_VOLUME: zero_volume}
+        return pd.Series(self._reasons(flags), index=rows.index).reindex(original_index)
+
+    def prime(self, ticker_symbol: str, history: pd.DataFrame) -> None:
+        """
+        Sets the rolling state of a ticker from the last rows of its history.
+        """
+        history = history.sort_values("Date").tail(self.window + 1)
+        if history.empty:
+            return
+        closes = history["Close"].to_numpy(dtype="float64")
+        valid = closes > 0
+        returns = np.diff(np.log(closes[valid])) if valid.sum() > 1 else np.array([])
+        volumes = history["Volume"].to_numpy(dtype="float64") if "Volume" in history.columns else np.ones(len(history))
+        with self._lock:
+            self._states[ticker_symbol] = {
+                "returns": deque(returns.tolist(), maxlen=self.window),
+                "last_close": float(closes[valid][-1]) if valid.any() else None,
+                "zero_run": int(self._zero_volume_runs(volumes == 0, 0)[-1]),
+                "last_date": pd.Timestamp(history["Date"].iloc[-1])
+            }
+
+    def prime_from_lake(self, ticker_symbol: str, lake) -> None:
+        """
+        Sets the rolling state of a ticker from the end of its stored history, read from the lake
+        without loading the whole history.
+        """
+        last_date = lake.last_date(ticker_symbol)
+        if last_date is None:
+            return
+        # Enough calendar days to cover `window` trading days
+        start = last_date - timedelta(days=2 * self.window + 10)
+        self.prime(ticker_symbol, lake.read_since(ticker_symbol, start, columns=["Date", "Close", "Volume"]))
+
+    def save_state(self) -> None:
+        """
+        Saves the rolling states to `state_path`, atomically.
+        """
+        if self.state_path is None:
+            return
+        with self._lock:
+            states = {
+                ticker: dict(state, returns=list(state["returns"]), last_date=state["last_date"].isoformat())
+                for ticker, state in self._states.items()
+            }
+        directory = os.path.dirname(os.path.abspath(self.state_path))
+        if not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(states, f)
+        os.replace(tmp_path, self.state_path)
+        logging.info(f"Anomaly detection state of {len(states)} tickers saved to {self.state_path}")
+
+    def _rolling_stats(self, returns: np.ndarray):
+        # Mean and standard deviation of the `window` returns before each row
+        previous = pd.Series(returns).shift(1).rolling(self.window, min_periods=self.min_periods)
+        return previous.mean().to_numpy(), previous.std().to_numpy()
+
+    @staticmethod
+    def _ohlc_inconsistent(rows: pd.DataFrame) -> np.ndarray:
+        columns = [col for col in ("Open", "High", "Low", "Close") if col in rows.columns]
+        prices = {col: rows[col].to_numpy(dtype="float64") for col in columns}
+        inconsistent = np.zeros(len(rows), dtype=bool)
+        for values in prices.values():
+            inconsistent |= ~(values > 0)
+        if "High" in prices and "Low" in prices:
+            high, low = prices["High"], prices["Low"]
+            tolerance = OHLC_TOLERANCE * np.abs(high)
+            inconsistent |= high < low - tolerance
+            for col in ("Open", "Close"):
+                if col in prices:
+                    inconsistent |= (prices[col] > high + tolerance) | (prices[col] < low - tolerance)
+        return inconsistent
+
+    @staticmethod
+    def _zero_volume_runs(zero: np.ndarray, initial_run: int) -> np.ndarray:
+        # Length of the current run of days without volume, at each row
+        if not len(zero):
+            return np.zeros(0, dtype=int)
+        positions = np.arange(len(zero))
+        last_traded = np.maximum.accumulate(np.where(~zero, positions, -1))
+        runs = positions - last_traded
+        # Rows of the run started before the frame continue it
+        return np.where(last_traded < 0, runs + initial_run, runs)
+
+    @staticmethod
+    def _reasons(flags: Dict[str, np.ndarray]) -> list:
+        names = list(flags)
+        matrix = np.column_stack([flags[name] for name in names])
+        return [", ".join(name for name, flagged in zip(names, row) if flagged) if row.any() else "" for row in matrix]
@@ -0,0 +1,222 @@
+import os
+import json
+import time
+import hashlib
+import threading
+import pandas as pd
+from datetime import datetime, timedelta, time as dtime
+from typing import Optional
+from zoneinfo import ZoneInfo
+import logging
+
+
+class FetchCache:
+    """
+    On-disk cache of the raw responses of the market data source.
+
+    Entries are keyed by ticker, interval and requested date range. An entry fetched while
+    the market is closed stays fresh until the next session opens; an entry fetched during
+    the session expires after `intraday_ttl` seconds, and at the latest at the market close.
+    The total size of the cache is bounded, the least recently used entries being evicted first.
+
+    The frames are read outside of the lock, so that concurrent fetches served from the cache do not
+    wait for each other. The index is written on each put or eviction, and the access times of the
+    hits at most every `index_flush_hits` hits.
+
+    Attributes:
+        cache_dir (str): Directory holding the cached frames and the index.
+        max_size_bytes (int): Maximum total size of the cached frames.
+        hits (int): Number of requests served from the cache.
+        misses (int): Number of requests not found in the cache or expired.
+        evictions (int): Number of entries removed to respect `max_size_bytes`.
+    """
+
+    INDEX_FILENAME = "_index.json"
+
+    def __init__(self, cache_dir: str, max_size_bytes: int = 500 * 1024 * 1024, market_open: str = "09:00",
+                 market_close: str = "17:30", timezone: str = "Europe/Paris", intraday_ttl: int = 300,
+                 index_flush_hits: int = 100):
+        """
+        Initializes the cache and loads its index.
+
+        Args:
+            cache_dir (str): Directory holding the cached frames and the index.
+            max_size_bytes (int): Maximum total size of the cached frames.
+            market_open (str): Opening time of the market, as HH:MM in `timezone`.
+            market_close (str): Closing time of the market, as HH:MM in `timezone`.
+            timezone (str): Timezone of the market.
+            intraday_ttl (int): Lifetime in seconds of the entries fetched during the session.
+            index_flush_hits (int): Number of hits after which their access times are written to the index.
+        """
+        self.cache_dir = cache_dir
+        self.max_size_bytes = max_size_bytes
+        self.market_open = dtime.fromisoformat(market_open)
+        self.market_close = dtime.fromisoformat(market_close)
+        self.timezone = ZoneInfo(timezone)
+        self.intraday_ttl = intraday_ttl
+        self.index_flush_hits = index_flush_hits
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        # Hits whose access time is not written to the index yet
+        self._unsaved_hits = 0
+
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+            logging.info(f"Created directory {self.cache_dir} for the fetch cache.")
+        self._index = self._load_index()
+
+    @staticmethod
+    def make_key(ticker_symbol: str, interval: str = "1d", start=None, end=None, period: Optional[str] = None) -> str:
+        """
+        Builds the cache key of a request.
+        """
+        raw_key = "|".join(str(part) for part in (ticker_symbol, interval, start, end, period))
+        return hashlib.sha1(raw_key.encode("utf-8")).hexdigest()
+
+    def expires_at(self, fetched_at: float) -> float:
+        """
+        Returns the expiry timestamp of an entry fetched at `fetched_at` (POSIX timestamp).
+        """
+        local = datetime.fromtimestamp(fetched_at, self.timezone)
+        is_trading_day = local.weekday() < 5
+        today_open = datetime.combine(local.date(), self.market_open, self.timezone)
+        today_close = datetime.combine(local.date(), self.market_close, self.timezone)
+
+        if is_trading_day and today_open <= local < today_close:
+            return min(fetched_at + self.intraday_ttl, today_close.timestamp())
+
+        next_open = today_open if (is_trading_day and local < today_open) else today_open + timedelta(days=1)
+        while next_open.weekday() >= 5:
+            next_open += timedelta(days=1)
+        return next_open.timestamp()
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        """
+        Returns the cached frame for `key`, or None if it is missing or expired.
+        """
+        with self._lock:
+            entry = self._index.get(key)
+            now = time.time()
+            if entry is None or entry["expires_at"] <= now:
+                if entry is not None:
+                    self._remove(key)
+                    self._save_index()
+                self.misses += 1
+                return None
+
+        # A concurrent put replaces the file atomically, so the frame read is either the old or the new one
+        try:
+            data = pd.read_pickle(self._path(key))
+        except Exception as e:
+            with self._lock:
+                # Unless the entry was replaced or evicted meanwhile, the file is corrupted
+                if self._index.get(key) is entry:
+                    logging.warning(f"Corrupted cache entry {key}, dropping it: {e}")
+                    self._remove(key)
+                    self._save_index()
+                self.misses += 1
+            return None
+
+        with self._lock:
+            entry["last_access"] = now
+            self.hits += 1
+            self._unsaved_hits += 1
+            if self._unsaved_hits >= self.index_flush_hits:
+                self._save_index()
+        return data
+
+    def put(self, key: str, data: pd.DataFrame) -> None:
+        """
+        Stores a frame in the cache, evicting the least recently used entries if needed.
+        """
+        with self._lock:
+            path = self._path(key)
+            tmp_path = f"{path}.tmp"
+            data.to_pickle(tmp_path)
+            os.replace(tmp_path, path)
+            now = time.time()
+            self._index[key] = {
+                "size": os.path.getsize(path),
+                "fetched_at": now,
+                "expires_at": self.expires_at(now),
+                "last_access": now
+            }
+            self._evict()
+            self._save_index()
+
+    def flush(self) -> None:
+        """
+        Writes the access times of the last hits to the index.
+        """
+        with self._lock:
+            if self._unsaved_hits:
+                self._save_index()
+
+    def clear(self) -> None:
+        """
+        Removes every entry of the cache.
+        """
+        with self._lock:
+            for key in list(self._index):
+                self._remove(key)
+            self._save_index()
+
+    def total_size(self) -> int:
+        """
+        Returns the total size in bytes of the cached frames.
+        """
+        return sum(entry["size"] for entry in self._index.values())
+
+    def stats(self) -> dict:
+        """
+        Returns the hit/miss counters and the current occupation of the cache.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._index),
+            "size_bytes": self.total_size()
+        }
+
+    def _evict(self) -> None:
+        total_size = self.total_size()
+        for key in sorted(self._index, key=lambda k: self._index[k]["last_access"]):
+            if total_size <= self.max_size_bytes:
+                break
+            total_size -= self._index[key]["size"]
+            self._remove(key)
+            self.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        self._index.pop(key, None)
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def _load_index(self) -> dict:
+        index_path = os.path.join(self.cache_dir, self.INDEX_FILENAME)
+        if not os.path.exists(index_path):
+            return {}
+        try:
+            with open(index_path, "r") as f:
+                index = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Unreadable fetch cache index, starting empty: {e}")
+            return {}
+        # Drop the entries whose file disappeared
+        return {key: entry for key, entry in index.items() if os.path.exists(self._path(key))}
+
+    def _save_index(self) -> None:
+        index_path = os.path.join(self.cache_dir, self.INDEX_FILENAME)
+        tmp_path = f"{index_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, index_path)
+        self._unsaved_hits = 0
@@ -0,0 +1,135 @@
+import hashlib
+from typing import Dict, List
+import numpy as np
+import pandas as pd
+
+# Columns of the row hash, in order, with the scale their values are rounded at (prices to 1e-4)
+CHECKSUM_COLUMNS = {
+    "Open": 10000,
+    "High": 10000,
+    "Low": 10000,
+    "Close": 10000,
+    "Volume": 1,
+    "Dividends": 10000,
+    "Stock_Splits": 10000,
+}
+# Value of a missing cell in the row hash
+MISSING_VALUE = -1
+# Hexadecimal digits of the md5 digest kept as the row hash: 56 bits, so that the sum of the
+# hashes of a month (at most a few dozen rows) never overflows a bigint
+HASH_DIGITS = 14
+
+
+def checksum_sql(date_column: str = '"Date"') -> str:
+    """
+    Returns the SQL aggregate computing the monthly checksum of the rows, as `month_checksums` does.
+
+    Each row is hashed with md5 over its date and its values, converted to double precision and
+    rounded to an integer at the scale of their column, half to even like NumPy. The checksum of
+    a month is the sum of the hashes of its rows, so it does not depend on their order.
+    """
+    values = ", ".join(
+        f'coalesce(round("{col}"::double precision * {scale})::bigint, {MISSING_VALUE})'
+        for col, scale in CHECKSUM_COLUMNS.items()
+    )
+    row = f"concat_ws('|', to_char({date_column}, 'YYYY-MM-DD'), {values})"
+    return f"sum(('x' || left(md5({row}), {HASH_DIGITS}))::bit({4 * HASH_DIGITS})::bigint)::bigint"
+
+
+def row_hashes(history: pd.DataFrame) -> np.ndarray:
+    """
+    Hashes each row of a history as `checksum_sql` does, to a non-negative int64.
+
+    Args:
+        history (pd.DataFrame): The rows of a ticker, with `Date` as a column.
+
+    Returns:
+        np.ndarray: The hash of each row, in the order of the rows.
+    """
+    if history is None or history.empty:
+        return np.array([], dtype=np.int64)
+    parts = [pd.to_datetime(history["Date"]).dt.strftime("%Y-%m-%d").to_numpy(dtype=object)]
+    for col, scale in CHECKSUM_COLUMNS.items():
+        if col in history.columns:
+            values = pd.to_numeric(history[col], errors="coerce").to_numpy(dtype=np.float64)
+            missing = np.isnan(values)
+            scaled = np.where(missing, MISSING_VALUE, np.rint(np.where(missing, 0, values) * scale)).astype(np.int64)
+        else:
+            scaled = np.full(len(history), MISSING_VALUE, dtype=np.int64)
+        parts.append(scaled.astype(str).astype(object))
+    rows = parts[0]
+    for part in parts[1:]:
+        rows = rows + "|" + part
+    return np.fromiter((int(hashlib.md5(row.encode()).hexdigest()[:HASH_DIGITS], 16) for row in rows),
+                       dtype=np.int64, count=len(rows))
+
+
+def month_checksums(history: pd.DataFrame) -> pd.DataFrame:
+    """
+    Computes the number of rows and the checksum of each month of a history.
+
+    Args:
+        history (pd.DataFrame): The rows of a ticker, with `Date` as a column.
+
+    Returns:
+        pd.DataFrame: month (first day of the month), rows and checksum, one row per stored month.
+    """
+    if history is None or history.empty:
+        return pd.DataFrame({"month": pd.Series(dtype="datetime64[ns]"), "rows": pd.Series(dtype="int64"),
+                             "checksum": pd.Series(dtype="int64")})
+    hashes = row_hashes(history)
+    dates = pd.to_datetime(history["Date"]).to_numpy(dtype="datetime64[D]")
+    order = np.argsort(dates, kind="stable")
+    months = dates[order].astype("datetime64[M]")
+
+    # The rows are sorted, so each month is a contiguous run
+    starts = np.flatnonzero(np.concatenate([[True], months[1:] != months[:-1]]))
+    return pd.DataFrame({
+        "month": months[starts].astype("datetime64[ns]"),
+        "rows": np.diff(np.append(starts, len(dates))).astype(np.int64),
+        "checksum": np.add.reduceat(hashes[order], starts),
+    })
+
+
+def combine_checksums(parts: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Adds up the monthly checksums of several parts of a history, e.g. of its successive chunks.
+
+    The rows and the checksum of a month are sums over its rows, so a month split across two
+    chunks gets the same values as if it had been computed at once.
+    """
+    parts = [part for part in parts if not part.empty]
+    if not parts:
+        return month_checksums(None)
+    if len(parts) == 1:
+        return parts[0]
+    return pd.concat(parts, ignore_index=True).groupby("month", as_index=False)[["rows", "checksum"]].sum()
+
+
+def compare_checksums(lake_sums: Dict[str, pd.DataFrame], warehouse_sums: pd.DataFrame) -> pd.DataFrame:
+    """
+    Returns the (ticker, month) partitions whose rows or checksum differ between the lake and the warehouse.
+
+    Args:
+        lake_sums (Dict[str, pd.DataFrame]): The monthly checksums of each ticker of the lake.
+        warehouse_sums (pd.DataFrame): ticker, month, rows and checksum of the warehouse.
+
+    Returns:
+        pd.DataFrame: ticker, month, lake_rows, warehouse_rows, lake_checksum and warehouse_checksum
+            of the divergent partitions; a partition missing on one side has 0 rows there.
+    """
+    frames = [sums.assign(ticker=ticker) for ticker, sums in lake_sums.items() if not sums.empty]
+    lake = (pd.concat(frames, ignore_index=True) if frames
+            else pd.DataFrame(columns=["ticker", "month", "rows", "checksum"]))
+    # Nullable integers, so that the checksums missing on one side do not turn the others into floats
+    counts = {"rows": "Int64", "checksum": "Int64"}
+    merged = lake.astype(counts).merge(warehouse_sums.astype(counts), on=["ticker", "month"], how="outer",
+                                       suffixes=("_lake", "_warehouse"))
+    merged = merged.rename(columns={"rows_lake": "lake_rows", "rows_warehouse": "warehouse_rows",
+                                    "checksum_lake": "lake_checksum", "checksum_warehouse": "warehouse_checksum"})
+    for col in ("lake_rows", "warehouse_rows", "lake_checksum", "warehouse_checksum"):
+        merged[col] = merged[col].fillna(0).astype("int64")
+    divergent = ((merged["lake_rows"] != merged["warehouse_rows"])
+                 | (merged["lake_checksum"] != merged["warehouse_checksum"]))
+    columns = ["ticker", "month", "lake_rows", "warehouse_rows", "lake_checksum", "warehouse_checksum"]
+    return merged.loc[divergent, columns].sort_values(["ticker", "month"]).reset_index(drop=True)
@@ -0,0 +1,119 @@
+import logging
+from typing import Tuple
+import numpy as np
+import pandas as pd
+
+ACTION_COLUMNS = ["Dividends", "Stock_Splits"]
+PRICE_COLUMNS = ["Open", "High", "Low", "Close"]
+
+
+def new_actions(incoming: pd.DataFrame, stored: pd.DataFrame) -> pd.DataFrame:
+    """
+    Returns the splits and dividends of newly fetched rows that are not in the stored history yet.
+
+    Args:
+        incoming (pd.DataFrame): The fetched rows, with Date, Dividends and Stock_Splits columns.
+        stored (pd.DataFrame): The stored rows over (at least) the same dates.
+
+    Returns:
+        pd.DataFrame: Date, Dividends and Stock_Splits of the new actions, oldest first.
+    """
+    columns = [col for col in ACTION_COLUMNS if col in incoming.columns]
+    if not columns or incoming.empty:
+        return pd.DataFrame(columns=["Date"] + ACTION_COLUMNS)
+    actions = incoming.loc[(incoming[columns].fillna(0) != 0).any(axis=1), ["Date"] + columns]
+    if stored is not None and not stored.empty:
+        known = stored[["Date"] + [col for col in columns if col in stored.columns]]
+        merged = actions.merge(known, on="Date", how="left", suffixes=("", "_stored"))
+        changed = np.zeros(len(merged), dtype=bool)
+        for col in columns:
+            stored_values = merged.get(f"{col}_stored", pd.Series(np.nan, index=merged.index)).fillna(0)
+            changed |= ~np.isclose(merged[col].fillna(0), stored_values)
+        actions = actions[changed]
+    return actions.reindex(columns=["Date"] + ACTION_COLUMNS, fill_value=0).sort_values("Date").reset_index(drop=True)
+
+
+def adjustment_factors(actions: pd.DataFrame, stored: pd.DataFrame) -> pd.DataFrame:
+    """
+    Computes the factors a split or dividend applies to the history before its date.
+
+    A split of ratio r divides the prior prices (and dividends) by r and multiplies the prior
+    volumes by r. A dividend D multiplies the prior prices by 1 - D / C, C being the stored close
+    of the previous day, as in the adjusted histories of the data source.
+
+    Args:
+        actions (pd.DataFrame): The new actions, see `new_actions`.
+        stored (pd.DataFrame): The stored rows before the actions, with Date and Close columns.
+
+    Returns:
+        pd.DataFrame: Date, price_factor and volume_factor of each action, oldest first.
+    """
+    actions = actions.sort_values("Date").reset_index(drop=True)
+    splits = actions["Stock_Splits"].fillna(0).to_numpy(dtype="float64")
+    ratios = np.where(splits > 0, splits, 1.0)
+    dividends = actions["Dividends"].fillna(0).to_numpy(dtype="float64")
+
+    # Close of the last stored day strictly before each action
+    closes = stored[["Date", "Close"]].dropna().astype({"Date": "datetime64[ns]"}).sort_values("Date")
+    previous = pd.merge_asof(actions[["Date"]].astype("datetime64[ns]"), closes, on="Date", allow_exact_matches=False)
+    previous_close = previous["Close"].to_numpy(dtype="float64")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dividend_factors = 1 - dividends / previous_close
+    dividend_factors = np.where((dividends > 0) & (dividend_factors > 0) & (dividend_factors < 1), dividend_factors, 1.0)
+    return pd.DataFrame({
+        "Date": actions["Date"],
+        "price_factor": dividend_factors / ratios,
+        "volume_factor": ratios,
+    })
+
+
+def cumulative_factors(dates: pd.Series, factors: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Returns, for each date, the product of the factors of the actions dated after it.
+    """
+    factors = factors.sort_values("Date")
+    action_dates = factors["Date"].to_numpy(dtype="datetime64[ns]")
+    # Suffix products: position i holds the product of the factors of actions i and after
+    price = np.append(np.cumprod(factors["price_factor"].to_numpy(dtype="float64")[::-1])[::-1], 1.0)
+    volume = np.append(np.cumprod(factors["volume_factor"].to_numpy(dtype="float64")[::-1])[::-1], 1.0)
+    positions = np.searchsorted(action_dates, dates.to_numpy(dtype="datetime64[ns]"), side="right")
+    return price[positions], volume[positions]
+
+
+def adjust_history(history: pd.DataFrame, factors: pd.DataFrame) -> pd.DataFrame:
+    """
+    Applies the factors of new actions to a stored history, in one vectorized pass.
+
+    Returns:
+        pd.DataFrame: The history with the rows before each action adjusted, in the same dtypes.
+    """
+    if history.empty or factors.empty:
+        return history
+    price, volume = cumulative_factors(history["Date"], factors)
+    adjusted = history.copy()
+    for col in PRICE_COLUMNS:
+        if col in adjusted.columns:
+            adjusted[col] = (adjusted[col].to_numpy(dtype="float64") * price).astype(history[col].dtype)
+    if "Volume" in adjusted.columns:
+        adjusted["Volume"] = np.round(adjusted["Volume"].to_numpy(dtype="float64") * volume).astype(history["Volume"].dtype)
+    if "Dividends" in adjusted.columns:
+        adjusted["Dividends"] = (adjusted["Dividends"].to_numpy(dtype="float64") / volume).astype(history["Dividends"].dtype)
+    logging.info(f"Adjusted {int((price != 1).sum())} rows for {len(factors)} corporate action(s).")
+    return adjusted
+
+
+def adjustment_segments(factors: pd.DataFrame) -> list:
+    """
+    Splits the history into date ranges sharing the same cumulative factors, for a bulk SQL update.
+
+    Returns:
+        list: (start date or None, end date, price factor, volume factor) of each range before the last action.
+    """
+    factors = factors.sort_values("Date")
+    dates = [None] + [pd.Timestamp(day).date() for day in factors["Date"]]
+    price, volume = cumulative_factors(factors["Date"], factors)
+    # The rows before the first action take all the factors; the following ranges drop them one by one
+    first_price = float(np.prod(factors["price_factor"].to_numpy(dtype="float64")))
+    first_volume = float(np.prod(factors["volume_factor"].to_numpy(dtype="float64")))
+    prices, volumes = [first_price] + price[:-1].tolist(), [first_volume] + volume[:-1].tolist()
+    return [(dates[i], dates[i + 1], prices[i], volumes[i]) for i in range(len(factors))]
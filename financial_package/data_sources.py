@@ -0,0 +1,65 @@
+import yfinance as yf
+import pandas as pd
+from typing import Dict, List
+import logging
+
+
+class YahooFinanceSource:
+    """
+    Default market data source, backed by the yfinance API.
+
+    Any object exposing the same `history` and `download` methods can be given to
+    CAC40HistoricalData instead (e.g. a local fake of the Yahoo endpoint for tests
+    and benchmarks).
+    """
+
+    def history(self, ticker_symbol: str, **kwargs) -> pd.DataFrame:
+        """
+        Retrieves the price history of a single stock symbol.
+
+        Args:
+            ticker_symbol (str): The stock symbol to retrieve.
+            **kwargs: Arguments forwarded to `yfinance.Ticker.history` (period, start, end, interval...).
+
+        Returns:
+            pd.DataFrame: The raw history, indexed by date.
+        """
+        ticker = yf.Ticker(ticker_symbol)
+        return ticker.history(**kwargs)
+
+    def download(self, tickers_list: List[str], **kwargs) -> Dict[str, pd.DataFrame]:
+        """
+        Retrieves the price history of several stock symbols in a single request.
+
+        Args:
+            tickers_list (List[str]): The stock symbols to retrieve.
+            **kwargs: Arguments forwarded to `yfinance.download` (period, start, end, interval...).
+
+        Returns:
+            Dict[str, pd.DataFrame]: The raw history of each symbol, indexed by date.
+                Symbols for which no data was returned are omitted.
+        """
+        data = yf.download(
+            tickers_list,
+            group_by="ticker",
+            auto_adjust=True,
+            actions=True,
+            threads=False,
+            progress=False,
+            **kwargs
+        )
+        results = {}
+        for ticker_symbol in tickers_list:
+            if isinstance(data.columns, pd.MultiIndex):
+                if ticker_symbol not in data.columns.get_level_values(0):
+                    logging.warning(f"No data returned for {ticker_symbol} in batch download.")
+                    continue
+                ticker_data = data[ticker_symbol]
+            else:
+                ticker_data = data
+            ticker_data = ticker_data.dropna(how="all")
+            if ticker_data.empty:
+                logging.warning(f"No data returned for {ticker_symbol} in batch download.")
+                continue
+            results[ticker_symbol] = ticker_data.copy()
+        return results
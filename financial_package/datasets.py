@@ -0,0 +1,262 @@
+import io
+import os
+import json
+import logging
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from financial_package.lake import CSVLake
+
+MANIFEST_FILENAME = "manifest.json"
+
+
+def _write_npy(path: str, array: np.ndarray) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.lib.format.write_array(f, np.ascontiguousarray(array))
+    os.replace(tmp_path, path)
+
+
+def _append_npy(path: str, rows: np.ndarray) -> None:
+    """
+    Appends rows to a .npy file along its first axis, without rewriting the stored rows.
+
+    The header is rewritten in place with the new shape; it is padded by NumPy, so the new shape
+    fits in it unless its length crosses a padding boundary, in which case the file is rewritten.
+    """
+    with open(path, "r+b") as f:
+        version = np.lib.format.read_magic(f)
+        read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+        shape, fortran_order, dtype = read_header(f)
+        header_length = f.tell()
+        rows = np.ascontiguousarray(rows, dtype=dtype)
+        new_header = {"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": fortran_order,
+                      "shape": (shape[0] + len(rows),) + tuple(shape[1:])}
+        buffer = _header_bytes(new_header, version)
+        if len(buffer) == header_length:
+            f.seek(0)
+            f.write(buffer)
+            f.seek(0, os.SEEK_END)
+            f.write(rows.tobytes())
+            return
+    _write_npy(path, np.concatenate([np.load(path), rows]))
+
+
+def _header_bytes(header: dict, version: Tuple[int, int]) -> bytes:
+    buffer = io.BytesIO()
+    if version == (1, 0):
+        np.lib.format.write_array_header_1_0(buffer, header)
+    else:
+        np.lib.format.write_array_header_2_0(buffer, header)
+    return buffer.getvalue()
+
+
+class WindowDataset:
+    """
+    Fixed-length windows of the rows of each ticker, read from memory-mapped .npy files.
+
+    The dataset directory holds, for each ticker, `<TICKER>.values.npy` (rows x features, float32)
+    and `<TICKER>.dates.npy`, plus a `manifest.json` describing the window length, the feature
+    columns and the rows of each ticker. A window is a view of `window` consecutive rows of a
+    ticker: no window is materialized on disk, and reading one copies nothing.
+
+    Attributes:
+        path (str): Directory of the dataset.
+        manifest (dict): The manifest of the dataset.
+        window (int): Number of rows per window.
+        columns (List[str]): The feature columns, in the order of the last axis.
+        tickers (List[str]): The tickers with at least one window, in the order of their codes.
+    """
+
+    def __init__(self, path: str):
+        """
+        Opens the dataset built in `path`, memory-mapping its files.
+
+        Raises:
+            FileNotFoundError: If no dataset was built in `path`.
+        """
+        self.path = path
+        with open(os.path.join(path, MANIFEST_FILENAME), "r") as f:
+            self.manifest = json.load(f)
+        self.window = self.manifest["window"]
+        self.columns = self.manifest["columns"]
+        self.tickers = [ticker for ticker, entry in sorted(self.manifest["tickers"].items())
+                        if entry["rows"] >= self.window]
+        self._values = [np.load(os.path.join(path, f"{ticker}.values.npy"), mmap_mode="r") for ticker in self.tickers]
+        self._dates = [np.load(os.path.join(path, f"{ticker}.dates.npy"), mmap_mode="r") for ticker in self.tickers]
+        # Windows of each ticker, as (windows, window, features) views over its rows
+        self._windows = [np.lib.stride_tricks.sliding_window_view(values, self.window, axis=0).transpose(0, 2, 1)
+                         for values in self._values]
+        counts = np.array([len(windows) for windows in self._windows], dtype=np.int64)
+        self._offsets = np.concatenate([[0], np.cumsum(counts)])
+
+    def __len__(self) -> int:
+        return int(self._offsets[-1])
+
+    def locate(self, indices: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the ticker code and the first row of windows given by their global index.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        codes = np.searchsorted(self._offsets, indices, side="right") - 1
+        return codes, indices - self._offsets[codes]
+
+    def window_at(self, index: int) -> Tuple[str, pd.Timestamp, np.ndarray]:
+        """
+        Returns the ticker, the last date and the (window, features) view of a window.
+        """
+        codes, starts = self.locate([index])
+        code, start = int(codes[0]), int(starts[0])
+        return self.tickers[code], pd.Timestamp(self._dates[code][start + self.window - 1]), self._windows[code][start]
+
+    def batches(self, batch_size: int, shuffle: bool = True,
+                seed: Optional[int] = None) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        Iterates over all the windows in batches, in a random order if `shuffle` is set.
+
+        Each batch is gathered ticker by ticker from the memory-mapped rows: only the windows of
+        the batch are read and copied into the batch array.
+
+        Args:
+            batch_size (int): Number of windows per batch (the last batch may be smaller).
+            shuffle (bool): If True, the windows are visited in a random order.
+            seed (int, optional): Seed of the shuffling, for a reproducible order.
+
+        Yields:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: The (batch, window, features) array, the ticker
+                code (index in `tickers`) and the last date of each window.
+        """
+        order = np.random.default_rng(seed).permutation(len(self)) if shuffle else np.arange(len(self))
+        for batch_start in range(0, len(order), batch_size):
+            codes, starts = self.locate(order[batch_start:batch_start + batch_size])
+            batch = np.empty((len(codes), self.window, len(self.columns)), dtype=np.float32)
+            end_dates = np.empty(len(codes), dtype="datetime64[ns]")
+            for code in np.unique(codes):
+                selected = codes == code
+                batch[selected] = self._windows[code][starts[selected]]
+                end_dates[selected] = self._dates[code][starts[selected] + self.window - 1]
+            yield batch, codes, end_dates
+
+
+class WindowDatasetBuilder:
+    """
+    Builds and extends a WindowDataset from the histories of a lake (prices or features).
+
+    The rows with a missing value in one of the columns (e.g. the warm-up rows of the features)
+    are left out. Extending the dataset only appends the rows dated after the last row of each
+    ticker to its files, so a new day costs one row per ticker instead of a rebuild.
+
+    Attributes:
+        path (str): Directory of the dataset.
+        columns (List[str]): The columns of the lake used as features.
+        window (int): Number of rows per window.
+    """
+
+    def __init__(self, path: str, columns: List[str], window: int = 60):
+        self.path = path
+        self.columns = list(columns)
+        self.window = window
+        os.makedirs(path, exist_ok=True)
+        self.manifest = self._load_manifest()
+
+    def build(self, tickers_list: List[str], lake: CSVLake) -> dict:
+        """
+        Writes the rows of all the tickers, replacing the dataset.
+
+        Returns:
+            dict: The manifest of the dataset.
+        """
+        self.manifest = self._empty_manifest()
+        for ticker_symbol in tickers_list:
+            history = lake.read(ticker_symbol, ["Date"] + self.columns)
+            if history is None:
+                logging.warning(f"No history stored for {ticker_symbol}, left out of the dataset.")
+                continue
+            values, dates = self._rows(history)
+            _write_npy(self._values_path(ticker_symbol), values)
+            _write_npy(self._dates_path(ticker_symbol), dates)
+            self._record(ticker_symbol, dates, len(values))
+        return self._save_manifest()
+
+    def extend(self, tickers_list: List[str], lake: CSVLake, rewrite: bool = False) -> Dict[str, int]:
+        """
+        Appends the rows dated after the last row of each ticker; a ticker new to the dataset is written whole.
+
+        Args:
+            tickers_list (List[str]): The tickers to extend.
+            lake (CSVLake): The lake the rows are read from.
+            rewrite (bool): If True, the tickers are written whole, e.g. after their history was re-adjusted.
+
+        Returns:
+            Dict[str, int]: The number of rows appended for each ticker.
+        """
+        if self.manifest["columns"] != self.columns or self.manifest["window"] != self.window:
+            raise ValueError(f"The dataset in {self.path} was built with other columns or window, rebuild it instead.")
+        appended = {}
+        for ticker_symbol in tickers_list:
+            entry = self.manifest["tickers"].get(ticker_symbol)
+            if rewrite or (entry is not None and entry["last_date"] is None):
+                self.manifest["tickers"].pop(ticker_symbol, None)
+                entry = None
+            if entry is None:
+                history = lake.read(ticker_symbol, ["Date"] + self.columns)
+            else:
+                last_date = pd.Timestamp(entry["last_date"])
+                history = lake.read_since(ticker_symbol, last_date, ["Date"] + self.columns)
+                history = history[history["Date"] > last_date] if history is not None else None
+            if history is None or history.empty:
+                appended[ticker_symbol] = 0
+                continue
+            values, dates = self._rows(history)
+            if entry is None:
+                _write_npy(self._values_path(ticker_symbol), values)
+                _write_npy(self._dates_path(ticker_symbol), dates)
+            elif len(values):
+                _append_npy(self._values_path(ticker_symbol), values)
+                _append_npy(self._dates_path(ticker_symbol), dates)
+            self._record(ticker_symbol, dates, len(values))
+            appended[ticker_symbol] = len(values)
+        self._save_manifest()
+        logging.info(f"Dataset {self.path} extended with {sum(appended.values())} rows.")
+        return appended
+
+    def _rows(self, history: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        history = history.sort_values("Date")
+        values = history[self.columns].to_numpy(dtype=np.float32)
+        complete = ~np.isnan(values).any(axis=1)
+        return values[complete], history["Date"].to_numpy(dtype="datetime64[ns]")[complete]
+
+    def _record(self, ticker_symbol: str, dates: np.ndarray, rows: int) -> None:
+        entry = self.manifest["tickers"].setdefault(ticker_symbol, {"rows": 0, "first_date": None, "last_date": None})
+        entry["rows"] += rows
+        if rows:
+            entry["first_date"] = entry["first_date"] or pd.Timestamp(dates[0]).strftime("%Y-%m-%d")
+            entry["last_date"] = pd.Timestamp(dates[-1]).strftime("%Y-%m-%d")
+        entry["windows"] = max(0, entry["rows"] - self.window + 1)
+
+    def _values_path(self, ticker_symbol: str) -> str:
+        return os.path.join(self.path, f"{ticker_symbol}.values.npy")
+
+    def _dates_path(self, ticker_symbol: str) -> str:
+        return os.path.join(self.path, f"{ticker_symbol}.dates.npy")
+
+    def _empty_manifest(self) -> dict:
+        return {"version": 1, "window": self.window, "columns": self.columns, "dtype": "float32", "tickers": {}}
+
+    def _load_manifest(self) -> dict:
+        path = os.path.join(self.path, MANIFEST_FILENAME)
+        if not os.path.exists(path):
+            return self._empty_manifest()
+        with open(path, "r") as f:
+            return json.load(f)
+
+    def _save_manifest(self) -> dict:
+        self.manifest["updated_at"] = datetime.now().isoformat(timespec="seconds")
+        self.manifest["windows"] = sum(entry["windows"] for entry in self.manifest["tickers"].values())
+        path = os.path.join(self.path, MANIFEST_FILENAME)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.manifest, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, path)
+        return self.manifest
@@ -0,0 +1,112 @@
+import threading
+import logging
+from contextlib import contextmanager
+import psycopg2
+from psycopg2 import pool
+
+
+class ConnectionPool:
+    """
+    Pool of PostgreSQL connections shared by the loaders and the exporters.
+
+    `ThreadedConnectionPool` fails as soon as all its connections are in use; this wrapper makes
+    the callers wait for a free connection instead, so that the pool size bounds the number of
+    backends used at the same time.
+
+    Attributes:
+        size (int): Maximum number of connections opened by the pool.
+        closed (bool): True once the pool was closed; no connection can be taken afterwards.
+    """
+
+    def __init__(self, dbname: str, user: str, password: str, host: str, port: str, size: int = 4,
+                 timeout: float = None):
+        """
+        Opens the connections of the pool.
+
+        Args:
+            dbname (str): Name of the PostgreSQL database.
+            user (str): Database user.
+            password (str): Password for the database user.
+            host (str): Host address of the PostgreSQL server.
+            port (str): Port number for the PostgreSQL server.
+            size (int): Maximum number of connections opened by the pool.
+            timeout (float, optional): Maximum time to wait for a free connection, in seconds.
+                Waits indefinitely if None.
+
+        Raises:
+            psycopg2.DatabaseError: If the connections cannot be opened.
+        """
+        self.size = size
+        self.timeout = timeout
+        self.closed = False
+        self._available = threading.BoundedSemaphore(size)
+        try:
+            # Connections above the minimum are closed when given back, so all of them are kept open
+            self._pool = pool.ThreadedConnectionPool(
+                size, size, dbname=dbname, user=user, password=password, host=host, port=port
+            )
+            logging.info(f"Connection pool of {size} connections opened.")
+        except psycopg2.DatabaseError as e:
+            logging.error(f"Error opening the connection pool: {e}")
+            raise
+
+    def getconn(self):
+        """
+        Takes a connection from the pool, waiting for one to be released if they are all in use.
+
+        Returns:
+            connection: A psycopg2 connection, to give back with `putconn`.
+
+        Raises:
+            psycopg2.pool.PoolError: If the pool is closed or no connection was released in time.
+        """
+        if self.closed:
+            raise pool.PoolError("connection pool is closed")
+        if not self._available.acquire(timeout=self.timeout):
+            raise pool.PoolError(f"no connection released within {self.timeout}s")
+        try:
+            return self._pool.getconn()
+        except Exception:
+            self._available.release()
+            raise
+
+    def putconn(self, conn, close: bool = False):
+        """
+        Gives a connection back to the pool; any transaction left open is rolled back.
+
+        Args:
+            conn (connection): The connection taken with `getconn`.
+            close (bool): If True, the connection is closed instead of being reused.
+        """
+        try:
+            if not self.closed:
+                self._pool.putconn(conn, close=close)
+        finally:
+            self._available.release()
+
+    @contextmanager
+    def connection(self):
+        """
+        Context manager lending a connection of the pool for the duration of the block.
+        """
+        conn = self.getconn()
+        try:
+            yield conn
+        finally:
+            self.putconn(conn)
+
+    def close(self):
+        """
+        Closes all the connections of the pool; the connections still lent are closed as well.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self._pool.closeall()
+        logging.info("Connection pool closed.")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -1,14 +1,87 @@
 from datetime import datetime
+import os
+import threading
 import pandas as pd
 import numpy as np
 import sys
 import logging
+from typing import Dict, Optional
+from financial_package.schema import PRICE_SCHEMA, apply_schema
+
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close']
+# Columns checked for numeric values by the vectorized validation
+NUMERIC_COLUMNS = [col for col, (dtype, _) in PRICE_SCHEMA.items() if not dtype.startswith("datetime64")]
+MIN_DATE = pd.Timestamp('1987-12-31')
+DEFAULT_QUARANTINE_PATH = 'unvalid_data.csv'
+
+
+class QuarantineStore:
+    """
+    Single CSV file accumulating the rejected rows of every run, with the ticker, the time of the
+    rejection and the rules broken. Rows are appended, never overwritten.
+
+    Attributes:
+        path (str): Path to the CSV file.
+    """
+
+    # Leading columns of every quarantined row, followed by the columns of the schema
+    COLUMNS = ['quarantined_at', 'ticker', 'type_error'] + list(PRICE_SCHEMA)
+    _locks = {}
+    _locks_guard = threading.Lock()
+
+    def __init__(self, path: str = DEFAULT_QUARANTINE_PATH):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        # Shared by all the stores of a file, so that concurrent validations never interleave their rows
+        with self._locks_guard:
+            self._lock = self._locks.setdefault(os.path.abspath(path), threading.Lock())
+
+    def append(self, rows: pd.DataFrame, ticker: Optional[str] = None) -> int:
+        """
+        Appends rejected rows to the store.
+
+        Args:
+            rows (pd.DataFrame): The rows, with a type_error column and a ticker column unless `ticker` is set.
+            ticker (str, optional): The ticker of all the rows.
+
+        Returns:
+            int: The number of rows appended.
+        """
+        if rows.empty:
+            return 0
+        rows = rows.assign(quarantined_at=pd.Timestamp.now().floor('s'))
+        if ticker is not None:
+            rows = rows.assign(ticker=ticker)
+        rows = rows.reindex(columns=self.COLUMNS)
+        with self._lock:
+            rows.to_csv(self.path, mode='a', index=False, header=not os.path.exists(self.path))
+        logging.info(f"{len(rows)} rows quarantined in {self.path}")
+        return len(rows)
+
+    def read(self) -> pd.DataFrame:
+        """
+        Returns all the quarantined rows, oldest first.
+        """
+        if not os.path.exists(self.path):
+            return pd.DataFrame(columns=self.COLUMNS)
+        return pd.read_csv(self.path, parse_dates=['quarantined_at'])
+
 
 class StockDataETL:
-    def __init__(self, df):
-        self.df = df.astype(str).tail(1)
+    def __init__(self, df, all_rows=False, vectorized=False, ticker=None, quarantine=None, detector=None):
+        # Only the last row is checked, unless all the rows are to be loaded (e.g. several days missed)
+        df = df if all_rows else df.tail(1)
+        # The vectorized validation works on the native dtypes, the original one on strings
+        self.vectorized = vectorized
+        self.df = df.copy() if vectorized else df.astype(str)
         self.type_error = []
         self.df_invalid = pd.DataFrame()
+        self.ticker = ticker
+        self.quarantine = quarantine if quarantine is not None else QuarantineStore()
+        # Statistical screening of the valid rows (AnomalyDetector), in vectorized mode only
+        self.detector = detector
 
     def check_legal_characters(self):
         logging.info("Starting check_legal_characters method.")
@@ -76,12 +149,99 @@ class StockDataETL:
     def save_invalid_data(self):
         logging.info("Starting save_invalid_data method.")
         if not self.df_invalid.empty:
-            self.df_invalid['type_error'] = ', '.join(self.type_error)
-            self.df_invalid.to_excel('unvalid_data.xlsx', index=False)
+            if 'type_error' not in self.df_invalid.columns:
+                self.df_invalid['type_error'] = ', '.join(self.type_error)
+            # Appended to the rows rejected before, by this run or the previous ones
+            self.quarantine.append(self.df_invalid, self.ticker)
         logging.info("Finished save_invalid_data method.")
 
+    def rule_masks(self) -> dict:
+        """
+        Evaluates every validation rule on all the rows at once, on the native dtypes.
+
+        Returns:
+            dict: For each rule, named like the errors of the original checks, the boolean mask
+                of the rows breaking it.
+        """
+        if 'Date' not in self.df.columns:
+            return {"'Date' column missing": np.ones(len(self.df), dtype=bool)}
+        dates = self.df['Date']
+        if not pd.api.types.is_datetime64_any_dtype(dates.dtype):
+            dates = pd.to_datetime(dates, errors='coerce')
+        if dates.dt.tz is not None:
+            dates = dates.dt.tz_localize(None)
+        today = pd.Timestamp(datetime.now().date())
+        masks = {
+            "'Date' format": dates.isna().to_numpy(),
+            "Date val": ((dates < MIN_DATE) | (dates > today)).to_numpy(),
+        }
+        negative_prices = np.zeros(len(self.df), dtype=bool)
+        for column in NUMERIC_COLUMNS:
+            if column not in self.df.columns:
+                continue
+            values = self.df[column]
+            if not pd.api.types.is_numeric_dtype(values.dtype):
+                values = pd.to_numeric(values, errors='coerce')
+            values = values.to_numpy(dtype='float64', na_value=np.nan)
+            masks[f"'{column}' format"] = np.isnan(values)
+            if column in PRICE_COLUMNS:
+                negative_prices |= values < 0
+        masks['Num val'] = negative_prices
+        return masks
+
+    def validate(self):
+        """
+        Splits the rows into valid and invalid ones with a single vectorized pass over all the rules.
+
+        The invalid rows are kept in `df_invalid`, with the rules they break in a type_error column.
+
+        Returns:
+            pd.DataFrame: The valid rows, cast to the declared schema.
+        """
+        logging.info("Starting validate method.")
+        masks = self.rule_masks()
+        rules = list(masks)
+        broken = np.column_stack([masks[rule] for rule in rules]) if len(self.df) else np.zeros((0, len(rules)), dtype=bool)
+        invalid = broken.any(axis=1)
+        if invalid.any():
+            self.type_error = [rule for rule, column in zip(rules, broken.T) if column.any()]
+            self.df_invalid = self.df[invalid].assign(
+                type_error=[', '.join(rule for rule, is_broken in zip(rules, row) if is_broken) for row in broken[invalid]]
+            )
+            logging.error(f"{int(invalid.sum())} invalid rows found: {', '.join(self.type_error)}")
+        valid = self.df[~invalid]
+        logging.info("Finished validate method.")
+        return apply_schema(valid) if 'Date' in valid.columns else valid
+
+    def screen_anomalies(self, valid: pd.DataFrame, ticker_symbol: str) -> pd.DataFrame:
+        """
+        Moves the valid rows flagged by the anomaly detector to `df_invalid`, the reasons in type_error.
+
+        Returns:
+            pd.DataFrame: The valid rows that are not anomalous.
+        """
+        reasons = self.detector.screen(ticker_symbol, valid)
+        anomalous = (reasons != '').to_numpy()
+        if not anomalous.any():
+            return valid
+        anomalies = valid[anomalous].assign(type_error='Anomaly: ' + reasons[anomalous])
+        self.df_invalid = pd.concat([self.df_invalid, anomalies]) if not self.df_invalid.empty else anomalies
+        self.type_error.append('Anomaly')
+        logging.error(f"{int(anomalous.sum())} anomalous rows found for {ticker_symbol}: {', '.join(reasons[anomalous].unique())}")
+        return valid[~anomalous]
+
     def process(self):
         logging.info("Starting process method.")
+        if self.vectorized:
+            # Only the invalid rows are rejected, so that one bad row does not drop a whole history
+            self.df = self.validate()
+            if self.detector is not None and self.ticker is not None and not self.df.empty:
+                self.df = self.screen_anomalies(self.df, self.ticker)
+            if not self.df_invalid.empty:
+                self.save_invalid_data()
+            logging.info("Finished process method.")
+            return self.df
+
         self.check_legal_characters()
         if self.type_error:
             self.df['type_error'] = ', '.join(self.type_error)
@@ -97,3 +257,74 @@ class StockDataETL:
         
         logging.info("Finished process method.")
         return self.df
+
+
+class PanelETL:
+    """
+    Validates the new rows of all the tickers at once, as a single panel keyed by (ticker, Date).
+
+    The rules of the vectorized StockDataETL are evaluated in one pass over the whole panel,
+    instead of building and running one validator per ticker. The valid rows of each ticker are
+    then screened by the anomaly detector, if any.
+
+    Attributes:
+        panel (pd.DataFrame): The rows of all the tickers, with a ticker column.
+        quarantine (QuarantineStore): Store the invalid rows are appended to.
+        detector (AnomalyDetector): Detector screening the valid rows of each ticker, if any.
+        summary (pd.DataFrame): After `process`, per ticker: rows checked, invalid rows and rules broken.
+    """
+
+    def __init__(self, panel: pd.DataFrame, quarantine: Optional[QuarantineStore] = None, detector=None):
+        self.panel = panel
+        self.quarantine = quarantine if quarantine is not None else QuarantineStore()
+        self.detector = detector
+        self.summary = pd.DataFrame(columns=['rows', 'invalid', 'errors'])
+
+    @classmethod
+    def from_frames(cls, frames: Dict[str, pd.DataFrame], all_rows: bool = True,
+                    quarantine: Optional[QuarantineStore] = None, detector=None) -> "PanelETL":
+        """
+        Builds the panel from the frame of each ticker.
+
+        Args:
+            frames (Dict[str, pd.DataFrame]): The new rows of each ticker.
+            all_rows (bool): If False, only the last row of each ticker is checked.
+            quarantine (QuarantineStore, optional): Store the invalid rows are appended to.
+            detector (AnomalyDetector, optional): Detector screening the valid rows of each ticker.
+        """
+        parts = [(frame if all_rows else frame.tail(1)).assign(ticker=ticker) for ticker, frame in frames.items()]
+        panel = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=['ticker', 'Date'])
+        return cls(panel, quarantine, detector)
+
+    def process(self) -> Dict[str, pd.DataFrame]:
+        """
+        Validates the panel, quarantines the invalid rows and summarizes the errors per ticker.
+
+        Returns:
+            Dict[str, pd.DataFrame]: The valid rows of each ticker with at least one, without the ticker column.
+        """
+        logging.info(f"Starting panel validation of {len(self.panel)} rows.")
+        etl = StockDataETL(self.panel, all_rows=True, vectorized=True, quarantine=self.quarantine, detector=self.detector)
+        valid = etl.validate()
+        if self.detector is not None and not valid.empty:
+            valid = pd.concat([etl.screen_anomalies(rows, ticker) for ticker, rows in valid.groupby('ticker', sort=False)])
+        invalid = etl.df_invalid
+        if not invalid.empty:
+            self.quarantine.append(invalid)
+
+        tickers = self.panel['ticker']
+        summary = pd.DataFrame({'rows': tickers.value_counts(sort=False)})
+        if invalid.empty:
+            summary['invalid'] = 0
+            summary['errors'] = ''
+        else:
+            grouped = invalid.groupby('ticker', sort=False)['type_error']
+            summary['invalid'] = grouped.size().reindex(summary.index, fill_value=0)
+            rules = grouped.agg(lambda errors: ', '.join(sorted({rule for error in errors for rule in error.split(', ')})))
+            summary['errors'] = rules.reindex(summary.index, fill_value='')
+            logging.error(f"Invalid rows found for {int((summary['invalid'] > 0).sum())} tickers.")
+        self.summary = summary.rename_axis('ticker')
+
+        logging.info("Finished panel validation.")
+        return {ticker: rows.drop(columns='ticker').reset_index(drop=True)
+                for ticker, rows in valid.groupby('ticker', sort=False)}
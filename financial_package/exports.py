@@ -0,0 +1,175 @@
+import os
+import gzip
+import time
+import shutil
+import logging
+import tempfile
+import zipfile
+from typing import Callable, Dict, Iterable, Optional
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from financial_package.schema import apply_schema
+
+# Width of the text columns (tickers) in the columnar exports, which need a fixed-width dtype
+TEXT_WIDTH = 32
+
+
+def _cell_values(batch: pd.DataFrame) -> Iterable[tuple]:
+    # Python values, missing ones as None, so that openpyxl writes empty cells rather than NaN
+    return batch.astype(object).where(batch.notna(), None).itertuples(index=False, name=None)
+
+
+def write_xlsx(batches: Iterable[pd.DataFrame], path: str) -> int:
+    """
+    Writes the batches to an Excel file with one sheet per ticker, in constant memory.
+
+    The workbook is opened in write-only mode: each row is serialized as soon as it is appended,
+    so only the current batch is held in memory. The batches must be ordered by ticker; without a
+    ticker column, all the rows go to a single "Data" sheet.
+
+    Args:
+        batches (Iterable[pd.DataFrame]): The rows to write, with a leading ticker column.
+        path (str): The path of the Excel file.
+
+    Returns:
+        int: The number of rows written.
+    """
+    workbook = Workbook(write_only=True)
+    sheet, sheet_name, rows = None, None, 0
+    for batch in batches:
+        if "ticker" not in batch.columns:
+            batch = batch.assign(ticker="Data")
+        for ticker, group in batch.groupby("ticker", sort=False):
+            if ticker != sheet_name:
+                sheet, sheet_name = workbook.create_sheet(title=str(ticker)), ticker
+                sheet.append([col for col in group.columns if col != "ticker"])
+            for values in _cell_values(group.drop(columns="ticker")):
+                sheet.append(values)
+            rows += len(group)
+    if sheet is None:
+        info = workbook.create_sheet(title="Info")
+        info.append(["Info"])
+        info.append(["No data available for any table"])
+        logging.info("No data available for any table, created Info sheet.")
+    workbook.save(path)
+    return rows
+
+
+def write_csv(batches: Iterable[pd.DataFrame], path: str, compress: bool = False) -> int:
+    """
+    Writes the batches to a CSV file, gzip-compressed if `compress` is set, one batch at a time.
+
+    Returns:
+        int: The number of rows written.
+    """
+    rows = 0
+    with (gzip.open(path, "wt", newline="") if compress else open(path, "w", newline="")) as f:
+        for batch in batches:
+            batch.to_csv(f, index=False, header=rows == 0)
+            rows += len(batch)
+    return rows
+
+
+def write_npz(batches: Iterable[pd.DataFrame], path: str) -> int:
+    """
+    Writes the batches to a compressed NumPy archive holding one typed array per column.
+
+    The archive is read back with `np.load`. The values of each column are spooled to a raw
+    file as the batches arrive, then copied into the archive once the row count is known, so
+    memory use does not depend on the number of rows. The dtypes are those of the schema.
+
+    Returns:
+        int: The number of rows written.
+    """
+    rows = 0
+    dtypes, spools = {}, {}
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(path))) as spool_directory:
+        try:
+            for batch in batches:
+                batch = apply_schema(batch)
+                if not dtypes:
+                    dtypes = {col: _array_dtype(batch[col]) for col in batch.columns}
+                    spools = {col: open(os.path.join(spool_directory, f"{index}.raw"), "wb")
+                              for index, col in enumerate(dtypes)}
+                for col, dtype in dtypes.items():
+                    spools[col].write(np.ascontiguousarray(_to_array(batch[col], dtype)).tobytes())
+                rows += len(batch)
+        finally:
+            for spool in spools.values():
+                spool.close()
+
+        with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED, allowZip64=True) as archive:
+            for col, dtype in dtypes.items():
+                with archive.open(f"{col}.npy", "w", force_zip64=True) as entry, open(spools[col].name, "rb") as spool:
+                    header = {"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False, "shape": (rows,)}
+                    np.lib.format.write_array_header_1_0(entry, header)
+                    shutil.copyfileobj(spool, entry)
+    return rows
+
+
+def _array_dtype(column: pd.Series) -> np.dtype:
+    if pd.api.types.is_datetime64_any_dtype(column.dtype):
+        return np.dtype("datetime64[ns]")
+    if pd.api.types.is_numeric_dtype(column.dtype) or pd.api.types.is_bool_dtype(column.dtype):
+        return np.dtype(column.dtype)
+    return np.dtype(f"<U{TEXT_WIDTH}")
+
+
+def _to_array(column: pd.Series, dtype: np.dtype) -> np.ndarray:
+    if dtype.kind == "U":
+        return column.astype(str).to_numpy(dtype=dtype)
+    return column.to_numpy(dtype=dtype)
+
+
+EXPORT_FORMATS: Dict[str, Callable[[Iterable[pd.DataFrame], str], int]] = {
+    "xlsx": write_xlsx,
+    "csv": write_csv,
+    "csv.gz": lambda batches, path: write_csv(batches, path, compress=True),
+    "npz": write_npz,
+}
+
+
+def export_format(filename: str) -> str:
+    """
+    Returns the export format matching the extension of a file name.
+
+    Raises:
+        ValueError: If the extension is not one of the export formats.
+    """
+    for export_format_name in sorted(EXPORT_FORMATS, key=len, reverse=True):
+        if filename.endswith(f".{export_format_name}"):
+            return export_format_name
+    raise ValueError(f"Unknown export format for {filename}, expected one of {list(EXPORT_FORMATS)}")
+
+
+def write_export(batches: Iterable[pd.DataFrame], path: str, export_format_name: Optional[str] = None) -> dict:
+    """
+    Writes the batches to a file in the given format, and reports its size and write time.
+
+    Args:
+        batches (Iterable[pd.DataFrame]): The rows to write.
+        path (str): The path of the file.
+        export_format_name (str, optional): One of EXPORT_FORMATS. Defaults to the format of the extension.
+
+    Returns:
+        dict: The report of the export (path, format, rows, bytes, seconds).
+
+    Raises:
+        ValueError: If the format is unknown.
+    """
+    export_format_name = export_format_name or export_format(path)
+    if export_format_name not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format {export_format_name}, expected one of {list(EXPORT_FORMATS)}")
+    start = time.perf_counter()
+    rows = EXPORT_FORMATS[export_format_name](batches, path)
+    report = {
+        "path": path,
+        "format": export_format_name,
+        "rows": rows,
+        "bytes": os.path.getsize(path),
+        "seconds": time.perf_counter() - start
+    }
+    logging.info(f"Exported {rows} rows to {os.path.basename(path)} ({export_format_name}): "
+                 f"{report['bytes'] / 1e6:.2f} MB in {report['seconds']:.2f}s")
+    return report
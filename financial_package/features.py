@@ -0,0 +1,219 @@
+import logging
+from datetime import timedelta
+from typing import Dict, List, Optional
+import numpy as np
+import pandas as pd
+from financial_package.lake import CSVLake
+
+# Windows of the features, in trading days
+DEFAULT_FEATURE_WINDOWS = {
+    "volatility": [20],
+    "sma": [20, 50],
+    "ema": [12, 26],
+    "rsi": [14],
+    "atr": [14],
+    "volume_zscore": [20],
+}
+# Number of trading days per year, to annualize the volatility
+TRADING_DAYS = 252
+
+
+def rolling_sum(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Sums of the `window` last values at each row, NaN until a full window of non-missing values.
+    """
+    values = np.asarray(values, dtype="float64")
+    present = ~np.isnan(values)
+    sums = np.cumsum(np.where(present, values, 0.0))
+    counts = np.cumsum(present)
+    window_sums = sums - np.concatenate([np.zeros(min(window, len(values))), sums[:-window]])
+    window_counts = counts - np.concatenate([np.zeros(min(window, len(values)), dtype=int), counts[:-window]])
+    return np.where(window_counts == window, window_sums, np.nan)
+
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Simple moving average over `window` rows.
+    """
+    return rolling_sum(values, window) / window
+
+
+def rolling_std(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Sample standard deviation over `window` rows, from the rolling sums of the values and their squares.
+    """
+    values = np.asarray(values, dtype="float64")
+    # Centered first, so that the difference of the sums does not lose the precision of large values
+    values = values - np.nanmean(values) if len(values) and not np.isnan(values).all() else values
+    sums, squares = rolling_sum(values, window), rolling_sum(values ** 2, window)
+    variance = (squares - sums ** 2 / window) / (window - 1)
+    return np.sqrt(np.maximum(variance, 0.0))
+
+
+def exponential_mean(values: np.ndarray, alpha: float) -> np.ndarray:
+    """
+    Recursive exponential moving average, seeded with the first value.
+    """
+    return pd.Series(values, dtype="float64").ewm(alpha=alpha, adjust=False, ignore_na=True).mean().to_numpy(copy=True)
+
+
+def log_returns(close: np.ndarray) -> np.ndarray:
+    """
+    Daily log returns, NaN on the first row.
+    """
+    close = np.asarray(close, dtype="float64")
+    log_close = np.log(np.where(close > 0, close, np.nan))
+    return np.diff(log_close, prepend=np.nan)
+
+
+def rsi(close: np.ndarray, window: int) -> np.ndarray:
+    """
+    Relative strength index, with Wilder's smoothing of the gains and losses.
+    """
+    changes = np.diff(np.asarray(close, dtype="float64"), prepend=np.nan)
+    gains = exponential_mean(np.where(changes > 0, changes, 0.0), 1 / window)
+    losses = exponential_mean(np.where(changes < 0, -changes, 0.0), 1 / window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        values = 100 - 100 / (1 + gains / losses)
+    values = np.where(losses == 0, np.where(gains == 0, 50.0, 100.0), values)
+    values[:window] = np.nan
+    return values
+
+
+def atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, window: int) -> np.ndarray:
+    """
+    Average true range, with Wilder's smoothing.
+    """
+    high, low = np.asarray(high, dtype="float64"), np.asarray(low, dtype="float64")
+    previous_close = np.concatenate([[np.nan], np.asarray(close, dtype="float64")[:-1]])
+    true_range = np.fmax(high - low, np.fmax(np.abs(high - previous_close), np.abs(low - previous_close)))
+    values = exponential_mean(true_range, 1 / window)
+    values[:window - 1] = np.nan
+    return values
+
+
+def compute_features(history: pd.DataFrame, windows: Optional[Dict[str, List[int]]] = None) -> pd.DataFrame:
+    """
+    Computes the technical features of a daily history, one vectorized kernel per feature.
+
+    Args:
+        history (pd.DataFrame): History with Date, High, Low, Close and Volume columns.
+        windows (Dict[str, List[int]], optional): Windows of each feature. Defaults to DEFAULT_FEATURE_WINDOWS.
+
+    Returns:
+        pd.DataFrame: Date and one float64 column per feature (e.g. sma_20, rsi_14), sorted by date.
+    """
+    windows = windows or DEFAULT_FEATURE_WINDOWS
+    history = history.sort_values("Date").reset_index(drop=True)
+    close = history["Close"].to_numpy(dtype="float64")
+    returns = log_returns(close)
+    features = {"Date": history["Date"].to_numpy(), "log_return": returns}
+    for window in windows.get("volatility", []):
+        features[f"volatility_{window}"] = rolling_std(returns, window) * np.sqrt(TRADING_DAYS)
+    for window in windows.get("sma", []):
+        features[f"sma_{window}"] = rolling_mean(close, window)
+    for window in windows.get("ema", []):
+        features[f"ema_{window}"] = exponential_mean(close, 2 / (window + 1))
+    for window in windows.get("rsi", []):
+        features[f"rsi_{window}"] = rsi(close, window)
+    for window in windows.get("atr", []):
+        features[f"atr_{window}"] = atr(history["High"], history["Low"], close, window)
+    volume = history["Volume"].to_numpy(dtype="float64")
+    for window in windows.get("volume_zscore", []):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            features[f"volume_zscore_{window}"] = (volume - rolling_mean(volume, window)) / rolling_std(volume, window)
+    return pd.DataFrame(features)
+
+
+class FeatureStore:
+    """
+    Precomputed technical features of each ticker, stored in their own lake so that the training
+    jobs read them instead of recomputing them from the prices.
+
+    The features are built once from the whole price history, then updated incrementally: only the
+    rows after the last stored features are computed, from a warm-up tail of the price history long
+    enough for the recursive averages (EMA, RSI, ATR) to match a full recomputation.
+
+    Attributes:
+        lake (CSVLake): Lake the features are stored in, one history of features per ticker.
+        windows (Dict[str, List[int]]): Windows of each feature.
+        warmup (int): Number of price rows read before the first updated row.
+    """
+
+    def __init__(self, lake: CSVLake, windows: Optional[Dict[str, List[int]]] = None, warmup_factor: int = 10):
+        """
+        Args:
+            lake (CSVLake): Lake the features are stored in, distinct from the price lake.
+            windows (Dict[str, List[int]], optional): Windows of each feature. Defaults to DEFAULT_FEATURE_WINDOWS.
+            warmup_factor (int): Warm-up length, as a multiple of the longest window.
+        """
+        self.lake = lake
+        self.windows = windows or DEFAULT_FEATURE_WINDOWS
+        self.warmup = warmup_factor * max(window for feature_windows in self.windows.values() for window in feature_windows)
+
+    def build(self, ticker_symbol: str, history: pd.DataFrame) -> int:
+        """
+        Computes and stores the features of a whole price history, replacing the stored ones.
+
+        Returns:
+            int: The number of rows stored.
+        """
+        features = compute_features(history, self.windows)
+        self.lake.write(ticker_symbol, features)
+        logging.info(f"Built {len(features)} rows of features for {ticker_symbol}.")
+        return len(features)
+
+    def update(self, ticker_symbol: str, price_lake: CSVLake, overlap_days: int = 5, rebuild: bool = False) -> int:
+        """
+        Computes the features of the price rows appended since the last update, and stores them.
+
+        The rows of the last `overlap_days` days are computed again, to follow the revised prices.
+        The whole history is built if no features are stored yet.
+
+        Args:
+            ticker_symbol (str): The ticker to update.
+            price_lake (CSVLake): The lake of the prices.
+            overlap_days (int): Number of days before the last stored features computed again.
+            rebuild (bool): If True, the features are built again from the whole price history.
+
+        Returns:
+            int: The number of rows written.
+        """
+        last_date = None if rebuild else self.lake.last_date(ticker_symbol)
+        if last_date is None:
+            history = price_lake.read(ticker_symbol)
+            return self.build(ticker_symbol, history) if history is not None else 0
+
+        start = last_date - timedelta(days=overlap_days)
+        # Calendar days covering the warm-up trading days
+        history = price_lake.read_since(ticker_symbol, start - timedelta(days=2 * self.warmup + 10))
+        if history is None or history.empty:
+            return 0
+        features = compute_features(history, self.windows)
+        written_rows = self.lake.append(ticker_symbol, features[features["Date"] >= start])
+        logging.info(f"Updated the features of {ticker_symbol}: {written_rows} new or revised row(s).")
+        return written_rows
+
+    def update_all(self, tickers_list: List[str], price_lake: CSVLake, overlap_days: int = 5,
+                   rebuild: bool = False) -> Dict[str, int]:
+        """
+        Updates the features of several tickers, a failure being logged without stopping the others.
+
+        Returns:
+            Dict[str, int]: The number of rows written for each ticker updated.
+        """
+        written = {}
+        for ticker_symbol in tickers_list:
+            try:
+                written[ticker_symbol] = self.update(ticker_symbol, price_lake, overlap_days, rebuild)
+            except Exception as e:
+                logging.error(f"Failed to update the features of {ticker_symbol}: {e}")
+        return written
+
+    def read(self, ticker_symbol: str, columns: Optional[List[str]] = None, start=None) -> Optional[pd.DataFrame]:
+        """
+        Reads the stored features of a ticker, from `start` onwards if set.
+        """
+        if start is not None:
+            return self.lake.read_since(ticker_symbol, start, columns)
+        return self.lake.read(ticker_symbol, columns)
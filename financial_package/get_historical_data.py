@@ -1,17 +1,20 @@
 import os
 import yfinance as yf
-from datetime import datetime
+from datetime import datetime, timedelta
 import pandas as pd
 import random
-from typing import List
-from typing import Tuple
-
-import os
-import yfinance as yf
-from datetime import datetime
-import pandas as pd
-from typing import List
+from typing import Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import time
 import logging
+from financial_package.data_sources import YahooFinanceSource
+from financial_package.cache import FetchCache
+from financial_package.lake import CSVLake
+from financial_package.schema import apply_schema
+from financial_package.etl import StockDataETL, QuarantineStore
+from financial_package.anomalies import AnomalyDetector
+from financial_package.corporate_actions import ACTION_COLUMNS, new_actions, adjustment_factors, adjust_history
+from financial_package.rate_limit import AdaptiveRateLimiter, RetryPolicy, is_transient_error, is_throttling_error
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -23,30 +26,67 @@ class CAC40HistoricalData:
     Attributes:
         tickers_list (List[str]): List of stock symbols to retrieve.
         save_path (str): Path to the directory where CSV files will be saved.
+        data_source: Object providing `history` and `download` (YahooFinanceSource by default).
+        max_workers (int): Number of tickers fetched concurrently.
+        cache (FetchCache): Optional on-disk cache of the data source responses.
+        rate_limiter (AdaptiveRateLimiter): Optional limiter shared by all the fetch workers.
+        retry_policy (RetryPolicy): Optional backoff policy for the tickers failing with a transient error.
+        lake (CSVLake): Storage backend of the lake (CSV files in `save_path` by default).
+        validate (bool): If True, the fetched histories are validated before being saved.
+        quarantine (QuarantineStore): Store the rows rejected by the validation are appended to.
+        detector (AnomalyDetector): Detector screening the validated rows for bad ticks, if any.
     """
 
-    def __init__(self, tickers_list: List[str], save_path: str = "."):
+    def __init__(self, tickers_list: List[str], save_path: str = ".", data_source=None, max_workers: int = 1,
+                 cache: Optional[FetchCache] = None, rate_limiter: Optional[AdaptiveRateLimiter] = None,
+                 retry_policy: Optional[RetryPolicy] = None, lake: Optional[CSVLake] = None,
+                 validate: bool = False, quarantine: Optional[QuarantineStore] = None,
+                 detector: Optional[AnomalyDetector] = None):
         """
         Initializes the class with a list of stock symbols and a save path.
 
         Args:
             tickers_list (List[str]): List of stock symbols to retrieve.
             save_path (str): Path to the directory where CSV files will be saved.
+            data_source: Object providing `history` and `download`. Defaults to YahooFinanceSource.
+            max_workers (int): Number of tickers fetched concurrently (1 keeps the sequential behaviour).
+            cache (FetchCache, optional): On-disk cache of the data source responses.
+            rate_limiter (AdaptiveRateLimiter, optional): Limiter shared by all the fetch workers.
+            retry_policy (RetryPolicy, optional): Backoff policy for the tickers failing with a transient
+                error; they are requeued at the end of the run instead of being dropped.
+            lake (CSVLake, optional): Storage backend of the lake. Defaults to CSV files in `save_path`.
+            validate (bool): If True, the fetched histories are validated with the vectorized checks
+                of StockDataETL before being saved; the invalid rows are left out of the lake.
+            quarantine (QuarantineStore, optional): Store the rejected rows are appended to.
+                Defaults to the store of StockDataETL.
+            detector (AnomalyDetector, optional): Detector screening the validated rows for bad ticks;
+                the anomalous rows are quarantined with the invalid ones.
         """
         self.tickers_list = tickers_list
         self.save_path = save_path
+        self.data_source = data_source if data_source is not None else YahooFinanceSource()
+        self.max_workers = max(1, max_workers)
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
+        self.validate = validate
+        self.quarantine = quarantine
+        self.detector = detector
 
         # Create the save directory if it doesn't exist
         if not os.path.exists(self.save_path):
             os.makedirs(self.save_path)
             logging.info(f"Created directory {self.save_path} for saving CSV files.")
+        self.lake = lake if lake is not None else CSVLake(self.save_path)
 
-    def fetch_data(self, ticker_symbol: str) -> pd.DataFrame:
+    def fetch_data(self, ticker_symbol: str, start: Optional[datetime] = None, end: Optional[datetime] = None) -> pd.DataFrame:
         """
         Retrieves historical data for a given stock symbol.
 
         Args:
             ticker_symbol (str): The stock symbol to process.
+            start (datetime, optional): First date to retrieve. If not set, the whole history is retrieved.
+            end (datetime, optional): Date after the last one to retrieve. Defaults to today.
         
         Returns:
             pd.DataFrame: A DataFrame containing the historical data, sorted by descending date.
@@ -55,16 +95,186 @@ class CAC40HistoricalData:
             Exception: If there is an error fetching data from yfinance.
         """
         try:
-            ticker = yf.Ticker(ticker_symbol)
-            data = ticker.history(period="max")
-            data.index = data.index.tz_localize(None)
-            data = self.clean_columns(data, ticker_symbol)
+            if start is None:
+                request = {"period": "max"}
+            else:
+                request = {
+                    "start": start.strftime("%Y-%m-%d"),
+                    "end": end.strftime("%Y-%m-%d") if end is not None else None
+                }
+            data = self.cached_history(ticker_symbol, **request)
+            data = self.prepare_data(data, ticker_symbol)
             logging.info(f"Successfully fetched data for {ticker_symbol}.")
             return data
         except Exception as e:
             logging.error(f"Error fetching data for {ticker_symbol}: {e}")
             raise
 
+    def cached_history(self, ticker_symbol: str, **request) -> pd.DataFrame:
+        """
+        Requests the data source, going through the fetch cache when one is configured.
+
+        Args:
+            ticker_symbol (str): The stock symbol to retrieve.
+            **request: Arguments of the `history` request (period, start, end).
+
+        Returns:
+            pd.DataFrame: The raw history returned by the data source.
+        """
+        if self.cache is None:
+            return self.call_source(self.data_source.history, ticker_symbol, **request)
+
+        key = self.cache.make_key(ticker_symbol, "1d", request.get("start"), request.get("end"), request.get("period"))
+        data = self.cache.get(key)
+        if data is not None:
+            logging.info(f"Served {ticker_symbol} from the fetch cache.")
+            return data
+        data = self.call_source(self.data_source.history, ticker_symbol, **request)
+        self.cache.put(key, data)
+        return data
+
+    def call_source(self, method, *args, **kwargs):
+        """
+        Calls a data source method, waiting for the rate limiter and reporting throttling to it.
+        """
+        if self.rate_limiter is None:
+            return method(*args, **kwargs)
+
+        self.rate_limiter.acquire()
+        try:
+            result = method(*args, **kwargs)
+        except Exception as e:
+            if is_throttling_error(e):
+                self.rate_limiter.record_throttle()
+            raise
+        self.rate_limiter.record_success()
+        return result
+
+    def fetch_since(self, ticker_symbol: str, last_date: Optional[datetime] = None, overlap_days: int = 5) -> pd.DataFrame:
+        """
+        Retrieves only the data missing after the last stored date of a stock symbol.
+
+        A few days before the watermark are requested again to pick up revised values.
+
+        Args:
+            ticker_symbol (str): The stock symbol to process.
+            last_date (datetime, optional): The last stored date. If not set, the whole history is retrieved.
+            overlap_days (int): Number of days before `last_date` requested again.
+
+        Returns:
+            pd.DataFrame: The data from `last_date - overlap_days` onwards.
+        """
+        if last_date is None or pd.isna(last_date):
+            return self.fetch_data(ticker_symbol)
+        start = pd.Timestamp(last_date).normalize() - timedelta(days=overlap_days)
+        return self.fetch_data(ticker_symbol, start=start)
+
+    def fetch_batch(self, tickers_list: Optional[List[str]] = None, batch_size: int = 20) -> Dict[str, pd.DataFrame]:
+        """
+        Retrieves historical data for several stock symbols with one download per batch.
+
+        With a retry policy, a batch download failing with a transient error (throttling, timeout)
+        is retried with an exponential backoff; a batch still failing is logged and skipped.
+
+        Args:
+            tickers_list (List[str], optional): The stock symbols to process. Defaults to all tickers.
+            batch_size (int): Number of symbols requested in a single download.
+
+        Returns:
+            Dict[str, pd.DataFrame]: The cleaned data of each symbol that was successfully fetched.
+        """
+        tickers_list = self.tickers_list if tickers_list is None else tickers_list
+        results = {}
+        for start in range(0, len(tickers_list), batch_size):
+            batch = tickers_list[start:start + batch_size]
+            try:
+                batch_data = self.download_batch(batch)
+            except Exception as e:
+                logging.error(f"Error fetching batch {batch}: {e}")
+                continue
+            for ticker_symbol in batch:
+                if ticker_symbol not in batch_data:
+                    logging.error(f"Error fetching data for {ticker_symbol}: missing from batch download.")
+                    continue
+                try:
+                    results[ticker_symbol] = self.prepare_data(batch_data[ticker_symbol], ticker_symbol)
+                    logging.info(f"Successfully fetched data for {ticker_symbol}.")
+                except Exception as e:
+                    logging.error(f"Error fetching data for {ticker_symbol}: {e}")
+        return results
+
+    def download_batch(self, batch: List[str]) -> Dict[str, pd.DataFrame]:
+        """
+        Downloads the whole history of a batch of symbols, retrying transient failures per the retry policy.
+
+        Raises:
+            Exception: The error of the last attempt, or the first non-transient error.
+        """
+        return self.call_with_retries(self.call_source, self.data_source.download, batch, period="max")
+
+    def call_with_retries(self, func, *args, **kwargs):
+        """
+        Calls `func`, retrying it after transient errors (throttling, timeout) per the retry policy.
+
+        Raises:
+            Exception: The error of the last attempt, or the first non-transient error.
+        """
+        attempt = 0
+        while True:
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                if (self.retry_policy is None or attempt + 1 >= self.retry_policy.max_attempts
+                        or not is_transient_error(e)):
+                    raise
+                delay = self.retry_policy.delay(attempt)
+                logging.warning(f"Transient error, retrying in {delay:.1f}s "
+                                f"(attempt {attempt + 2}/{self.retry_policy.max_attempts}): {e}")
+                time.sleep(delay)
+                attempt += 1
+
+    def fetch_all(self, tickers_list: Optional[List[str]] = None, max_workers: Optional[int] = None,
+                  watermarks: Optional[Dict[str, datetime]] = None, overlap_days: int = 5) -> Dict[str, pd.DataFrame]:
+        """
+        Retrieves historical data for several stock symbols concurrently.
+
+        A failure on one symbol is logged and does not affect the others.
+
+        Args:
+            tickers_list (List[str], optional): The stock symbols to process. Defaults to all tickers.
+            max_workers (int, optional): Number of concurrent fetches. Defaults to `self.max_workers`.
+            watermarks (Dict[str, datetime], optional): Last stored date of each symbol. When given,
+                only the missing range is retrieved (see `fetch_since`).
+            overlap_days (int): Number of days before each watermark requested again.
+
+        Returns:
+            Dict[str, pd.DataFrame]: The data of each symbol that was successfully fetched.
+        """
+        tickers_list = self.tickers_list if tickers_list is None else tickers_list
+        if watermarks is None:
+            func = self.fetch_data
+        else:
+            def func(ticker_symbol):
+                return self.fetch_since(ticker_symbol, watermarks.get(ticker_symbol), overlap_days)
+        return self._run_concurrently(func, tickers_list, max_workers, "Failed to fetch data")
+
+    def validate_data(self, data: pd.DataFrame, ticker_symbol: str) -> pd.DataFrame:
+        """
+        Returns the valid rows of a fetched history if validation is enabled, the history itself otherwise.
+        """
+        if not self.validate:
+            return data
+        logging.info(f"Validating {len(data)} rows for {ticker_symbol}.")
+        return StockDataETL(data, all_rows=True, vectorized=True, ticker=ticker_symbol,
+                            quarantine=self.quarantine, detector=self.detector).process()
+
+    def prepare_data(self, data: pd.DataFrame, ticker_symbol: str) -> pd.DataFrame:
+        """
+        Turns a raw history returned by the data source into the lake format.
+        """
+        data.index = data.index.tz_localize(None)
+        return self.clean_columns(data, ticker_symbol)
+
     def save_to_csv(self, data: pd.DataFrame, ticker_symbol: str) -> None:
         """
         Saves the data to a CSV file, named after the stock symbol.
@@ -86,30 +296,283 @@ class CAC40HistoricalData:
             logging.error(f"Error saving data for {ticker_symbol} to CSV: {e}")
             raise
 
+    def save_data(self, data: pd.DataFrame, ticker_symbol: str) -> None:
+        """
+        Saves the data to the lake, in the format of the configured lake backend.
+
+        Args:
+            data (pd.DataFrame): The data to save.
+            ticker_symbol (str): The stock symbol the data belongs to.
+
+        Raises:
+            Exception: If there is an error saving the data.
+        """
+        try:
+            data = self.clean_columns(data, ticker_symbol)
+            self.lake.write(ticker_symbol, data)
+            logging.info(f"Saved historical data for {ticker_symbol} in {self.lake.path(ticker_symbol)}")
+        except Exception as e:
+            logging.error(f"Error saving data for {ticker_symbol} to the {self.lake.format_name} lake: {e}")
+            raise
+
+    def append_data(self, data: pd.DataFrame, ticker_symbol: str) -> int:
+        """
+        Appends new rows to the lake without rewriting the stored history.
+
+        Rows already stored with the same values are skipped (see `CSVLake.append`).
+
+        Args:
+            data (pd.DataFrame): The newly fetched data.
+            ticker_symbol (str): The stock symbol the data belongs to.
+
+        Returns:
+            int: The number of rows written.
+
+        Raises:
+            Exception: If there is an error saving the data.
+        """
+        try:
+            data = self.clean_columns(data, ticker_symbol)
+            written_rows = self.lake.append(ticker_symbol, data)
+            logging.info(f"Appended {written_rows} new row(s) for {ticker_symbol} to {self.lake.path(ticker_symbol)}")
+            return written_rows
+        except Exception as e:
+            logging.error(f"Error appending data for {ticker_symbol} to the {self.lake.format_name} lake: {e}")
+            raise
+
+    def readjust_history(self, data: pd.DataFrame, ticker_symbol: str) -> Optional[pd.DataFrame]:
+        """
+        Re-adjusts the stored history of a stock symbol for the splits and dividends of newly fetched rows.
+
+        The data source returns histories adjusted for the corporate actions known at the time of the
+        fetch, so a new action makes the stored rows before it inconsistent with the new ones. Only
+        the history of this symbol is rewritten, with the factors of the new actions applied in one
+        vectorized pass. Must be called before the new rows are appended.
+
+        Args:
+            data (pd.DataFrame): The newly fetched rows.
+            ticker_symbol (str): The stock symbol the rows belong to.
+
+        Returns:
+            pd.DataFrame: Date, price_factor and volume_factor of the new actions, or None if there are none.
+        """
+        columns = [col for col in ACTION_COLUMNS if col in data.columns]
+        if not columns or data.empty or not self.lake.exists(ticker_symbol):
+            return None
+        actions = data[(data[columns].fillna(0) != 0).any(axis=1)]
+        if actions.empty:
+            return None
+        # The stored rows from a few days before the first action, for the close preceding it
+        stored = self.lake.read_since(ticker_symbol, actions["Date"].min() - timedelta(days=10))
+        actions = new_actions(actions, stored)
+        if actions.empty:
+            return None
+
+        history = self.lake.read(ticker_symbol)
+        factors = adjustment_factors(actions, history)
+        factors = factors[(factors["price_factor"] != 1) | (factors["volume_factor"] != 1)]
+        if factors.empty:
+            return None
+        logging.info(f"New corporate action(s) for {ticker_symbol} on {[day.strftime('%Y-%m-%d') for day in actions['Date']]}, "
+                     f"re-adjusting its stored history.")
+        self.save_data(adjust_history(history, factors), ticker_symbol)
+        return factors
+
+    def backfill_gaps(self, scan: Dict[str, dict], max_span_days: int = 31,
+                      max_workers: Optional[int] = None) -> Dict[str, pd.DataFrame]:
+        """
+        Fetches and stores only the missing trading days of each stock symbol.
+
+        The missing ranges of a symbol closer than `max_span_days` are requested together, so that
+        a few scattered missing days cost a few small requests instead of a `period="max"` refetch.
+        Only the rows of the missing days are validated and appended to the lake. A symbol failing
+        with a transient error is requeued like in `fetch_all`, the spans already fetched being kept.
+
+        Args:
+            scan (Dict[str, dict]): The gap scan of the lake (see `trading_calendar.scan_gaps`): the
+                missing days and the missing ranges of each stock symbol.
+            max_span_days (int): Maximum number of days between two ranges requested together.
+            max_workers (int, optional): Number of symbols repaired concurrently. Defaults to `self.max_workers`.
+
+        Returns:
+            Dict[str, pd.DataFrame]: The rows written for each repaired symbol, to be loaded in the database.
+        """
+        # Rows of the missing days of each fetched span, kept across the retries of its symbol
+        fetched = {}
+
+        def repair(ticker_symbol):
+            missing_days = pd.DatetimeIndex(scan[ticker_symbol]["missing"])
+            spans = self._request_spans(scan[ticker_symbol]["ranges"], max_span_days)
+            for start, end in spans:
+                if (ticker_symbol, start) not in fetched:
+                    # `end` is excluded by the data source; the transient errors are retried by `_run_concurrently`
+                    data = self.fetch_data(ticker_symbol, start, end + timedelta(days=1))
+                    fetched[ticker_symbol, start] = data[data["Date"].dt.normalize().isin(missing_days)]
+            frames = [fetched.pop((ticker_symbol, start)) for start, _ in spans]
+            data = self.validate_data(pd.concat(frames, ignore_index=True), ticker_symbol)
+            self.append_data(data, ticker_symbol)
+            logging.info(f"Backfilled {len(data)}/{len(missing_days)} missing day(s) of {ticker_symbol} "
+                         f"in {len(spans)} request(s).")
+            return data
+
+        tickers_list = [ticker_symbol for ticker_symbol, result in scan.items() if result["ranges"]]
+        repaired = self._run_concurrently(repair, tickers_list, max_workers, "Failed to backfill the gaps")
+        return {ticker_symbol: data for ticker_symbol, data in repaired.items() if len(data)}
+
+    @staticmethod
+    def _request_spans(ranges: List[Tuple[pd.Timestamp, pd.Timestamp]],
+                       max_span_days: int) -> List[Tuple[pd.Timestamp, pd.Timestamp]]:
+        """
+        Merges the sorted missing ranges closer than `max_span_days` into request spans.
+        """
+        spans = []
+        for first, last in sorted(ranges):
+            if spans and (first - spans[-1][1]).days <= max_span_days:
+                spans[-1] = (spans[-1][0], max(spans[-1][1], last))
+            else:
+                spans.append((first, last))
+        return spans
+
+    def load_stored_data(self, ticker_symbol: str, columns: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+        """
+        Loads the data stored in the lake for a stock symbol.
+
+        Args:
+            ticker_symbol (str): The stock symbol to load.
+            columns (List[str], optional): Columns to load. Defaults to all columns.
+
+        Returns:
+            pd.DataFrame: The stored data, or None if nothing is stored for this symbol.
+        """
+        return self.lake.read(ticker_symbol, columns=columns)
+
+    def get_last_stored_date(self, ticker_symbol: str) -> Optional[pd.Timestamp]:
+        """
+        Returns the last `Date` stored in the lake for a stock symbol, or None if nothing is stored.
+        """
+        return self.lake.last_date(ticker_symbol)
+
     def clean_columns(self, data: pd.DataFrame, ticker_symbol : str) -> pd.DataFrame:
         """
         Clean and restructure columns to correct format
         """
         try :
-            data.reset_index(inplace=True)  # Reset the index to make 'Date' a column
+            if 'Date' not in data.columns:
+                data.reset_index(inplace=True)  # Reset the index to make 'Date' a column
             data = data.rename(columns={"Stock Splits": "Stock_Splits"})
             current_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             data['date_modification'] = current_date
             data['date_modification'] = pd.to_datetime(data['date_modification'])
-            return data
+            return apply_schema(data)
         except Exception as e:
             logging.error(f"Failed to format columns for {ticker_symbol}: {e}")
 
-    def process_and_save_all(self) -> None:
+    def process_ticker(self, ticker_symbol: str, incremental: bool = False, overlap_days: int = 5) -> None:
+        """
+        Fetches and saves historical data for a single stock symbol.
+
+        Args:
+            ticker_symbol (str): The stock symbol to process.
+            incremental (bool): If True, only the range after the last stored date is fetched
+                and appended to the stored history.
+            overlap_days (int): Number of days before the last stored date fetched again.
+        """
+        if not incremental:
+            data = self.fetch_data(ticker_symbol)
+            self.save_data(self.validate_data(data, ticker_symbol), ticker_symbol)
+            return
+
+        last_date = self.get_last_stored_date(ticker_symbol)
+        data = self.fetch_since(ticker_symbol, last_date, overlap_days)
+        self.readjust_history(data, ticker_symbol)
+        self.append_data(self.validate_data(data, ticker_symbol), ticker_symbol)
+
+    def process_and_save_all(self, max_workers: Optional[int] = None, batch_size: Optional[int] = None,
+                             incremental: bool = False, overlap_days: int = 5) -> None:
         """
         Processes and saves historical data for all stock symbols in the list.
+
+        Args:
+            max_workers (int, optional): Number of tickers processed concurrently. Defaults to `self.max_workers`.
+            batch_size (int, optional): If set, downloads the symbols in batches of this size
+                instead of one request per symbol.
+            incremental (bool): If True, only the data after the last date stored in the lake is fetched.
+            overlap_days (int): Number of days before the last stored date fetched again in incremental mode.
         """
-        for ticker_symbol in self.tickers_list:
-            try:
-                data = self.fetch_data(ticker_symbol)
-                self.save_to_csv(data, ticker_symbol)
-            except Exception as e:
-                logging.error(f"Failed to process and save data for {ticker_symbol}: {e}")
+        if incremental:
+            def process_ticker(ticker_symbol):
+                self.process_ticker(ticker_symbol, incremental=True, overlap_days=overlap_days)
+            self._run_concurrently(process_ticker, self.tickers_list, max_workers, "Failed to process and save data")
+            return
+        if batch_size:
+            for ticker_symbol, data in self.fetch_batch(batch_size=batch_size).items():
+                try:
+                    self.save_data(self.validate_data(data, ticker_symbol), ticker_symbol)
+                except Exception as e:
+                    logging.error(f"Failed to process and save data for {ticker_symbol}: {e}")
+            return
+        self._run_concurrently(self.process_ticker, self.tickers_list, max_workers, "Failed to process and save data")
+
+    def _run_concurrently(self, func, tickers_list: List[str], max_workers: Optional[int] = None,
+                          error_message: str = "Failed to process data") -> dict:
+        """
+        Applies `func` to every symbol on a thread pool, isolating and logging per-symbol failures.
+
+        With a retry policy, the symbols failing with a transient error are requeued and retried
+        after the rest of the run, with an exponential backoff between rounds.
+
+        Returns:
+            dict: The result of `func` for each symbol that succeeded.
+        """
+        max_workers = self.max_workers if max_workers is None else max(1, max_workers)
+        results = {}
+        pending = list(tickers_list)
+        attempt = 0
+        while pending:
+            can_retry = self.retry_policy is not None and attempt + 1 < self.retry_policy.max_attempts
+            pending = self._run_round(func, pending, max_workers, error_message, results, can_retry)
+            if pending:
+                delay = self.retry_policy.delay(attempt)
+                logging.warning(f"Requeued {len(pending)} ticker(s) after transient errors, retrying in {delay:.1f}s: {pending}")
+                time.sleep(delay)
+                attempt += 1
+        # Keep the order of the input list
+        return {ticker_symbol: results[ticker_symbol] for ticker_symbol in tickers_list if ticker_symbol in results}
+
+    def _run_round(self, func, tickers_list: List[str], max_workers: int, error_message: str,
+                   results: dict, can_retry: bool) -> List[str]:
+        """
+        Runs one pass of `func` over the symbols, storing the successes in `results`.
+
+        Returns:
+            List[str]: The symbols that failed with a transient error and should be retried.
+        """
+        retry = []
+
+        def handle_error(ticker_symbol, error):
+            if can_retry and is_transient_error(error):
+                logging.warning(f"{error_message} for {ticker_symbol}, will retry: {error}")
+                retry.append(ticker_symbol)
+            else:
+                logging.error(f"{error_message} for {ticker_symbol}: {error}")
+
+        if max_workers == 1:
+            for ticker_symbol in tickers_list:
+                try:
+                    results[ticker_symbol] = func(ticker_symbol)
+                except Exception as e:
+                    handle_error(ticker_symbol, e)
+            return retry
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(func, ticker_symbol): ticker_symbol for ticker_symbol in tickers_list}
+            for future in as_completed(futures):
+                ticker_symbol = futures[future]
+                try:
+                    results[ticker_symbol] = future.result()
+                except Exception as e:
+                    handle_error(ticker_symbol, e)
+        return [ticker_symbol for ticker_symbol in tickers_list if ticker_symbol in retry]
 
 
 class StockHistoricalData(CAC40HistoricalData):
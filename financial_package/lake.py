@@ -0,0 +1,822 @@
+import io
+import os
+import json
+import shutil
+import hashlib
+import threading
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterator, List, Optional
+import logging
+from financial_package.schema import apply_schema, read_dtypes
+
+# Columns ignored when deciding whether an incoming row differs from the stored one
+VOLATILE_COLUMNS = ("date_modification",)
+
+
+def content_hash(data: pd.DataFrame) -> str:
+    """
+    Returns a hash of the content of a history, ignoring the volatile columns.
+
+    Values are normalised before hashing (datetimes in nanoseconds, numbers as floats), so that
+    the same rows give the same hash whether they come from the data source or from a lake file.
+    """
+    hasher = hashlib.sha256()
+    for col in sorted(col for col in data.columns if col not in VOLATILE_COLUMNS):
+        values = data[col]
+        if pd.api.types.is_datetime64_any_dtype(values.dtype):
+            values = pd.Series(values.to_numpy(dtype="datetime64[ns]").view("int64"))
+        elif pd.api.types.is_numeric_dtype(values.dtype):
+            values = values.astype("float64")
+        else:
+            values = values.astype(str)
+        hasher.update(col.encode("utf-8"))
+        hasher.update(pd.util.hash_pandas_object(values, index=False).to_numpy().tobytes())
+    return hasher.hexdigest()
+
+
+class LakeManifest:
+    """
+    Index of the lake, stored as `_manifest.json` alongside the histories.
+
+    Each stock symbol has an entry with its row count, min/max `Date`, column dtypes, size on
+    disk, modification time and content hash, plus the hash last loaded into each database.
+    Readers can thus skip unchanged histories and derive table structures without reading data.
+    """
+
+    def __init__(self, path: str):
+        """
+        Initializes the manifest, loading it from `path` if it exists.
+
+        Args:
+            path (str): Path to the manifest file.
+        """
+        self.path = path
+        self._lock = threading.RLock()
+        self._entries = self._load()
+
+    def get(self, ticker_symbol: str) -> Optional[dict]:
+        """
+        Returns a copy of the entry of a stock symbol, or None if it is not indexed.
+        """
+        with self._lock:
+            entry = self._entries.get(ticker_symbol)
+            return json.loads(json.dumps(entry)) if entry is not None else None
+
+    def tickers(self) -> List[str]:
+        """
+        Returns the indexed stock symbols, sorted.
+        """
+        with self._lock:
+            return sorted(self._entries)
+
+    def update(self, ticker_symbol: str, **fields) -> dict:
+        """
+        Updates the entry of a stock symbol and saves the manifest.
+
+        Returns:
+            dict: The updated entry.
+        """
+        with self._lock:
+            entry = self._entries.setdefault(ticker_symbol, {"loaded": {}})
+            entry.update(fields)
+            self._save()
+            return dict(entry)
+
+    def remove(self, ticker_symbol: str) -> None:
+        """
+        Removes the entry of a stock symbol.
+        """
+        with self._lock:
+            if self._entries.pop(ticker_symbol, None) is not None:
+                self._save()
+
+    def is_loaded(self, ticker_symbol: str, target: str) -> bool:
+        """
+        Tells whether the current content of a stock symbol was loaded into `target`.
+        """
+        with self._lock:
+            entry = self._entries.get(ticker_symbol)
+            return entry is not None and entry.get("loaded", {}).get(target) == entry.get("hash")
+
+    def mark_loaded(self, ticker_symbol: str, target: str, loaded_hash: str) -> None:
+        """
+        Records that the content with hash `loaded_hash` of a stock symbol was loaded into `target`.
+        """
+        with self._lock:
+            entry = self._entries.setdefault(ticker_symbol, {"loaded": {}})
+            entry.setdefault("loaded", {})[target] = loaded_hash
+            self._save()
+
+    def _load(self) -> dict:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f).get("tickers", {})
+        except (OSError, ValueError) as e:
+            logging.warning(f"Unreadable lake manifest {self.path}, it will be rebuilt: {e}")
+            return {}
+
+    def _save(self) -> None:
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"version": 1, "tickers": self._entries}, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
+class CSVLake:
+    """
+    Data lake storing the history of each stock symbol in a `<TICKER>_Historical_Data.csv` file.
+
+    New rows can be appended without rewriting the history: they are written as small segment
+    files in `_segments/<TICKER>/`, which are merged on read (a segment row replaces the stored row
+    with the same `Date`) and periodically compacted into the main file.
+
+    Every write is recorded in the lake manifest (see LakeManifest).
+
+    Attributes:
+        save_path (str): Path to the directory of the lake.
+        compact_after (int): Number of segments of a stock symbol that triggers its compaction.
+        manifest (LakeManifest): Index of the stored histories.
+    """
+
+    format_name = "csv"
+    suffix = "_Historical_Data.csv"
+    segment_suffix = ".csv"
+    SEGMENTS_DIRECTORY = "_segments"
+    COMPACTED_MARKER = "_compacted"
+    MANIFEST_FILENAME = "_manifest.json"
+
+    def __init__(self, save_path: str = ".", compact_after: int = 20):
+        """
+        Initializes the lake, creating its directory if needed.
+
+        Args:
+            save_path (str): Path to the directory of the lake.
+            compact_after (int): Number of segments of a stock symbol that triggers its compaction.
+        """
+        self.save_path = save_path
+        self.compact_after = compact_after
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        if not os.path.exists(self.save_path):
+            os.makedirs(self.save_path)
+            logging.info(f"Created directory {self.save_path} for the data lake.")
+        self.manifest = LakeManifest(os.path.join(self.save_path, self.MANIFEST_FILENAME))
+
+    def path(self, ticker_symbol: str) -> str:
+        """
+        Returns the path where the history of a stock symbol is stored.
+        """
+        return os.path.join(self.save_path, f"{ticker_symbol}{self.suffix}")
+
+    def segments_path(self, ticker_symbol: str) -> str:
+        """
+        Returns the directory holding the appended segments of a stock symbol.
+        """
+        return os.path.join(self.save_path, self.SEGMENTS_DIRECTORY, ticker_symbol)
+
+    def exists(self, ticker_symbol: str) -> bool:
+        """
+        Tells whether a history is stored for a stock symbol.
+        """
+        return os.path.exists(self.path(ticker_symbol)) or bool(self.segment_files(ticker_symbol))
+
+    def tickers(self) -> List[str]:
+        """
+        Returns the stock symbols stored in the lake, sorted.
+        """
+        tickers = {entry[:-len(self.suffix)] for entry in os.listdir(self.save_path) if entry.endswith(self.suffix)}
+        segments_root = os.path.join(self.save_path, self.SEGMENTS_DIRECTORY)
+        if os.path.isdir(segments_root):
+            tickers.update(entry for entry in os.listdir(segments_root) if self.segment_files(entry))
+        return sorted(tickers)
+
+    def segment_files(self, ticker_symbol: str) -> List[str]:
+        """
+        Returns the paths of the live segments of a stock symbol, oldest first.
+        """
+        directory = self.segments_path(ticker_symbol)
+        if not os.path.isdir(directory):
+            return []
+        compacted = self._compacted_sequence(ticker_symbol)
+        segments = []
+        for entry in os.listdir(directory):
+            if entry.endswith(self.segment_suffix) and entry[:-len(self.segment_suffix)].isdigit():
+                sequence = int(entry[:-len(self.segment_suffix)])
+                if sequence > compacted:
+                    segments.append((sequence, os.path.join(directory, entry)))
+        return [path for _, path in sorted(segments)]
+
+    def read(self, ticker_symbol: str, columns: Optional[List[str]] = None, parse_dates: bool = True) -> Optional[pd.DataFrame]:
+        """
+        Reads the stored history of a stock symbol, appended segments included.
+
+        Args:
+            ticker_symbol (str): The stock symbol to read.
+            columns (List[str], optional): Columns to read. Defaults to all columns.
+            parse_dates (bool): If True, `Date` and `date_modification` are parsed as datetimes.
+
+        Returns:
+            pd.DataFrame: The stored history, or None if nothing is stored for this symbol.
+        """
+        if not self.exists(ticker_symbol):
+            return None
+        read_columns = columns if columns is None or "Date" in columns else ["Date"] + list(columns)
+        parts = []
+        if os.path.exists(self.path(ticker_symbol)):
+            parts.append(self._read_file(self.path(ticker_symbol), read_columns, parse_dates))
+        segments = self.segment_files(ticker_symbol)
+        parts.extend(self._read_file(path, read_columns, parse_dates) for path in segments)
+        data = self._merge(parts) if segments else parts[0]
+        return data if columns is None else data[list(columns)]
+
+    def iter_chunks(self, ticker_symbol: str, chunk_size: int = 50000,
+                    columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+        """
+        Reads the stored history of a stock symbol in typed chunks of at most `chunk_size` rows.
+
+        Only one chunk of the main file is held in memory at a time, plus the appended segments,
+        which are small: the rows of the main file replaced by a segment are left out, and the
+        segment rows are added to the last chunk. A history shorter than a chunk is read as one
+        chunk, equal to `read`.
+
+        Args:
+            ticker_symbol (str): The stock symbol to read.
+            chunk_size (int): Maximum number of rows of the main file per chunk.
+            columns (List[str], optional): Columns to read. Defaults to all columns.
+
+        Yields:
+            pd.DataFrame: The successive chunks, with the dtypes of the schema.
+        """
+        if not self.exists(ticker_symbol):
+            return
+        read_columns = columns if columns is None or "Date" in columns else ["Date"] + list(columns)
+        segments = self.segment_files(ticker_symbol)
+        appended = self._merge([self._read_file(path, read_columns, True) for path in segments]) if segments else None
+        selected = read_columns if columns is None else list(columns)
+        previous = None
+        if os.path.exists(self.path(ticker_symbol)):
+            for chunk in self._iter_file(self.path(ticker_symbol), read_columns, chunk_size):
+                if appended is not None:
+                    chunk = chunk[~chunk["Date"].isin(appended["Date"])]
+                if chunk.empty:
+                    continue
+                if previous is not None:
+                    yield previous if selected is None else previous[selected]
+                previous = chunk.reset_index(drop=True)
+        if appended is not None:
+            previous = appended if previous is None else self._merge([previous, appended])
+        if previous is not None and not previous.empty:
+            yield previous if selected is None else previous[selected]
+
+    def read_since(self, ticker_symbol: str, start, columns: Optional[List[str]] = None) -> Optional[pd.DataFrame]:
+        """
+        Reads the stored rows of a stock symbol from `start` onwards, without reading the whole history.
+
+        Args:
+            ticker_symbol (str): The stock symbol to read.
+            start: The first date to read.
+            columns (List[str], optional): Columns to read. Defaults to all columns.
+
+        Returns:
+            pd.DataFrame: The stored rows, or None if nothing is stored for this symbol.
+        """
+        if not self.exists(ticker_symbol):
+            return None
+        start = pd.Timestamp(start)
+        parts = []
+        if os.path.exists(self.path(ticker_symbol)):
+            parts.append(self._read_file_since(self.path(ticker_symbol), start))
+        for path in self.segment_files(ticker_symbol):
+            segment = self._read_file(path, None, True)
+            parts.append(segment[segment["Date"] >= start])
+        data = self._merge(parts)
+        return data if columns is None else data[list(columns)]
+
+    def last_date(self, ticker_symbol: str) -> Optional[pd.Timestamp]:
+        """
+        Returns the last stored `Date` of a stock symbol, or None if nothing is stored.
+        """
+        if not self.exists(ticker_symbol):
+            return None
+        last_dates = []
+        if os.path.exists(self.path(ticker_symbol)):
+            last_dates.append(self._last_file_date(self.path(ticker_symbol)))
+        for path in self.segment_files(ticker_symbol):
+            last_dates.append(self._read_file(path, ["Date"], True)["Date"].max())
+        last_dates = [last_date for last_date in last_dates if last_date is not None and not pd.isna(last_date)]
+        return max(last_dates) if last_dates else None
+
+    def write(self, ticker_symbol: str, data: pd.DataFrame) -> None:
+        """
+        Replaces the stored history of a stock symbol, atomically.
+
+        Args:
+            ticker_symbol (str): The stock symbol to write.
+            data (pd.DataFrame): The full history, with `Date` as a column.
+        """
+        with self._lock(ticker_symbol):
+            # Segments are retired before the main file is replaced: if the process stops in between,
+            # the lake goes back to the previous history, which the next incremental run completes.
+            self._retire_segments(ticker_symbol)
+            self._write_file(self.path(ticker_symbol), data)
+            self._delete_retired_segments(ticker_symbol)
+            self.refresh_manifest(ticker_symbol, data)
+
+    def append(self, ticker_symbol: str, data: pd.DataFrame) -> int:
+        """
+        Appends new rows to the stored history of a stock symbol, de-duplicated on `Date`.
+
+        Only the rows whose `Date` is not stored yet, or whose values differ from the stored row
+        (revisions), are written, as a new segment. The I/O therefore scales with the number of
+        new rows, not with the size of the history.
+
+        Args:
+            ticker_symbol (str): The stock symbol to append to.
+            data (pd.DataFrame): The incoming rows, with `Date` as a column.
+
+        Returns:
+            int: The number of rows written.
+        """
+        if data.empty:
+            return 0
+        with self._lock(ticker_symbol):
+            if not self.exists(ticker_symbol):
+                self._write_file(self.path(ticker_symbol), data)
+                self.refresh_manifest(ticker_symbol, data)
+                return len(data)
+
+            stored = self.read_since(ticker_symbol, data["Date"].min())
+            new_rows = self._changed_rows(data, stored)
+            if new_rows.empty:
+                return 0
+            directory = self.segments_path(ticker_symbol)
+            os.makedirs(directory, exist_ok=True)
+            sequence = self._next_sequence(ticker_symbol)
+            self._write_file(os.path.join(directory, f"{sequence:06d}{self.segment_suffix}"), new_rows)
+            logging.info(f"Appended {len(new_rows)} row(s) to {ticker_symbol} as segment {sequence}.")
+            added_rows = int((~new_rows["Date"].isin(stored["Date"])).sum()) if not stored.empty else len(new_rows)
+            self._record_append(ticker_symbol, new_rows, added_rows)
+
+        if len(self.segment_files(ticker_symbol)) >= self.compact_after:
+            self.compact(ticker_symbol)
+        return len(new_rows)
+
+    def compact(self, ticker_symbol: str) -> None:
+        """
+        Merges the appended segments of a stock symbol into its main file.
+        """
+        with self._lock(ticker_symbol):
+            segments = self.segment_files(ticker_symbol)
+            if not segments:
+                return
+            data = self.read(ticker_symbol)
+            self._write_file(self.path(ticker_symbol), data)
+            # The main file now holds the segments, which can be dropped
+            self._retire_segments(ticker_symbol)
+            self._delete_retired_segments(ticker_symbol)
+            # The content is unchanged: only the file statistics of the manifest entry are updated
+            if self.manifest.get(ticker_symbol) is not None:
+                self.manifest.update(ticker_symbol, **self._file_stats(ticker_symbol))
+            logging.info(f"Compacted {len(segments)} segment(s) of {ticker_symbol}.")
+
+    def compact_all(self) -> None:
+        """
+        Compacts the appended segments of every stock symbol of the lake.
+        """
+        for ticker_symbol in self.tickers():
+            self.compact(ticker_symbol)
+
+    def delete(self, ticker_symbol: str) -> None:
+        """
+        Removes the stored history of a stock symbol.
+        """
+        with self._lock(ticker_symbol):
+            if os.path.exists(self.path(ticker_symbol)):
+                self._delete_file(self.path(ticker_symbol))
+            shutil.rmtree(self.segments_path(ticker_symbol), ignore_errors=True)
+            self.manifest.remove(ticker_symbol)
+
+    def size(self, ticker_symbol: str) -> int:
+        """
+        Returns the size on disk of the stored history of a stock symbol, in bytes.
+        """
+        paths = self.segment_files(ticker_symbol)
+        if os.path.exists(self.path(ticker_symbol)):
+            paths.append(self.path(ticker_symbol))
+        return sum(self._file_size(path) for path in paths)
+
+    def version(self, ticker_symbol: str) -> Optional[tuple]:
+        """
+        Returns a token that changes whenever the stored history of a stock symbol is written:
+        the size and modification time of its files, read from the file system only.
+        """
+        if not self.exists(ticker_symbol):
+            return None
+        stats = self._file_stats(ticker_symbol)
+        return stats["bytes"], stats["mtime"], len(self.segment_files(ticker_symbol))
+
+    def describe(self, ticker_symbol: str) -> Optional[dict]:
+        """
+        Returns the manifest entry of a stock symbol if it matches the files on disk.
+
+        Returns:
+            dict: The entry (rows, min_date, max_date, columns, bytes, mtime, hash, loaded),
+                or None if the symbol is not indexed or its files changed outside of the lake.
+        """
+        entry = self.manifest.get(ticker_symbol)
+        if entry is None or not self.exists(ticker_symbol):
+            return None
+        stats = self._file_stats(ticker_symbol)
+        if entry.get("bytes") != stats["bytes"] or entry.get("mtime") != stats["mtime"]:
+            return None
+        return entry
+
+    def refresh_manifest(self, ticker_symbol: str, data: Optional[pd.DataFrame] = None) -> dict:
+        """
+        Rebuilds the manifest entry of a stock symbol from its content.
+
+        Args:
+            ticker_symbol (str): The stock symbol to index.
+            data (pd.DataFrame, optional): The full stored history, if already in memory. Read otherwise.
+
+        Returns:
+            dict: The new entry.
+        """
+        if data is None:
+            data = self.read(ticker_symbol)
+        dates = data["Date"] if "Date" in data.columns else pd.Series(dtype="datetime64[ns]")
+        return self.manifest.update(
+            ticker_symbol,
+            rows=len(data),
+            min_date=self._format_date(dates.min()),
+            max_date=self._format_date(dates.max()),
+            columns={col: str(dtype) for col, dtype in data.dtypes.items()},
+            hash=content_hash(data),
+            **self._file_stats(ticker_symbol)
+        )
+
+    def _record_append(self, ticker_symbol: str, new_rows: pd.DataFrame, added_rows: int) -> None:
+        entry = self._previous_entry(ticker_symbol)
+        if entry is None:
+            self.refresh_manifest(ticker_symbol)
+            return
+        # The new hash chains the previous one with the hash of the appended rows
+        chained_hash = hashlib.sha256(f"{entry['hash']}{content_hash(new_rows)}".encode("utf-8")).hexdigest()
+        self.manifest.update(
+            ticker_symbol,
+            rows=entry["rows"] + added_rows,
+            min_date=min(entry["min_date"], self._format_date(new_rows["Date"].min())),
+            max_date=max(entry["max_date"], self._format_date(new_rows["Date"].max())),
+            hash=chained_hash,
+            **self._file_stats(ticker_symbol)
+        )
+
+    def _previous_entry(self, ticker_symbol: str) -> Optional[dict]:
+        # The entry is only valid if it matched the files before the segment just written
+        entry = self.manifest.get(ticker_symbol)
+        segments = self.segment_files(ticker_symbol)
+        if entry is None or entry.get("min_date") is None or not segments:
+            return None
+        previous_bytes = self.size(ticker_symbol) - self._file_size(segments[-1])
+        return entry if entry.get("bytes") == previous_bytes else None
+
+    def _file_stats(self, ticker_symbol: str) -> dict:
+        paths = self.segment_files(ticker_symbol)
+        if os.path.exists(self.path(ticker_symbol)):
+            paths.append(self.path(ticker_symbol))
+        return {
+            "bytes": sum(self._file_size(path) for path in paths),
+            "mtime": max((self._file_mtime(path) for path in paths), default=None)
+        }
+
+    @staticmethod
+    def _format_date(value) -> Optional[str]:
+        return None if value is None or pd.isna(value) else pd.Timestamp(value).strftime("%Y-%m-%d")
+
+    def _lock(self, ticker_symbol: str):
+        with self._locks_guard:
+            return self._locks.setdefault(ticker_symbol, threading.RLock())
+
+    def _merge(self, parts: List[pd.DataFrame]) -> pd.DataFrame:
+        non_empty_parts = [part for part in parts if not part.empty]
+        if len(non_empty_parts) <= 1:
+            return (non_empty_parts or parts or [pd.DataFrame()])[0].reset_index(drop=True)
+        parts = non_empty_parts
+        data = pd.concat(parts, ignore_index=True)
+        data = data.drop_duplicates(subset="Date", keep="last").sort_values("Date")
+        return data.reset_index(drop=True)
+
+    def _changed_rows(self, data: pd.DataFrame, stored: pd.DataFrame) -> pd.DataFrame:
+        if stored is None or stored.empty:
+            return data
+        compared = [col for col in data.columns if col in stored.columns and col not in VOLATILE_COLUMNS and col != "Date"]
+        merged = data.merge(stored[["Date"] + compared], on="Date", how="left", suffixes=("", "_stored"), indicator=True)
+        changed = (merged["_merge"] == "left_only").to_numpy().copy()
+        for col in compared:
+            new_values, stored_values = merged[col], merged[f"{col}_stored"]
+            if pd.api.types.is_numeric_dtype(new_values) and pd.api.types.is_numeric_dtype(stored_values):
+                same = np.isclose(new_values.to_numpy(dtype=float), stored_values.to_numpy(dtype=float), equal_nan=True)
+            else:
+                same = (new_values.astype(str) == stored_values.astype(str)).to_numpy()
+            changed |= ~same
+        return data[changed].reset_index(drop=True)
+
+    def _compacted_sequence(self, ticker_symbol: str) -> int:
+        marker = os.path.join(self.segments_path(ticker_symbol), self.COMPACTED_MARKER)
+        if not os.path.exists(marker):
+            return 0
+        with open(marker, "r") as f:
+            return int(f.read().strip() or 0)
+
+    def _next_sequence(self, ticker_symbol: str) -> int:
+        directory = self.segments_path(ticker_symbol)
+        sequences = [
+            int(entry[:-len(self.segment_suffix)]) for entry in os.listdir(directory)
+            if entry.endswith(self.segment_suffix) and entry[:-len(self.segment_suffix)].isdigit()
+        ]
+        return max(sequences + [self._compacted_sequence(ticker_symbol)]) + 1
+
+    def _retire_segments(self, ticker_symbol: str) -> None:
+        segments = self.segment_files(ticker_symbol)
+        if not segments:
+            return
+        last_sequence = int(os.path.basename(segments[-1])[:-len(self.segment_suffix)])
+        marker = os.path.join(self.segments_path(ticker_symbol), self.COMPACTED_MARKER)
+        with open(f"{marker}.tmp", "w") as f:
+            f.write(str(last_sequence))
+        os.replace(f"{marker}.tmp", marker)
+
+    def _delete_retired_segments(self, ticker_symbol: str) -> None:
+        directory = self.segments_path(ticker_symbol)
+        if not os.path.isdir(directory):
+            return
+        compacted = self._compacted_sequence(ticker_symbol)
+        for entry in os.listdir(directory):
+            name = entry[:-len(self.segment_suffix)] if entry.endswith(self.segment_suffix) else ""
+            if name.isdigit() and int(name) <= compacted:
+                self._delete_file(os.path.join(directory, entry))
+
+    # File primitives, overridden by the other storage formats
+
+    def _write_file(self, path: str, data: pd.DataFrame) -> None:
+        tmp_path = f"{path}.tmp"
+        data.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, path)
+
+    def _read_file(self, path: str, columns: Optional[List[str]], parse_dates: bool) -> pd.DataFrame:
+        data = pd.read_csv(path, usecols=columns, dtype=read_dtypes())
+        # Files written by older versions carry the positional index as an extra column
+        return apply_schema(data.drop(columns=["index"], errors="ignore"), parse_dates)
+
+    def _iter_file(self, path: str, columns: Optional[List[str]], chunk_size: int) -> Iterator[pd.DataFrame]:
+        # Each chunk is parsed with the dtypes of the schema, as `_read_file` does for the whole file
+        with pd.read_csv(path, usecols=columns, dtype=read_dtypes(), chunksize=chunk_size) as reader:
+            for chunk in reader:
+                yield apply_schema(chunk.drop(columns=["index"], errors="ignore"))
+
+    def _read_file_since(self, path: str, start: pd.Timestamp, block_size: int = 64 * 1024) -> pd.DataFrame:
+        # Rows are sorted by date: read blocks from the end of the file until one starts before `start`
+        with open(path, "rb") as f:
+            header = f.readline()
+            body_start = f.tell()
+            file_size = f.seek(0, os.SEEK_END)
+            while True:
+                offset = max(body_start, file_size - block_size)
+                f.seek(offset)
+                block = f.read(file_size - offset)
+                if offset > body_start:
+                    # Drop the partial first line
+                    block = block[block.find(b"\n") + 1:]
+                data = self._parse_block(header + block)
+                if offset == body_start or data.empty or data["Date"].iloc[0] < start:
+                    return data[data["Date"] >= start].reset_index(drop=True)
+                block_size *= 4
+
+    def _last_file_date(self, path: str, block_size: int = 4 * 1024) -> Optional[pd.Timestamp]:
+        # Only the last rows are parsed; when the file is smaller than the block, the skipped first line is the header
+        with open(path, "rb") as f:
+            header = f.readline()
+            file_size = f.seek(0, os.SEEK_END)
+            f.seek(max(0, file_size - block_size))
+            block = f.read()
+        data = self._parse_block(header + block[block.find(b"\n") + 1:])
+        return data["Date"].max() if not data.empty else None
+
+    def _parse_block(self, raw: bytes) -> pd.DataFrame:
+        return self._read_file(io.BytesIO(raw), None, True)
+
+    def _delete_file(self, path: str) -> None:
+        os.remove(path)
+
+    def _file_size(self, path: str) -> int:
+        return os.path.getsize(path)
+
+    def _file_mtime(self, path: str) -> int:
+        return os.stat(path).st_mtime_ns
+
+
+class ColumnarLake(CSVLake):
+    """
+    Data lake storing each column of a history in a typed binary NumPy file.
+
+    The history of a stock symbol is stored in a `<TICKER>_Historical_Data.cols` directory holding
+    one `<column>.npy` file per column, memory-mapped on read so that no data is copied until used,
+    or a single compressed `columns.npz` archive when compression is enabled. Dtypes are stored,
+    so they survive the round trip without re-inference. Appended segments use the same layout.
+
+    Attributes:
+        save_path (str): Path to the directory of the lake.
+        compression (bool): If True, histories are written compressed (smaller, but not memory-mappable).
+        compact_after (int): Number of segments of a stock symbol that triggers its compaction.
+    """
+
+    format_name = "columnar"
+    suffix = "_Historical_Data.cols"
+    segment_suffix = ".cols"
+    META_FILENAME = "_meta.json"
+    ARCHIVE_FILENAME = "columns.npz"
+
+    def __init__(self, save_path: str = ".", compression: bool = False, compact_after: int = 20):
+        """
+        Initializes the lake, creating its directory if needed.
+
+        Args:
+            save_path (str): Path to the directory of the lake.
+            compression (bool): If True, histories are written in a compressed archive.
+            compact_after (int): Number of segments of a stock symbol that triggers its compaction.
+        """
+        super().__init__(save_path, compact_after)
+        self.compression = compression
+        self._recover_interrupted_writes()
+
+    def read_metadata(self, ticker_symbol: str) -> dict:
+        """
+        Returns the metadata of a stored history: columns, dtypes, row count and compression.
+        """
+        return self._read_metadata(self.path(ticker_symbol))
+
+    def read_arrays(self, ticker_symbol: str, columns: Optional[List[str]] = None) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Reads the stored columns of a stock symbol as NumPy arrays.
+
+        Uncompressed columns without pending segments are returned as read-only memory maps (zero-copy).
+
+        Args:
+            ticker_symbol (str): The stock symbol to read.
+            columns (List[str], optional): Columns to read. Defaults to all columns.
+
+        Returns:
+            Dict[str, np.ndarray]: The array of each column, or None if nothing is stored for this symbol.
+        """
+        if not self.exists(ticker_symbol):
+            return None
+        if self.segment_files(ticker_symbol) or not os.path.exists(self.path(ticker_symbol)):
+            data = self.read(ticker_symbol, columns)
+            return {col: data[col].to_numpy() for col in data.columns}
+        return self._read_arrays(self.path(ticker_symbol), columns)
+
+    def _recover_interrupted_writes(self) -> None:
+        # A write stopped between its two renames leaves the previous version as `.old` only
+        for root, directories, _ in os.walk(self.save_path):
+            for entry in directories:
+                if entry.endswith(".old"):
+                    self._restore_previous_version(os.path.join(root, entry[:-len(".old")]))
+
+    @staticmethod
+    def _restore_previous_version(directory: str) -> None:
+        old_directory = f"{directory}.old"
+        if os.path.isdir(old_directory) and not os.path.exists(directory):
+            os.replace(old_directory, directory)
+            logging.warning(f"Interrupted write of {directory}, previous version restored.")
+
+    def _read_metadata(self, directory: str) -> dict:
+        with open(os.path.join(directory, self.META_FILENAME), "r") as f:
+            return json.load(f)
+
+    def _read_arrays(self, directory: str, columns: Optional[List[str]]) -> Dict[str, np.ndarray]:
+        metadata = self._read_metadata(directory)
+        columns = metadata["columns"] if columns is None else [col for col in columns if col in metadata["columns"]]
+        if metadata["compressed"]:
+            with np.load(os.path.join(directory, self.ARCHIVE_FILENAME)) as archive:
+                return {col: archive[col] for col in columns}
+        return {col: np.load(os.path.join(directory, f"{col}.npy"), mmap_mode="r") for col in columns}
+
+    def _write_file(self, directory: str, data: pd.DataFrame) -> None:
+        # The new files are written to a temporary directory which then takes the place of the old one
+        tmp_directory = f"{directory}.tmp"
+        old_directory = f"{directory}.old"
+        self._restore_previous_version(directory)
+        shutil.rmtree(tmp_directory, ignore_errors=True)
+        os.makedirs(tmp_directory)
+
+        arrays = {col: self._to_array(data[col]) for col in data.columns}
+        if self.compression:
+            np.savez_compressed(os.path.join(tmp_directory, self.ARCHIVE_FILENAME), **arrays)
+        else:
+            for col, array in arrays.items():
+                np.save(os.path.join(tmp_directory, f"{col}.npy"), array)
+        metadata = {
+            "columns": list(arrays),
+            "dtypes": {col: str(array.dtype) for col, array in arrays.items()},
+            "rows": len(data),
+            "compressed": self.compression
+        }
+        with open(os.path.join(tmp_directory, self.META_FILENAME), "w") as f:
+            json.dump(metadata, f)
+
+        if os.path.exists(directory):
+            shutil.rmtree(old_directory, ignore_errors=True)
+            os.replace(directory, old_directory)
+        try:
+            os.replace(tmp_directory, directory)
+        except OSError:
+            self._restore_previous_version(directory)
+            raise
+        shutil.rmtree(old_directory, ignore_errors=True)
+
+    def _read_file(self, directory: str, columns: Optional[List[str]], parse_dates: bool) -> pd.DataFrame:
+        return apply_schema(pd.DataFrame(self._read_arrays(directory, columns)))
+
+    def _iter_file(self, directory: str, columns: Optional[List[str]], chunk_size: int) -> Iterator[pd.DataFrame]:
+        # Slices of the memory-mapped columns: only the rows of the current chunk are copied
+        arrays = self._read_arrays(directory, columns)
+        rows = len(next(iter(arrays.values()))) if arrays else 0
+        for start in range(0, rows, chunk_size):
+            yield apply_schema(pd.DataFrame({col: np.array(array[start:start + chunk_size]) for col, array in arrays.items()}))
+
+    def _read_file_since(self, directory: str, start: pd.Timestamp, block_size: int = 0) -> pd.DataFrame:
+        arrays = self._read_arrays(directory, None)
+        first_row = np.searchsorted(arrays["Date"], np.datetime64(start, "ns"))
+        return pd.DataFrame({col: array[first_row:] for col, array in arrays.items()})
+
+    def _last_file_date(self, directory: str) -> Optional[pd.Timestamp]:
+        dates = self._read_arrays(directory, ["Date"])["Date"]
+        return pd.Timestamp(dates[-1]) if len(dates) else None
+
+    def _delete_file(self, directory: str) -> None:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    def _file_size(self, directory: str) -> int:
+        return sum(os.path.getsize(os.path.join(directory, entry)) for entry in os.listdir(directory))
+
+    def _file_mtime(self, directory: str) -> int:
+        # The metadata file is written last, so its time is the time of the whole write
+        return os.stat(os.path.join(directory, self.META_FILENAME)).st_mtime_ns
+
+    @staticmethod
+    def _to_array(column: pd.Series) -> np.ndarray:
+        if pd.api.types.is_datetime64_any_dtype(column.dtype):
+            if column.dt.tz is not None:
+                column = column.dt.tz_localize(None)
+            return column.to_numpy(dtype="datetime64[ns]")
+        if pd.api.types.is_numeric_dtype(column.dtype) or pd.api.types.is_bool_dtype(column.dtype):
+            return column.to_numpy()
+        # Text columns are stored as fixed-width unicode so that they can be memory-mapped too
+        return column.astype(str).to_numpy(dtype=str)
+
+
+LAKE_FORMATS = {
+    CSVLake.format_name: CSVLake,
+    ColumnarLake.format_name: ColumnarLake,
+}
+
+
+def get_lake(lake_format: str = "csv", save_path: str = ".", **options) -> CSVLake:
+    """
+    Returns the lake backend of the given format.
+
+    Args:
+        lake_format (str): "csv" or "columnar".
+        save_path (str): Path to the directory of the lake.
+        **options: Backend options (e.g. `compression` for the columnar format, `compact_after`).
+
+    Returns:
+        CSVLake: The lake backend.
+
+    Raises:
+        ValueError: If the format is unknown.
+    """
+    if lake_format not in LAKE_FORMATS:
+        raise ValueError(f"Unknown lake format {lake_format!r}, expected one of {sorted(LAKE_FORMATS)}.")
+    return LAKE_FORMATS[lake_format](save_path, **options)
+
+
+def copy_lake(source: CSVLake, target: CSVLake, tickers_list: Optional[List[str]] = None) -> None:
+    """
+    Copies histories from one lake to another, e.g. to migrate the CSV lake to the columnar format.
+
+    Args:
+        source (CSVLake): The lake to read from.
+        target (CSVLake): The lake to write to.
+        tickers_list (List[str], optional): The stock symbols to copy. Defaults to all stored symbols.
+    """
+    for ticker_symbol in source.tickers() if tickers_list is None else tickers_list:
+        data = source.read(ticker_symbol)
+        if data is None:
+            logging.warning(f"No data stored for {ticker_symbol} in {source.save_path}.")
+            continue
+        target.write(ticker_symbol, data)
+        logging.info(f"Copied {ticker_symbol} from the {source.format_name} lake to the {target.format_name} lake.")
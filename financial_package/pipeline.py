@@ -0,0 +1,163 @@
+import queue
+import threading
+import time
+import logging
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Tuple
+
+# Marks the end of the input of a stage worker
+_DONE = object()
+
+
+class Stage:
+    """
+    Step of a pipeline, applied by `workers` threads to the items coming out of the previous step.
+
+    A stage function takes the key and the value of an item and returns its new value; returning
+    None drops the item. With `batch_size` > 1, the function takes a list of (key, value) pairs
+    instead, made of the items available at the time (at most `batch_size`), and returns a dict
+    of the new values of the items that went through.
+
+    Attributes:
+        name (str): Name of the stage, used in the logs and the timings.
+        func (Callable): The function applied to the items.
+        workers (int): Number of threads running the stage.
+        batch_size (int): Maximum number of items given to the function at once.
+    """
+
+    def __init__(self, name: str, func: Callable, workers: int = 1, batch_size: int = 1):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+
+
+class Pipeline:
+    """
+    Runs items through a sequence of stages, with bounded queues between the stages.
+
+    All the stages run at the same time: while a stage waits on the network, the next ones
+    validate and load the items already fetched, so the run takes about as long as its slowest
+    stage rather than the sum of all of them. The bounded queues make a fast stage wait for a
+    slow one instead of piling up items in memory. A failure on an item is logged and drops
+    that item only.
+
+    Attributes:
+        stages (List[Stage]): The stages, in order.
+        queue_size (int): Maximum number of items waiting between two stages.
+        timings (Dict[str, dict]): After a run, for each stage: items processed, items failed and
+            time spent in the stage function (summed over its workers), in seconds.
+        failures (Dict[Hashable, str]): After a run, the stage each dropped item failed in.
+    """
+
+    def __init__(self, stages: List[Stage], queue_size: int = 16):
+        self.stages = stages
+        self.queue_size = queue_size
+        self.timings = {}
+        self.failures = {}
+        self._lock = threading.Lock()
+
+    def run(self, items: Iterable[Tuple[Hashable, Any]]) -> Dict[Hashable, Any]:
+        """
+        Runs the items through all the stages.
+
+        Args:
+            items (Iterable[Tuple[Hashable, Any]]): The (key, value) pairs to process, e.g. (ticker, watermark).
+
+        Returns:
+            Dict[Hashable, Any]: The value returned by the last stage for each item that went through.
+        """
+        self.timings = {stage.name: {"items": 0, "failed": 0, "seconds": 0.0} for stage in self.stages}
+        self.failures = {}
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        results = {}
+        remaining = [stage.workers for stage in self.stages]
+        threads = []
+        for index, stage in enumerate(self.stages):
+            for _ in range(stage.workers):
+                thread = threading.Thread(target=self._work, args=(index, queues, remaining, results),
+                                          name=f"{stage.name}-worker", daemon=True)
+                thread.start()
+                threads.append(thread)
+
+        start = time.perf_counter()
+        try:
+            for item in items:
+                queues[0].put(item)
+        finally:
+            for _ in range(self.stages[0].workers):
+                queues[0].put(_DONE)
+            for thread in threads:
+                thread.join()
+        elapsed = time.perf_counter() - start
+        stage_timings = ", ".join(f"{name} {timing['seconds']:.2f}s ({timing['items']} items)"
+                                  for name, timing in self.timings.items())
+        logging.info(f"Pipeline completed in {elapsed:.2f}s: {stage_timings}")
+        return results
+
+    def _work(self, index: int, queues: List[queue.Queue], remaining: List[int], results: dict):
+        stage = self.stages[index]
+        output = queues[index + 1] if index + 1 < len(queues) else None
+        while True:
+            batch, done = self._next_batch(queues[index], stage.batch_size)
+            if batch:
+                for key, value in self._apply(stage, batch):
+                    if output is None:
+                        with self._lock:
+                            results[key] = value
+                    else:
+                        output.put((key, value))
+            if done:
+                break
+        with self._lock:
+            remaining[index] -= 1
+            last_worker = remaining[index] == 0
+        # The next stage ends once all the workers of this one are done
+        if last_worker and output is not None:
+            for _ in range(self.stages[index + 1].workers):
+                output.put(_DONE)
+
+    @staticmethod
+    def _next_batch(input_queue: queue.Queue, batch_size: int) -> Tuple[list, bool]:
+        # Waits for one item, then takes those already waiting, up to batch_size
+        batch = []
+        item = input_queue.get()
+        while item is not _DONE:
+            batch.append(item)
+            if len(batch) >= batch_size:
+                return batch, False
+            try:
+                item = input_queue.get_nowait()
+            except queue.Empty:
+                return batch, False
+        return batch, True
+
+    def _apply(self, stage: Stage, batch: list) -> List[Tuple[Hashable, Any]]:
+        start = time.perf_counter()
+        outputs = []
+        if stage.batch_size > 1:
+            try:
+                values = stage.func(batch)
+            except Exception as e:
+                logging.error(f"Stage {stage.name} failed for {[key for key, _ in batch]}: {e}")
+                values = {}
+            outputs = [(key, values[key]) for key, _ in batch if values.get(key) is not None]
+        else:
+            for key, value in batch:
+                try:
+                    value = stage.func(key, value)
+                except Exception as e:
+                    logging.error(f"Stage {stage.name} failed for {key}: {e}")
+                    value = None
+                if value is not None:
+                    outputs.append((key, value))
+        elapsed = time.perf_counter() - start
+        succeeded = {key for key, _ in outputs}
+        with self._lock:
+            timing = self.timings[stage.name]
+            timing["seconds"] += elapsed
+            timing["items"] += len(batch)
+            for key, _ in batch:
+                if key not in succeeded:
+                    timing["failed"] += 1
+                    self.failures[key] = stage.name
+        return outputs
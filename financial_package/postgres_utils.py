@@ -1,13 +1,41 @@
+import io
 import os
+import copy
+import time
 import psycopg2
+import numpy as np
 import pandas as pd
-from typing import List
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from datetime import date, datetime, timedelta
 import logging
+from financial_package.lake import CSVLake, VOLATILE_COLUMNS
+from financial_package.db_pool import ConnectionPool
+from financial_package.schema import PRICE_SCHEMA, sql_type
+from financial_package.exports import write_export, write_xlsx
+from financial_package.corporate_actions import adjustment_segments
+from financial_package.checksums import (checksum_sql, row_hashes, month_checksums, combine_checksums,
+                                         compare_checksums)
+from financial_package.etl import QuarantineStore
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Table layouts: one table per ticker, or a single stocks.prices table keyed by (ticker, "Date")
+LAYOUTS = ("per_ticker", "unified")
+PRICES_TABLE = "prices"
+
+# Conversions of the columns created by the first loads, which stored every value as TEXT, to the
+# declared types. Text dates mix '2024-01-02' and '2024-01-02 00:00:00', hence the cast through timestamp.
+TYPE_CASTS = {
+    "DATE": '"{column}"::timestamp::date',
+    "REAL": '"{column}"::real',
+    "BIGINT": 'round("{column}"::numeric)::bigint',
+    "TIMESTAMP": '"{column}"::timestamp',
+}
+# Names of the declared types in information_schema.columns
+CATALOG_TYPES = {"TIMESTAMP": "timestamp without time zone"}
+
 class PostgresInserter:
     """
     Inserts data from CSV files into PostgreSQL tables.
@@ -19,9 +47,24 @@ class PostgresInserter:
         host (str): Host address of the PostgreSQL server.
         port (str): Port number for the PostgreSQL server.
         save_path (str): Path to the directory containing CSV files.
+        lake (CSVLake): Storage backend of the lake the data is read from.
+        batch_size (int): Number of tables loaded in a single transaction.
+        copy_threshold (int): Number of rows from which a DataFrame is streamed with COPY rather than
+            inserted with multi-row VALUES statements.
+        chunk_size (int): Number of rows of a lake file read and written at a time by the loader.
+        pool (ConnectionPool): Shared pool the connections are taken from, if any.
+        max_workers (int): Number of pooled connections used in parallel by the loader.
+        layout (str): "per_ticker" for one stocks."<TICKER>" table per ticker, or "unified" for a single
+            stocks.prices table keyed by (ticker, "Date") and partitioned by year.
     """
 
-    def __init__(self, dbname: str, user: str, password: str, host: str, port: str, save_path: str = "."):
+    # Number of rows per multi-row INSERT statement for the frames too small for COPY
+    VALUES_PAGE_SIZE = 500
+
+    def __init__(self, dbname: str, user: str, password: str, host: str, port: str, save_path: str = ".",
+                 lake: CSVLake = None, batch_size: int = 10, copy_threshold: int = 1000,
+                 pool: ConnectionPool = None, max_workers: int = 1, layout: str = "per_ticker",
+                 chunk_size: int = 50000):
         """
         Initializes the class with database connection details and save path.
 
@@ -32,19 +75,44 @@ class PostgresInserter:
             host (str): Host address of the PostgreSQL server.
             port (str): Port number for the PostgreSQL server.
             save_path (str): Path to the directory containing CSV files.
+            lake (CSVLake, optional): Storage backend of the lake. Defaults to CSV files in `save_path`.
+            batch_size (int): Number of tables loaded in a single transaction.
+            copy_threshold (int): Number of rows from which a DataFrame is loaded with COPY.
+            pool (ConnectionPool, optional): Shared pool to take the connections from. Defaults to a
+                dedicated connection.
+            max_workers (int): Number of pooled connections used in parallel by the loader.
+            layout (str): "per_ticker" or "unified".
+            chunk_size (int): Number of rows of a lake file read and written at a time by the loader,
+                which bounds its memory whatever the length of the histories.
+
+        Raises:
+            ValueError: If the layout is unknown.
         """
+        if layout not in LAYOUTS:
+            raise ValueError(f"Unknown table layout '{layout}', expected one of {LAYOUTS}.")
         self.dbname = dbname
         self.user = user
         self.password = password
         self.host = host
         self.port = port
         self.save_path = save_path
+        self.lake = lake
+        self.batch_size = batch_size
+        self.copy_threshold = copy_threshold
+        self.pool = pool
+        self.max_workers = max_workers
+        self.layout = layout
+        self.chunk_size = chunk_size
         self.conn = None
         self.cursor = None
 
     def connect(self):
         """Connects to the PostgreSQL database and sets the connection and cursor."""
         try:
+            if self.pool is not None:
+                self.conn = self.pool.getconn()
+                self.cursor = self.conn.cursor()
+                return
             self.conn = psycopg2.connect(
                 dbname=self.dbname,
                 user=self.user,
@@ -59,17 +127,102 @@ class PostgresInserter:
             raise
 
     def close(self):
-        """Closes the database connection and cursor."""
+        """Closes the database connection and cursor, or gives the connection back to the pool."""
         if self.cursor:
             self.cursor.close()
-        if self.conn:
+        if self.conn and self.pool is not None:
+            self.pool.putconn(self.conn)
+        elif self.conn:
             self.conn.close()
+        self.conn = None
+        self.cursor = None
         logging.info("Database connection closed.")
 
+    def worker(self, conn) -> "PostgresInserter":
+        """
+        Returns a copy of the inserter bound to another connection, for use in a worker thread.
+        """
+        worker = copy.copy(self)
+        worker.conn = conn
+        worker.cursor = conn.cursor()
+        return worker
+
+    def run_on_pool(self, func: Callable, items: list) -> list:
+        """
+        Calls `func(worker, item)` for each item, spreading the items across the connections of the pool.
+
+        Each call runs on its own pooled connection, so at most `pool.size` calls run at the same time.
+        If the caller is interrupted, the calls not started yet are cancelled and the connections of
+        the running ones are given back to the pool before returning.
+
+        Args:
+            func (Callable): Function taking a worker inserter and an item.
+            items (list): The items to process.
+
+        Returns:
+            list: The results of the calls, in the order of the items.
+        """
+        executor = ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, self.pool.size)))
+        try:
+            futures = [executor.submit(self.call_on_pool, func, item) for item in items]
+            return [future.result() for future in futures]
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def call_on_pool(self, func: Callable, item):
+        """
+        Calls `func(worker, item)` with a worker inserter bound to a connection of the pool, waiting
+        for a free connection if needed. Without a pool, the inserter itself is used.
+
+        Returns:
+            The result of the call.
+        """
+        if self.pool is None:
+            return func(self, item)
+        with self.pool.connection() as conn:
+            worker = self.worker(conn)
+            try:
+                return func(worker, item)
+            finally:
+                worker.cursor.close()
+
+    def target_table(self, table_name: str) -> str:
+        """
+        Returns the qualified name of the table holding the rows of a ticker, in the configured layout.
+        """
+        if self.layout == "unified":
+            return f'stocks.{PRICES_TABLE}'
+        return f'stocks."{table_name}"'
+
+    def key_columns(self) -> List[str]:
+        """
+        Returns the columns of the primary key of the price tables, in the configured layout.
+        """
+        return ["ticker", "Date"] if self.layout == "unified" else ["Date"]
+
+    def frame_for(self, table_name: str, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Returns the DataFrame as stored in the configured layout, with a leading ticker column if unified.
+        """
+        if self.layout != "unified" or 'ticker' in df.columns:
+            return df
+        df = df.copy()
+        df.insert(0, 'ticker', table_name)
+        return df
+
+    @staticmethod
+    def column_definitions(df: pd.DataFrame) -> List[str]:
+        """
+        Returns the SQL definition of each column of the DataFrame, with the types declared in the schema.
+        """
+        return [f'"{col}" {sql_type(col, df[col].dtype)}' for col in df.columns]
+
     def create_table(self, table_name: str, df: pd.DataFrame):
         """
         Creates a PostgreSQL table with the same structure as the DataFrame.
 
+        In the unified layout, the shared stocks.prices table is created instead, if it does not exist.
+
         Args:
             table_name (str): Name of the table to create.
             df (pd.DataFrame): DataFrame with the data structure.
@@ -77,26 +230,251 @@ class PostgresInserter:
         Raises:
             Exception: If there is an error creating the table.
         """
+        if self.layout == "unified":
+            self.create_prices_table(df)
+            return
         try:
-            dtype_mapping = {
-                'int64': 'INTEGER',
-                'float64': 'FLOAT',
-                'datetime64[ns]': 'TIMESTAMP',
-                'object': 'TEXT'
-            }
-            columns = []
-            for col in df.columns:
-                col_type = dtype_mapping.get(str(df[col].dtype), 'TEXT')
-                columns.append(f'"{col}" {col_type}')
+            columns = self.column_definitions(df)
+            if 'Date' in df.columns:
+                columns.append('PRIMARY KEY ("Date")')
             columns_str = ", ".join(columns)
             create_table_query = f'CREATE TABLE IF NOT EXISTS stocks."{table_name}" ({columns_str});'
             self.cursor.execute(create_table_query)
+            if 'Date' in df.columns:
+                self.ensure_date_key(table_name)
             self.conn.commit()
             logging.info(f"Table {table_name} created successfully.")
         except psycopg2.Error as e:
             logging.error(f"Error creating table {table_name}: {e}")
             self.conn.rollback()
 
+    def create_prices_table(self, df: pd.DataFrame):
+        """
+        Creates the stocks.prices table of the unified layout, with the columns of the DataFrame.
+
+        The table is keyed by (ticker, "Date") and partitioned by year on "Date", so that a query on
+        a day only scans the partition of its year, whatever the number of tickers. The primary key
+        serves the per-ticker queries and a B-tree index on "Date" the cross-ticker ones.
+
+        Args:
+            df (pd.DataFrame): DataFrame with the data structure of one ticker.
+        """
+        try:
+            columns = ['"ticker" TEXT NOT NULL'] + self.column_definitions(df.drop(columns='ticker', errors='ignore'))
+            columns.append('PRIMARY KEY ("ticker", "Date")')
+            self.cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS stocks.{PRICES_TABLE} ({", ".join(columns)}) PARTITION BY RANGE ("Date");'
+            )
+            self.cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS {PRICES_TABLE}_date_idx ON stocks.{PRICES_TABLE} ("Date");'
+            )
+            self.conn.commit()
+            logging.info(f"Table {PRICES_TABLE} created successfully.")
+        except psycopg2.Error as e:
+            logging.error(f"Error creating table {PRICES_TABLE}: {e}")
+            self.conn.rollback()
+
+    def ensure_partitions(self, first_date, last_date):
+        """
+        Creates the yearly partitions of stocks.prices covering the dates from `first_date` to `last_date`.
+
+        Does nothing in the per-ticker layout. The transaction is left open: the caller commits or rolls back.
+        """
+        if self.layout != "unified" or pd.isna(first_date) or pd.isna(last_date):
+            return
+        for year in range(pd.Timestamp(first_date).year, pd.Timestamp(last_date).year + 1):
+            self.cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS stocks.{PRICES_TABLE}_{year} PARTITION OF stocks.{PRICES_TABLE} '
+                f"FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01');"
+            )
+
+    def column_types(self, table_name: str) -> Dict[str, str]:
+        """
+        Returns the stored type of each column of a table, as named in information_schema.columns.
+        """
+        self.cursor.execute(
+            "SELECT column_name, data_type FROM information_schema.columns WHERE table_schema = 'stocks' AND table_name = %s;",
+            (table_name,)
+        )
+        return {column: data_type for column, data_type in self.cursor.fetchall()}
+
+    def migrate_types(self, table_name: str, column_types: Dict[str, str] = None):
+        """
+        Converts the columns of a table created before the typed schema to their declared types.
+
+        The transaction is left open: the caller commits or rolls back.
+
+        Args:
+            table_name (str): Name of the table to migrate.
+            column_types (Dict[str, str], optional): The stored types, if they were read already.
+        """
+        if column_types is None:
+            column_types = self.column_types(table_name)
+        alterations = []
+        for column, data_type in column_types.items():
+            if column not in PRICE_SCHEMA:
+                continue
+            declared = PRICE_SCHEMA[column][1]
+            if data_type != CATALOG_TYPES.get(declared, declared.lower()):
+                using = TYPE_CASTS[declared].format(column=column)
+                alterations.append(f'ALTER COLUMN "{column}" TYPE {declared} USING {using}')
+        if alterations:
+            self.cursor.execute(f'ALTER TABLE stocks."{table_name}" {", ".join(alterations)};')
+            logging.info(f"Columns of table {table_name} converted to the declared types.")
+
+    def ensure_date_key(self, table_name: str):
+        """
+        Adds the primary key on "Date" to a table created before the key existed.
+
+        The duplicated dates left by the former append-only loads are removed first, keeping the row
+        written last, then the columns are converted to their declared types. Text dates are compared
+        on the day they denote, so that '2024-01-02' and '2024-01-02 00:00:00' are duplicates. The
+        transaction is left open: the caller commits or rolls back.
+
+        Args:
+            table_name (str): Name of the table to migrate.
+        """
+        column_types = self.column_types(table_name)
+        self.cursor.execute(
+            "SELECT 1 FROM pg_indexes WHERE schemaname = 'stocks' AND tablename = %s AND indexdef LIKE 'CREATE UNIQUE INDEX%%';",
+            (table_name,)
+        )
+        has_key = self.cursor.fetchone() is not None
+        if not has_key or column_types.get("Date", "date") != "date":
+            self.cursor.execute(
+                f'DELETE FROM stocks."{table_name}" AS old USING stocks."{table_name}" AS new '
+                f'WHERE old."Date"::timestamp::date = new."Date"::timestamp::date AND old.ctid < new.ctid;'
+            )
+        self.migrate_types(table_name, column_types)
+        if has_key:
+            return
+        self.cursor.execute(f'ALTER TABLE stocks."{table_name}" ADD PRIMARY KEY ("Date");')
+        logging.info(f"Primary key on \"Date\" added to table {table_name}.")
+
+    def copy_rows(self, table_name: str, df: pd.DataFrame, target: str = None):
+        """
+        Streams the DataFrame into the table with COPY FROM STDIN, from an in-memory CSV buffer.
+
+        The transaction is left open: the caller commits or rolls back.
+
+        Args:
+            table_name (str): Name of the table to load.
+            df (pd.DataFrame): DataFrame with the data to load.
+            target (str, optional): Qualified name of the table written. Defaults to the table of the ticker.
+        """
+        target = target or self.target_table(table_name)
+        buffer = io.StringIO()
+        df.to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+        columns = ", ".join(f'"{col}"' for col in df.columns)
+        self.cursor.copy_expert(f'COPY {target} ({columns}) FROM STDIN WITH (FORMAT csv)', buffer)
+
+    def insert_rows(self, table_name: str, df: pd.DataFrame, target: str = None):
+        """
+        Inserts the DataFrame with multi-row VALUES statements of `VALUES_PAGE_SIZE` rows.
+
+        The transaction is left open: the caller commits or rolls back.
+
+        Args:
+            table_name (str): Name of the table to insert data into.
+            df (pd.DataFrame): DataFrame with the data to insert.
+            target (str, optional): Qualified name of the table written. Defaults to the table of the ticker.
+        """
+        target = target or self.target_table(table_name)
+        columns = ", ".join(f'"{col}"' for col in df.columns)
+        row_template = "(" + ", ".join(["%s"] * len(df.columns)) + ")"
+        for start in range(0, len(df), self.VALUES_PAGE_SIZE):
+            # Plain Python values, with None for the missing ones, so that psycopg2 can adapt them;
+            # only the rows of the current page are converted
+            page = df.iloc[start:start + self.VALUES_PAGE_SIZE]
+            page = page.astype(object).where(page.notna(), None).values.tolist()
+            insert_query = f'INSERT INTO {target} ({columns}) VALUES ' + ", ".join([row_template] * len(page))
+            self.cursor.execute(insert_query, [value for row in page for value in row])
+
+    def write_rows(self, table_name: str, df: pd.DataFrame, target: str = None) -> str:
+        """
+        Writes the DataFrame into the table with COPY, or with multi-row VALUES for small frames.
+
+        Returns:
+            str: The method used, "COPY" or "VALUES".
+        """
+        if len(df) >= self.copy_threshold:
+            self.copy_rows(table_name, df, target)
+            return "COPY"
+        self.insert_rows(table_name, df, target)
+        return "VALUES"
+
+    def upsert_rows(self, table_name: str, df: pd.DataFrame) -> str:
+        """
+        Merges the DataFrame into the table on its key, writing only the new or changed rows.
+
+        The rows are staged into a temporary table, with COPY for the large frames, then merged with
+        INSERT ... ON CONFLICT. A stored row is updated only if one of its values, other than the
+        modification date, differs. The transaction is left open: the caller commits or rolls back.
+
+        Args:
+            table_name (str): Name of the table to merge the data into.
+            df (pd.DataFrame): DataFrame with the data to merge.
+
+        Returns:
+            str: The method used to stage the rows, "COPY" or "VALUES".
+        """
+        if 'Date' not in df.columns:
+            return self.write_rows(table_name, df)
+
+        # A key can only be merged once per statement
+        key_columns = self.key_columns()
+        df = df.drop_duplicates(subset=key_columns, keep='last')
+        staging = f'"staging_{table_name}"'
+        self.cursor.execute(
+            f'CREATE TEMP TABLE IF NOT EXISTS {staging} (LIKE {self.target_table(table_name)} INCLUDING DEFAULTS) ON COMMIT DROP;'
+        )
+        method = self.write_rows(table_name, df, target=staging)
+
+        columns = ", ".join(f'"{col}"' for col in df.columns)
+        keys = ", ".join(f'"{col}"' for col in key_columns)
+        updated = [col for col in df.columns if col not in key_columns]
+        compared = [col for col in updated if col not in VOLATILE_COLUMNS]
+        merge_query = f'INSERT INTO {self.target_table(table_name)} AS stored ({columns}) SELECT {columns} FROM {staging} '
+        if compared:
+            assignments = ", ".join(f'"{col}" = EXCLUDED."{col}"' for col in updated)
+            stored_values = ", ".join(f'stored."{col}"' for col in compared)
+            new_values = ", ".join(f'EXCLUDED."{col}"' for col in compared)
+            merge_query += (f'ON CONFLICT ({keys}) DO UPDATE SET {assignments} '
+                            f'WHERE ({stored_values}) IS DISTINCT FROM ({new_values});')
+        else:
+            merge_query += f'ON CONFLICT ({keys}) DO NOTHING;'
+        self.cursor.execute(merge_query)
+        self.cursor.execute(f'DROP TABLE {staging};')
+        return method
+
+    def adjust_rows(self, table_name: str, factors: pd.DataFrame):
+        """
+        Applies the factors of new splits and dividends to the stored rows of a ticker, in a single UPDATE.
+
+        Each range of dates between two actions is updated with its cumulative factors, given as a
+        VALUES list joined to the table. The transaction is left open: the caller commits or rolls back.
+
+        Args:
+            table_name (str): The ticker whose rows are adjusted.
+            factors (pd.DataFrame): Date, price_factor and volume_factor of each action, see `adjustment_factors`.
+        """
+        segments = adjustment_segments(factors)
+        if not segments:
+            return
+        values = ", ".join(["(%s::date, %s::date, %s::double precision, %s::double precision)"] * len(segments))
+        params = [value for segment in segments for value in segment]
+        prices = ", ".join(f'"{col}" = stored."{col}" * a.price_factor' for col in ("Open", "High", "Low", "Close"))
+        query = (f'UPDATE {self.target_table(table_name)} AS stored SET {prices}, '
+                 f'"Volume" = round(stored."Volume" * a.volume_factor), "Dividends" = stored."Dividends" / a.volume_factor '
+                 f'FROM (VALUES {values}) AS a(start_date, end_date, price_factor, volume_factor) '
+                 f'WHERE (a.start_date IS NULL OR stored."Date" >= a.start_date) AND stored."Date" < a.end_date')
+        if self.layout == "unified":
+            query += ' AND stored."ticker" = %s'
+            params.append(table_name)
+        self.cursor.execute(query + ';', params)
+        logging.info(f"Adjusted the stored rows of {table_name} for {len(segments)} corporate action(s).")
+
     def insert_data(self, table_name: str, df: pd.DataFrame):
         """
         Inserts data from the DataFrame into the PostgreSQL table.
@@ -105,6 +483,9 @@ class PostgresInserter:
             table_name (str): Name of the table to insert data into.
             df (pd.DataFrame): DataFrame with the data to insert.
 
+        Returns:
+            bool: True if the data was inserted, False if the insertion failed and was rolled back.
+
         Raises:
             Exception: If there is an error inserting the data.
         """
@@ -112,61 +493,487 @@ class PostgresInserter:
             self.connect()
         
         try:
-            columns = ", ".join(f'"{col}"' for col in df.columns)
-            values = ", ".join(["%s"] * len(df.columns))
-            insert_query = f'INSERT INTO stocks."{table_name}" ({columns}) VALUES ({values})'
-            self.cursor.executemany(insert_query, df.values.tolist())
+            start = time.perf_counter()
+            if 'Date' in df.columns:
+                self.ensure_partitions(df['Date'].min(), df['Date'].max())
+            method = self.write_rows(table_name, self.frame_for(table_name, df))
             self.conn.commit()
-            logging.info(f"Data inserted into table {table_name} successfully.")
+            self.log_throughput(f"Data inserted into table {table_name} with {method}", len(df), start)
+            return True
         except psycopg2.Error as e:
             logging.error(f"Error inserting data into table {table_name}: {e}")
             self.conn.rollback()
+            return False
+
+    def replace_data(self, table_name: str, df: pd.DataFrame) -> bool:
+        """
+        Replaces the content of a PostgreSQL table with the DataFrame, in a single transaction.
+
+        Args:
+            table_name (str): Name of the table to reload.
+            df (pd.DataFrame): DataFrame with the full content of the table.
+
+        Returns:
+            bool: True if the table was reloaded, False if the reload failed and was rolled back.
+        """
+        return table_name in self.insert_tables({table_name: df}, replace=True)
+
+    def upsert_data(self, table_name: str, df: pd.DataFrame) -> bool:
+        """
+        Merges the DataFrame into the PostgreSQL table, so that reloading the same rows is a no-op.
+
+        Args:
+            table_name (str): Name of the table to merge the data into.
+            df (pd.DataFrame): DataFrame with the data to merge.
+
+        Returns:
+            bool: True if the data was merged, False if the merge failed and was rolled back.
+        """
+        return table_name in self.insert_tables({table_name: df}, upsert=True)
+
+    def insert_tables(self, tables: Dict[str, Union[pd.DataFrame, Iterable[pd.DataFrame]]], replace: bool = False,
+                      upsert: bool = False, adjustments: Optional[Dict[str, pd.DataFrame]] = None,
+                      months: Optional[Dict[str, List[pd.Timestamp]]] = None) -> List[str]:
+        """
+        Inserts the DataFrames of several tables, with one transaction per batch of `batch_size` tables.
+
+        A failure rolls back its whole batch; the following batches are still loaded.
+
+        Args:
+            tables (Dict[str, Union[pd.DataFrame, Iterable[pd.DataFrame]]]): The DataFrame to insert into
+                each table, or its successive chunks, written one at a time (see `CSVLake.iter_chunks`).
+            replace (bool): If True, the previous content of each table is deleted in the same transaction.
+            upsert (bool): If True, the rows are merged on their key instead of being appended.
+            adjustments (Dict[str, pd.DataFrame], optional): Factors of the new corporate actions of some
+                tables, applied to their stored rows in the same transaction, before the new rows.
+            months (Dict[str, List[pd.Timestamp]], optional): Months of some tables whose stored rows are
+                deleted in the same transaction, before the new rows (see `delete_months`).
+
+        Returns:
+            List[str]: The tables whose batch was committed.
+        """
+        if self.cursor is None or self.conn is None:
+            self.connect()
+
+        adjustments = adjustments or {}
+        months = months or {}
+        table_names = list(tables)
+        loaded_tables = []
+        total_rows = 0
+        start = time.perf_counter()
+        for batch_start in range(0, len(table_names), self.batch_size):
+            batch = table_names[batch_start:batch_start + self.batch_size]
+            table_name = None
+            try:
+                batch_rows = 0
+                for table_name in batch:
+                    if replace:
+                        self.delete_rows(table_name)
+                    elif table_name in months:
+                        self.delete_months(table_name, months[table_name])
+                    if table_name in adjustments:
+                        self.adjust_rows(table_name, adjustments[table_name])
+                    chunks = tables[table_name]
+                    for df in [chunks] if isinstance(chunks, pd.DataFrame) else chunks:
+                        if 'Date' in df.columns:
+                            self.ensure_partitions(df['Date'].min(), df['Date'].max())
+                        if upsert:
+                            self.upsert_rows(table_name, self.frame_for(table_name, df))
+                        else:
+                            self.write_rows(table_name, self.frame_for(table_name, df))
+                        batch_rows += len(df)
+                self.conn.commit()
+            except psycopg2.Error as e:
+                logging.error(f"Error loading table {table_name}, batch {batch} rolled back: {e}")
+                self.conn.rollback()
+                continue
+            loaded_tables.extend(batch)
+            total_rows += batch_rows
+        self.log_throughput(f"{len(loaded_tables)} tables loaded", total_rows, start)
+        return loaded_tables
+
+    def merge_tables(self, tables: Dict[str, pd.DataFrame],
+                     adjustments: Optional[Dict[str, pd.DataFrame]] = None) -> List[str]:
+        """
+        Creates the missing tables, migrates the older ones, and merges the DataFrames on their key.
+
+        Args:
+            tables (Dict[str, pd.DataFrame]): The DataFrame to merge into each table.
+            adjustments (Dict[str, pd.DataFrame], optional): Factors of the new corporate actions of some
+                tables, applied to their stored rows before the merge (see `adjust_rows`).
+
+        Returns:
+            List[str]: The tables whose batch was committed.
+        """
+        if self.cursor is None or self.conn is None:
+            self.connect()
+        # Tables created by older versions are migrated to the declared types and the "Date" key first
+        for table_name, df in tables.items():
+            self.create_table(table_name, df)
+        return self.insert_tables(tables, upsert=True, adjustments=adjustments)
+
+    def delete_rows(self, table_name: str):
+        """
+        Deletes the stored rows of a ticker. The transaction is left open: the caller commits or rolls back.
+        """
+        if self.layout == "unified":
+            self.cursor.execute(f'DELETE FROM stocks.{PRICES_TABLE} WHERE "ticker" = %s;', (table_name,))
+        else:
+            self.cursor.execute(f'DELETE FROM stocks."{table_name}";')
+
+    def delete_months(self, table_name: str, months: List[pd.Timestamp]):
+        """
+        Deletes the stored rows of a ticker in the given months, as date ranges matching the "Date" key
+        and the yearly partitions. The transaction is left open: the caller commits or rolls back.
+        """
+        query = (f'DELETE FROM {self.target_table(table_name)} AS stored USING unnest(%s::date[]) AS m(month_start) '
+                 f'WHERE stored."Date" >= m.month_start AND stored."Date" < (m.month_start + interval \'1 month\')::date')
+        params = [[pd.Timestamp(month).date() for month in months]]
+        if self.layout == "unified":
+            query += ' AND stored."ticker" = %s'
+            params.append(table_name)
+        self.cursor.execute(query + ';', params)
+
+    @staticmethod
+    def log_throughput(message: str, rows: int, start: float) -> float:
+        """
+        Logs the number of rows written since `start` and the rate achieved.
+
+        Returns:
+            float: The number of rows written per second.
+        """
+        elapsed = time.perf_counter() - start
+        rows_per_second = rows / elapsed if elapsed > 0 else float("inf")
+        logging.info(f"{message}: {rows} rows in {elapsed:.2f}s ({rows_per_second:.0f} rows/s).")
+        return rows_per_second
+
+    def existing_tables(self, table_names: List[str]) -> List[str]:
+        """
+        Returns the tables of the stocks schema among `table_names`, in a single catalog query.
+        """
+        self.cursor.execute(
+            "SELECT table_name FROM information_schema.tables WHERE table_schema = 'stocks' AND table_name = ANY(%s);",
+            (list(table_names),)
+        )
+        return [row[0] for row in self.cursor.fetchall()]
+
+    def get_last_dates(self, table_names: List[str]) -> Dict[str, datetime]:
+        """
+        Returns the last stored "Date" of each table, in a single query.
+
+        Args:
+            table_names (List[str]): The tables to inspect.
+
+        Returns:
+            Dict[str, datetime]: The last date of each existing, non-empty table.
+        """
+        if self.cursor is None or self.conn is None:
+            self.connect()
+
+        try:
+            if self.layout == "unified":
+                self.cursor.execute(
+                    f'SELECT "ticker", MAX("Date") FROM stocks.{PRICES_TABLE} WHERE "ticker" = ANY(%s) GROUP BY "ticker";',
+                    (list(table_names),)
+                )
+                return {table_name: last_date for table_name, last_date in self.cursor.fetchall() if last_date is not None}
+            existing_tables = self.existing_tables(table_names)
+            if not existing_tables:
+                return {}
+            query = " UNION ALL ".join(
+                f'SELECT %s, MAX("Date") FROM stocks."{table_name}"' for table_name in existing_tables
+            )
+            self.cursor.execute(query, existing_tables)
+            return {table_name: last_date for table_name, last_date in self.cursor.fetchall() if last_date is not None}
+        except psycopg2.Error as e:
+            logging.error(f"Error reading last stored dates: {e}")
+            self.conn.rollback()
+            return {}
+
+    def warehouse_checksums(self, table_names: List[str]) -> pd.DataFrame:
+        """
+        Computes the number of rows and the checksum of each month of each table on the server, in a single query.
+
+        The checksum is the aggregate of `checksums.checksum_sql`, so only one row per month is returned.
+
+        Args:
+            table_names (List[str]): The tables to inspect.
+
+        Returns:
+            pd.DataFrame: ticker, month (first day of the month), rows and checksum.
+        """
+        if self.cursor is None or self.conn is None:
+            self.connect()
+
+        month = 'date_trunc(\'month\', "Date")::date'
+        if self.layout == "unified":
+            self.cursor.execute(
+                f'SELECT "ticker", {month}, count(*), {checksum_sql()} FROM stocks.{PRICES_TABLE} '
+                f'WHERE "ticker" = ANY(%s) GROUP BY 1, 2;',
+                (list(table_names),)
+            )
+            rows = self.cursor.fetchall()
+        else:
+            existing_tables = self.existing_tables(table_names)
+            rows = []
+            if existing_tables:
+                query = " UNION ALL ".join(
+                    f'SELECT %s, {month}, count(*), {checksum_sql()} FROM stocks."{table_name}" GROUP BY 2'
+                    for table_name in existing_tables
+                )
+                self.cursor.execute(query + ';', existing_tables)
+                rows = self.cursor.fetchall()
+        sums = pd.DataFrame(rows, columns=["ticker", "month", "rows", "checksum"])
+        return sums.astype({"ticker": "object", "month": "datetime64[ns]", "rows": "int64", "checksum": "int64"})
+
+    def reconcile(self, table_names: Optional[List[str]] = None, resync: bool = False,
+                  quarantine: Optional[QuarantineStore] = None) -> pd.DataFrame:
+        """
+        Compares the lake and the warehouse month by month, and reloads only the months that differ.
+
+        The checksums of the warehouse are computed on the server and those of the lake with NumPy,
+        chunk by chunk, so only one row per ticker and month is transferred and no history is held
+        in memory. The stored rows of each divergent month are replaced by the rows of the lake, in
+        one transaction per batch of `batch_size` tables; the months missing from the lake are deleted.
+
+        The lake may still hold rows rejected by the validation or the anomaly screen, written before
+        they were quarantined: the lake rows equal to a row of `quarantine` are left out of both the
+        checksums and the reload, so that they never reach the warehouse.
+
+        Args:
+            table_names (List[str], optional): The tickers to check. Defaults to every ticker of the lake.
+            resync (bool): If False, the divergent months are only reported.
+            quarantine (QuarantineStore, optional): The store of the rejected rows.
+
+        Returns:
+            pd.DataFrame: The divergent (ticker, month) partitions, with their rows and checksum on both
+                sides and whether they were reloaded.
+        """
+        lake = self.get_lake()
+        table_names = lake.tickers() if table_names is None else list(table_names)
+        rejected = self._quarantined_hashes(quarantine, table_names)
+
+        def valid_chunks(table_name):
+            return self._rows_not_in(lake.iter_chunks(table_name, self.chunk_size), rejected.get(table_name))
+
+        lake_sums = {
+            table_name: combine_checksums([month_checksums(chunk) for chunk in valid_chunks(table_name)])
+            for table_name in table_names
+        }
+        try:
+            warehouse_sums = self.warehouse_checksums(table_names)
+        except psycopg2.Error as e:
+            logging.error(f"Error computing the checksums of the warehouse: {e}")
+            self.conn.rollback()
+            raise
+        divergent = compare_checksums(lake_sums, warehouse_sums)
+        divergent["resynced"] = False
+        logging.info(f"{len(divergent)} divergent month(s) in {divergent['ticker'].nunique()} table(s) "
+                     f"out of {len(table_names)} checked.")
+        if not resync or divergent.empty:
+            return divergent
+
+        tables, months = {}, {}
+        for table_name, partitions in divergent.groupby("ticker", sort=False):
+            months[table_name] = list(partitions["month"])
+            if lake.exists(table_name):
+                entry, _ = self.describe_lake_file(table_name)
+                self.create_table(table_name, self.structure_from_manifest(entry))
+            # Only the rows of the divergent months are kept from each chunk
+            tables[table_name] = self._rows_in_months(valid_chunks(table_name), partitions["month"])
+        loaded = self.insert_tables(tables, months=months)
+        divergent["resynced"] = divergent["ticker"].isin(loaded)
+        for table_name in loaded:
+            if lake.exists(table_name):
+                entry, _ = self.describe_lake_file(table_name)
+                lake.manifest.mark_loaded(table_name, self.load_target(), entry["hash"])
+        logging.info(f"Reloaded {int(divergent['resynced'].sum())} month(s) of {len(loaded)} table(s).")
+        return divergent
+
+    @staticmethod
+    def _quarantined_hashes(quarantine: Optional[QuarantineStore], table_names: List[str]) -> Dict[str, np.ndarray]:
+        if quarantine is None:
+            return {}
+        rows = quarantine.read()
+        rows = rows[rows["ticker"].isin(table_names)]
+        rows = rows.assign(Date=pd.to_datetime(rows["Date"], format="mixed", errors="coerce")).dropna(subset=["Date"])
+        return {ticker: row_hashes(group) for ticker, group in rows.groupby("ticker", sort=False)}
+
+    @staticmethod
+    def _rows_not_in(chunks: Iterable[pd.DataFrame], hashes: Optional[np.ndarray]) -> Iterator[pd.DataFrame]:
+        for chunk in chunks:
+            yield chunk if hashes is None else chunk[~np.isin(row_hashes(chunk), hashes)]
+
+    @staticmethod
+    def _rows_in_months(chunks: Iterable[pd.DataFrame], months: pd.Series) -> Iterator[pd.DataFrame]:
+        for chunk in chunks:
+            in_months = chunk["Date"].dt.to_period("M").dt.start_time.isin(months)
+            if in_months.any():
+                yield chunk[in_months.to_numpy()]
+
+    def get_lake(self) -> CSVLake:
+        """
+        Returns the lake backend, defaulting to the CSV files of the save path.
+        """
+        if self.lake is None:
+            self.lake = CSVLake(self.save_path)
+        return self.lake
+
+    def load_target(self) -> str:
+        """
+        Returns the identifier of the database in the lake manifest.
+
+        The unified layout has its own identifier, so that switching layout reloads every file.
+        """
+        target = f"{self.host}:{self.port}/{self.dbname}"
+        return f"{target}/{PRICES_TABLE}" if self.layout == "unified" else target
+
+    def describe_lake_file(self, table_name: str) -> Tuple[dict, Optional[pd.DataFrame]]:
+        """
+        Returns the manifest entry of a lake file, indexing the file if the manifest is missing or stale.
+
+        Returns:
+            Tuple[dict, Optional[pd.DataFrame]]: The entry, and the data if it had to be read to index it.
+        """
+        lake = self.get_lake()
+        entry = lake.describe(table_name)
+        if entry is not None:
+            return entry, None
+        df = lake.read(table_name)
+        return lake.refresh_manifest(table_name, df), df
+
+    @staticmethod
+    def structure_from_manifest(entry: dict) -> pd.DataFrame:
+        """
+        Returns an empty DataFrame with the columns and dtypes recorded in a manifest entry.
+        """
+        return pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in entry["columns"].items()})
+
+    def load_tables(self, table_names: List[str], force: bool = False) -> List[str]:
+        """
+        Creates the tables of lake files and merges those whose file changed since its last load.
+
+        Unchanged files are not read at all. The changed files are streamed in chunks of `chunk_size`
+        rows and merged on the "Date" key, with one transaction per batch of `batch_size` tables:
+        only their new or changed rows are written, so a rerun never duplicates rows. At most one
+        chunk per worker is held in memory, whatever the length of the histories or their number;
+        a file changed outside of the lake is read whole once more, to be indexed.
+
+        Args:
+            table_names (List[str]): The stock symbols of the lake files.
+            force (bool): If True, the tables are merged even if their file did not change.
+
+        Returns:
+            List[str]: The tables that were merged.
+        """
+        lake = self.get_lake()
+        pending = []
+        for table_name in table_names:
+            entry, _ = self.describe_lake_file(table_name)
+            self.create_table(table_name, self.structure_from_manifest(entry))
+            if not force and lake.manifest.is_loaded(table_name, self.load_target()):
+                logging.info(f"Table {table_name} is up to date with {lake.path(table_name)}, skipped.")
+                continue
+            # The rows are streamed from the file by the load, so that no history is kept in memory meanwhile
+            pending.append((table_name, entry, None))
+
+        if pending and self.layout == "unified":
+            # Created once, before the batches, so that parallel loads never race to create a partition
+            try:
+                self.ensure_partitions(min(entry["min_date"] for _, entry, _ in pending if entry["min_date"]),
+                                       max(entry["max_date"] for _, entry, _ in pending if entry["max_date"]))
+                self.conn.commit()
+            except (psycopg2.Error, ValueError) as e:
+                logging.error(f"Error creating the partitions of table {PRICES_TABLE}: {e}")
+                self.conn.rollback()
+
+        batches = [pending[start:start + self.batch_size] for start in range(0, len(pending), self.batch_size)]
+        if self.pool is not None and self.max_workers > 1:
+            results = self.run_on_pool(lambda worker, batch: worker.load_batch(batch), batches)
+        else:
+            results = [self.load_batch(batch) for batch in batches]
+        return [table_name for loaded in results for table_name in loaded]
+
+    def load_batch(self, batch: List[Tuple[str, dict, Optional[pd.DataFrame]]]) -> List[str]:
+        """
+        Merges a batch of tables in a single transaction and records them as loaded in the manifest.
+
+        The lake files are streamed in chunks of `chunk_size` typed rows, each chunk being staged with
+        COPY (or paged VALUES statements for the small ones) and merged before the next one is read.
+
+        Args:
+            batch (List[Tuple[str, dict, Optional[pd.DataFrame]]]): The table names, with their manifest
+                entry and their data if it was read already.
 
+        Returns:
+            List[str]: The tables that were merged.
+        """
+        lake = self.get_lake()
+        tables = {
+            table_name: lake.iter_chunks(table_name, self.chunk_size) if df is None else df
+            for table_name, _, df in batch
+        }
+        loaded = self.insert_tables(tables, upsert=True)
+        for table_name, entry, _ in batch:
+            if table_name in loaded:
+                lake.manifest.mark_loaded(table_name, self.load_target(), entry["hash"])
+                logging.info(f"Data from {lake.path(table_name)} loaded into table {table_name}.")
+        return loaded
+
+    def load_table(self, table_name: str, force: bool = False) -> bool:
+        """
+        Creates the table of a lake file and merges it if the file changed since its last load.
+
+        Args:
+            table_name (str): The stock symbol of the lake file.
+            force (bool): If True, the table is merged even if the file did not change.
+
+        Returns:
+            bool: True if the table was merged.
+        """
+        return table_name in self.load_tables([table_name], force)
 
     def process_and_create_tables(self):
         """
-        Processes all CSV files in the save path and creates the tables in PostgreSQL.
+        Creates the tables of all files of the lake in PostgreSQL, from the structures recorded in the manifest.
 
         Raises:
-            Exception: If there is an error processing the CSV files.
+            Exception: If there is an error processing the files.
         """
         try:
-            for filename in os.listdir(self.save_path):
-                if filename.endswith(".csv"):
-                    file_path = os.path.join(self.save_path, filename)
-                    table_name = self.extract_ticker(filename)
-                    df = pd.read_csv(file_path)
-                    self.create_table(table_name, df)
-                    logging.info(f"Table created for {filename} as {table_name}.")
+            lake = self.get_lake()
+            for table_name in lake.tickers():
+                entry, _ = self.describe_lake_file(table_name)
+                self.create_table(table_name, self.structure_from_manifest(entry))
+                logging.info(f"Table created for {lake.path(table_name)} as {table_name}.")
         except Exception as e:
             logging.error(f"Error processing and creating tables: {e}")
 
-    def process_and_insert_data(self):
+    def process_and_insert_data(self, force: bool = False):
         """
-        Processes all CSV files in the save path and inserts the data into PostgreSQL.
+        Loads into PostgreSQL the files of the lake that changed since their last load.
+
+        Args:
+            force (bool): If True, every table is merged.
 
         Raises:
-            Exception: If there is an error processing the CSV files.
+            Exception: If there is an error processing the files.
         """
         try:
-            for filename in os.listdir(self.save_path):
-                if filename.endswith(".csv"):
-                    file_path = os.path.join(self.save_path, filename)
-                    table_name = self.extract_ticker(filename)
-                    df = pd.read_csv(file_path)
-                    self.insert_data(table_name, df)
-                    logging.info(f"Data from {filename} inserted into table {table_name}.")
+            self.load_tables(self.get_lake().tickers(), force)
         except Exception as e:
             logging.error(f"Error processing and inserting data: {e}")
 
-    def process_and_insert_all(self):
+    def process_and_insert_all(self, force: bool = False):
         """
-        Processes and inserts data from all CSV files in the save path into PostgreSQL.
+        Creates the tables and loads the changed files of the lake into PostgreSQL.
+
+        Args:
+            force (bool): If True, every table is merged even if its file did not change.
         """
         try:
             self.connect()
-            self.process_and_create_tables()
-            self.process_and_insert_data()
+            self.process_and_insert_data(force)
         except Exception as e:
             logging.error(f"Error in process_and_insert_all: {e}")
         finally:
@@ -187,20 +994,17 @@ class PostgresInserter:
 
     def delete_data(self):
         """
-        Deletes data from all tables corresponding to the CSV files in the save path.
+        Deletes data from all tables corresponding to the files of the lake.
 
         Raises:
             Exception: If there is an error deleting the data.
         """
         try:
             self.connect()
-            for filename in os.listdir(self.save_path):
-                if filename.endswith(".csv"):
-                    table_name = self.extract_ticker(filename)
-                    delete_query = f'DELETE FROM stocks."{table_name}";'
-                    self.cursor.execute(delete_query)
-                    self.conn.commit()
-                    logging.info(f"Data deleted from table {table_name}.")
+            for table_name in self.get_lake().tickers():
+                self.delete_rows(table_name)
+                self.conn.commit()
+                logging.info(f"Data deleted from table {table_name}.")
         except psycopg2.Error as e:
             logging.error(f"Error deleting data from table {table_name}: {e}")
             self.conn.rollback()
@@ -212,6 +1016,9 @@ class DataExporter(PostgresInserter):
     """
     Exports intraday data from PostgreSQL tables to a single Excel file with multiple sheets.
 
+    All the requested tickers are fetched with a single query, whose rows are streamed through a
+    named server-side cursor in batches of `fetch_size` rows.
+
     Attributes:
         dbname (str): Name of the PostgreSQL database.
         user (str): Database user.
@@ -219,9 +1026,13 @@ class DataExporter(PostgresInserter):
         host (str): Host address of the PostgreSQL server.
         port (str): Port number for the PostgreSQL server.
         save_path (str): Path to the directory to save the Excel files.
+        pool (ConnectionPool): Shared pool the connections are taken from, if any.
+        layout (str): "per_ticker" or "unified", see PostgresInserter.
+        fetch_size (int): Number of rows fetched from the server at a time.
     """
 
-    def __init__(self, dbname: str, user: str, password: str, host: str, port: str, save_path: str = "."):
+    def __init__(self, dbname: str, user: str, password: str, host: str, port: str, save_path: str = ".",
+                 pool: ConnectionPool = None, layout: str = "per_ticker", fetch_size: int = 10000):
         """
         Initializes the class with database connection details and save path.
 
@@ -232,14 +1043,117 @@ class DataExporter(PostgresInserter):
             host (str): Host address of the PostgreSQL server.
             port (str): Port number for the PostgreSQL server.
             save_path (str): Path to the directory to save the Excel files.
+            pool (ConnectionPool, optional): Shared pool to take the connection from.
+            layout (str): "per_ticker" or "unified", see PostgresInserter.
+            fetch_size (int): Number of rows fetched from the server at a time.
         """
-        super().__init__(dbname, user, password, host, port, save_path)
+        super().__init__(dbname, user, password, host, port, save_path, pool=pool, layout=layout)
+        self.fetch_size = fetch_size
 
         # Create the save directory if it doesn't exist
         if not os.path.exists(self.save_path):
             os.makedirs(self.save_path)
             logging.info(f"Created directory {self.save_path} for saving Excel file.")
 
+    @staticmethod
+    def date_bounds(start=None, end=None) -> Tuple[date, date]:
+        """
+        Returns the half-open range of days [start, end + 1 day) to export, defaulting to today.
+
+        Args:
+            start (optional): The first day to export. Defaults to today.
+            end (optional): The last day to export, included. Defaults to `start`.
+        """
+        start_day = pd.Timestamp(start).date() if start is not None else date.today()
+        end_day = pd.Timestamp(end).date() if end is not None else start_day
+        return start_day, end_day + timedelta(days=1)
+
+    def range_query(self, table_names: List[str], start_day: date, end_day: date) -> Tuple[Optional[str], list]:
+        """
+        Builds the single query returning the rows of the tickers in [start_day, end_day), with a ticker column.
+
+        In the per-ticker layout, the existing tables are combined with UNION ALL; each branch
+        filters its own table on "Date".
+
+        Returns:
+            Tuple[Optional[str], list]: The query and its parameters, or (None, []) if no table exists.
+        """
+        if self.layout == "unified":
+            query = (f'SELECT * FROM stocks.{PRICES_TABLE} WHERE "ticker" = ANY(%s) AND "Date" >= %s AND "Date" < %s '
+                     f'ORDER BY "ticker", "Date";')
+            return query, [list(table_names), start_day, end_day]
+        existing_tables = self.existing_tables(table_names)
+        if not existing_tables:
+            return None, []
+        branches = " UNION ALL ".join(
+            f'SELECT %s AS "ticker", * FROM stocks."{table_name}" WHERE "Date" >= %s AND "Date" < %s'
+            for table_name in existing_tables
+        )
+        params = [value for table_name in existing_tables for value in (table_name, start_day, end_day)]
+        return f'SELECT * FROM ({branches}) AS export ORDER BY "ticker", "Date";', params
+
+    def stream_range(self, table_names: List[str], start=None, end=None) -> Iterator[pd.DataFrame]:
+        """
+        Streams the rows of the tickers between two days, in DataFrames of at most `fetch_size` rows.
+
+        The rows are read through a named server-side cursor, so that only one batch is held in
+        memory at a time, whatever the size of the range.
+
+        Args:
+            table_names (List[str]): The tickers to export.
+            start (optional): The first day to export. Defaults to today.
+            end (optional): The last day to export, included. Defaults to `start`.
+
+        Yields:
+            pd.DataFrame: The next batch of rows, with a leading ticker column.
+        """
+        if self.conn is None or self.cursor is None:
+            self.connect()
+
+        query, params = self.range_query(table_names, *self.date_bounds(start, end))
+        if query is None:
+            return
+        cursor = self.conn.cursor(name=f"export_{id(self)}")
+        cursor.itersize = self.fetch_size
+        try:
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(self.fetch_size)
+                if not rows:
+                    break
+                yield pd.DataFrame(rows, columns=[desc[0] for desc in cursor.description])
+        finally:
+            cursor.close()
+            # Ends the transaction the named cursor lived in
+            self.conn.commit()
+
+    def retrieve_range(self, table_names: List[str], start=None, end=None) -> Dict[str, Optional[pd.DataFrame]]:
+        """
+        Fetches the rows of several tickers between two days, with a single query.
+
+        Args:
+            table_names (List[str]): The tickers to fetch.
+            start (optional): The first day to fetch. Defaults to today.
+            end (optional): The last day to fetch, included. Defaults to `start`.
+
+        Returns:
+            Dict[str, Optional[pd.DataFrame]]: The rows of each ticker, without the ticker column,
+                or None for every ticker if the query failed.
+        """
+        try:
+            batches = list(self.stream_range(table_names, start, end))
+        except psycopg2.Error as e:
+            logging.error(f"Error fetching data for {len(table_names)} tables: {e}")
+            self.conn.rollback()
+            return {table_name: None for table_name in table_names}
+        if not batches:
+            return {table_name: pd.DataFrame() for table_name in table_names}
+        df = pd.concat(batches, ignore_index=True)
+        return {
+            table_name: df[df['ticker'] == table_name].drop(columns='ticker').reset_index(drop=True)
+            for table_name in table_names
+        }
+
     def retrieve_data(self, table_name: str) -> pd.DataFrame:
         """
         Fetches data from a PostgreSQL table where the Date column is equal to today's date.
@@ -252,51 +1166,107 @@ class DataExporter(PostgresInserter):
         """
         if self.conn is None or self.cursor is None:
             return None
-        
+        return self.retrieve_range([table_name])[table_name]
+
+    def export_range(self, table_names: List[str], filename: str, start=None, end=None,
+                     export_format: str = None) -> dict:
+        """
+        Exports the rows of the tickers between two days to a file, one batch at a time.
+
+        Memory use is bounded by `fetch_size` in every format, so that large historical ranges
+        can be exported: "xlsx" (one sheet per ticker, written in write-only mode), "csv",
+        "csv.gz" or "npz" (one typed array per column).
+
+        Args:
+            table_names (List[str]): The tickers to export.
+            filename (str): The name of the file, in the save path.
+            start (optional): The first day to export. Defaults to today.
+            end (optional): The last day to export, included. Defaults to `start`.
+            export_format (str, optional): The format of the file. Defaults to the format of its extension.
+
+        Returns:
+            dict: The report of the export (path, format, rows, bytes, seconds).
+        """
+        filepath = os.path.join(self.save_path, filename)
         try:
-            current_date_str = datetime.now().strftime('%Y-%m-%d 00:00:00')
-            
-            query = f'SELECT * FROM stocks.\"{table_name}\" WHERE "Date" = %s ORDER BY date_modification DESC;'
-            self.cursor.execute(query, (current_date_str,))
-            rows = self.cursor.fetchall()
-            colnames = [desc[0] for desc in self.cursor.description]
-            df = pd.DataFrame(rows, columns=colnames)
-            return df
-        except psycopg2.Error as e:
-            print(f"Error fetching data from table {table_name}: {e}")
-            return None
+            return write_export(self.stream_range(table_names, start, end), filepath, export_format)
+        except Exception as e:
+            logging.error(f"Error exporting to {filename}: {e}")
+            raise
+
+    def export_range_to_csv(self, table_names: List[str], filename: str, start=None, end=None) -> int:
+        """
+        Exports the rows of the tickers between two days to a CSV file, gzip-compressed if its
+        name ends with ".gz", one batch at a time.
+
+        Returns:
+            int: The number of rows exported.
+        """
+        export_format = "csv.gz" if filename.endswith(".gz") else "csv"
+        return self.export_range(table_names, filename, start, end, export_format)["rows"]
+
+    def export_for_recipient(self, table_names: List[str], basename: str, formats: List[str],
+                             max_bytes: int = None, start=None, end=None) -> dict:
+        """
+        Exports the rows of the tickers in the first format of the recipient that fits in `max_bytes`.
+
+        The formats are tried in order, each one re-running the query; the files that are too
+        large are deleted. If none fits, the smallest file is kept.
+
+        Args:
+            table_names (List[str]): The tickers to export.
+            basename (str): The name of the file without extension, in the save path.
+            formats (List[str]): The formats the recipient can open, by order of preference.
+            max_bytes (int, optional): The maximum size of the file. Unbounded if None.
+            start (optional): The first day to export. Defaults to today.
+            end (optional): The last day to export, included. Defaults to `start`.
+
+        Returns:
+            dict: The report of the kept export (path, format, rows, bytes, seconds).
+        """
+        reports = []
+        for export_format in formats:
+            report = self.export_range(table_names, f"{basename}.{export_format}", start, end, export_format)
+            if max_bytes is None or report["bytes"] <= max_bytes:
+                chosen = report
+                break
+            reports.append(report)
+            logging.info(f"Export {report['path']} exceeds {max_bytes} bytes, trying the next format.")
+        else:
+            chosen = min(reports, key=lambda report: report["bytes"])
+        for report in reports:
+            if report is not chosen:
+                os.remove(report["path"])
+        return chosen
 
     def export_to_excel(self, table_data: dict, excel_filename: str):
         """
         Exports data from PostgreSQL tables to an Excel file with each table's data in a separate sheet.
+
+        The sheets are written in write-only mode, one row at a time.
         """
         filepath = os.path.join(self.save_path, excel_filename)
+        batches = []
+        for table_name, df in table_data.items():
+            if df is not None and not df.empty:
+                batches.append(df.assign(ticker=table_name))
+                logging.info(f"Exported data for table {table_name} to {excel_filename}")
+            else:
+                logging.info(f"No data to export for table {table_name}")
         try:
-            with pd.ExcelWriter(filepath) as writer:
-                has_data = False
-                for table_name, df in table_data.items():
-                    if df is not None and not df.empty:
-                        df.to_excel(writer, sheet_name=table_name, index=False)
-                        logging.info(f"Exported data for table {table_name} to {excel_filename}")
-                        has_data = True
-                    else:
-                        logging.info(f"No data to export for table {table_name}")
-                if not has_data:
-                    pd.DataFrame({"Info": ["No data available for any table"]}).to_excel(writer, sheet_name="Info", index=False)
-                    logging.info("No data available for any table, created Info sheet.")
+            write_xlsx(batches, filepath)
         except Exception as e:
             logging.error(f"Error exporting to Excel: {e}")
             raise
 
-    def export_all_tables(self, table_names: List[str]):
+    def export_all_tables(self, table_names: List[str], start=None, end=None):
         """
-        Fetches and exports data for all specified tables.
+        Fetches and exports data for all specified tables, with a single query.
 
         Args:
             table_names (List[str]): A list of table names to fetch and export data.
+            start (optional): The first day to export. Defaults to today.
+            end (optional): The last day to export, included. Defaults to `start`.
         """
-        table_data = {}
-        for table_name in table_names:
-            df = self.retrieve_data(table_name)
-            table_data[table_name] = df
+        table_data = self.retrieve_range(table_names, start, end)
         self.export_to_excel(table_data, "Today_Data.xlsx")
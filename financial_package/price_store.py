@@ -0,0 +1,201 @@
+import time
+import logging
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Union
+import numpy as np
+import pandas as pd
+from financial_package.lake import CSVLake
+
+DEFAULT_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+# First day requested from the warehouse when a whole history is loaded
+MIN_DATE = pd.Timestamp("1900-01-01")
+
+# Stores of the process, invalidated together when the daily update writes
+_stores = weakref.WeakSet()
+
+
+def invalidate_price_stores(tickers_list: Optional[Iterable[str]] = None) -> None:
+    """
+    Drops the cached histories of the given tickers (all of them if not set) in every PriceStore of the process.
+    """
+    tickers_list = list(tickers_list) if tickers_list is not None else None
+    for store in list(_stores):
+        store.invalidate(tickers_list)
+
+
+class PriceStore:
+    """
+    Read API of the price histories: `get` returns tickers x date range x columns, aligned on dates.
+
+    The whole history of each ticker is loaded once, from the lake or the warehouse, and kept in
+    an in-process LRU cache bounded by its size in bytes, so that repeated range queries are
+    served from memory. A cached history is dropped when it is written: with a lake backend, the
+    size and modification time of its files are checked on each query; with the warehouse, the
+    daily update invalidates the stores of its process, and `max_age` bounds the age of a history
+    loaded by another process.
+
+    Attributes:
+        lake (CSVLake): The lake the histories are read from, if any.
+        exporter (DataExporter): The warehouse reader the histories are read from, if no lake.
+        max_bytes (int): Maximum size of the cached histories.
+        max_age (float): Maximum age of a cached history, in seconds, if set.
+        stats (dict): Hits, misses, evictions and cached bytes.
+    """
+
+    def __init__(self, lake: Optional[CSVLake] = None, exporter=None, max_bytes: int = 256 * 1024 * 1024,
+                 max_age: Optional[float] = None):
+        """
+        Args:
+            lake (CSVLake, optional): The lake to read from.
+            exporter (DataExporter, optional): The warehouse reader, used if no lake is given.
+            max_bytes (int): Maximum size of the cached histories, in bytes.
+            max_age (float, optional): Maximum age of a cached history, in seconds.
+
+        Raises:
+            ValueError: If neither a lake nor an exporter is given.
+        """
+        if lake is None and exporter is None:
+            raise ValueError("PriceStore needs a lake or a warehouse exporter to read from.")
+        self.lake = lake
+        self.exporter = exporter
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "bytes": 0}
+        self._cache = OrderedDict()
+        self._lock = threading.RLock()
+        _stores.add(self)
+
+    def get(self, tickers_list: Union[str, List[str]], start=None, end=None, columns: Optional[List[str]] = None,
+            as_frame: bool = False) -> Union[Dict[str, np.ndarray], pd.DataFrame]:
+        """
+        Returns the values of the tickers between two days, aligned on the union of their dates.
+
+        Args:
+            tickers_list (Union[str, List[str]]): The tickers to read.
+            start (optional): The first day, included. Defaults to the first stored day.
+            end (optional): The last day, included. Defaults to the last stored day.
+            columns (List[str], optional): The columns to read. Defaults to OHLCV.
+            as_frame (bool): If True, returns a DataFrame indexed by Date, with (column, ticker) columns.
+
+        Returns:
+            Union[Dict[str, np.ndarray], pd.DataFrame]: By default, "dates" (n_dates,) and, for each column,
+                a (n_dates, n_tickers) float64 array, NaN where a ticker has no row on a date.
+        """
+        tickers_list = [tickers_list] if isinstance(tickers_list, str) else list(tickers_list)
+        columns = list(columns) if columns is not None else DEFAULT_COLUMNS
+        histories = self._histories(tickers_list)
+
+        start = pd.Timestamp(start).to_datetime64() if start is not None else None
+        end = pd.Timestamp(end).to_datetime64() if end is not None else None
+        slices = []
+        for ticker_symbol in tickers_list:
+            history = histories.get(ticker_symbol)
+            if history is None:
+                slices.append(None)
+                continue
+            dates = history["Date"]
+            first = np.searchsorted(dates, start, side="left") if start is not None else 0
+            last = np.searchsorted(dates, end, side="right") if end is not None else len(dates)
+            slices.append((history, slice(first, last)))
+
+        all_dates = [history["Date"][rows] for history, rows in filter(None, slices)]
+        dates = np.unique(np.concatenate(all_dates)) if all_dates else np.array([], dtype="datetime64[ns]")
+        result = {"dates": dates}
+        for col in columns:
+            result[col] = np.full((len(dates), len(tickers_list)), np.nan)
+        for position, entry in enumerate(slices):
+            if entry is None:
+                continue
+            history, rows = entry
+            positions = np.searchsorted(dates, history["Date"][rows])
+            for col in columns:
+                if col in history:
+                    result[col][positions, position] = history[col][rows]
+        if not as_frame:
+            return result
+        frame = pd.DataFrame(
+            np.concatenate([result[col] for col in columns], axis=1) if columns else np.empty((len(dates), 0)),
+            index=pd.DatetimeIndex(dates, name="Date"),
+            columns=pd.MultiIndex.from_product([columns, tickers_list], names=["column", "ticker"])
+        )
+        return frame
+
+    def invalidate(self, tickers_list: Optional[List[str]] = None) -> None:
+        """
+        Drops the cached histories of the given tickers, or all of them.
+        """
+        with self._lock:
+            for ticker_symbol in list(self._cache) if tickers_list is None else tickers_list:
+                self._drop(ticker_symbol)
+
+    def _histories(self, tickers_list: List[str]) -> Dict[str, Dict[str, np.ndarray]]:
+        histories, missing = {}, []
+        with self._lock:
+            for ticker_symbol in dict.fromkeys(tickers_list):
+                entry = self._cache.get(ticker_symbol)
+                if entry is not None and self._is_current(ticker_symbol, entry):
+                    self._cache.move_to_end(ticker_symbol)
+                    self.stats["hits"] += 1
+                    histories[ticker_symbol] = entry["arrays"]
+                else:
+                    self._drop(ticker_symbol)
+                    self.stats["misses"] += 1
+                    missing.append(ticker_symbol)
+        if missing:
+            for ticker_symbol, (arrays, version) in self._load(missing).items():
+                histories[ticker_symbol] = arrays
+                self._put(ticker_symbol, arrays, version)
+        return histories
+
+    def _is_current(self, ticker_symbol: str, entry: dict) -> bool:
+        if self.max_age is not None and time.monotonic() - entry["loaded_at"] > self.max_age:
+            return False
+        return self.lake is None or self.lake.version(ticker_symbol) == entry["version"]
+
+    def _load(self, tickers_list: List[str]) -> Dict[str, tuple]:
+        loaded = {}
+        if self.lake is not None:
+            for ticker_symbol in tickers_list:
+                # The version is taken before the read: a write during the read makes the next query reload
+                version = self.lake.version(ticker_symbol)
+                history = self.lake.read(ticker_symbol)
+                if history is not None:
+                    loaded[ticker_symbol] = (self._arrays(history), version)
+            return loaded
+        # All the missing tickers in one round trip to the warehouse
+        batches = list(self.exporter.stream_range(tickers_list, MIN_DATE, pd.Timestamp.today()))
+        if batches:
+            rows = pd.concat(batches, ignore_index=True)
+            for ticker_symbol, history in rows.groupby("ticker", sort=False):
+                loaded[ticker_symbol] = (self._arrays(history.drop(columns="ticker")), None)
+        logging.info(f"Loaded {len(loaded)}/{len(tickers_list)} histories from the warehouse.")
+        return loaded
+
+    @staticmethod
+    def _arrays(history: pd.DataFrame) -> Dict[str, np.ndarray]:
+        history = history.sort_values("Date")
+        arrays = {"Date": pd.to_datetime(history["Date"]).to_numpy(dtype="datetime64[ns]")}
+        for col in history.columns:
+            if col != "Date" and pd.api.types.is_numeric_dtype(history[col].dtype):
+                arrays[col] = history[col].to_numpy(dtype="float64")
+        return arrays
+
+    def _put(self, ticker_symbol: str, arrays: Dict[str, np.ndarray], version) -> None:
+        size = sum(array.nbytes for array in arrays.values())
+        with self._lock:
+            self._drop(ticker_symbol)
+            self._cache[ticker_symbol] = {"arrays": arrays, "version": version, "bytes": size,
+                                          "loaded_at": time.monotonic()}
+            self.stats["bytes"] += size
+            # The least recently used histories are evicted first; the new one is always kept
+            while self.stats["bytes"] > self.max_bytes and len(self._cache) > 1:
+                evicted, _ = next(iter(self._cache.items()))
+                self._drop(evicted)
+                self.stats["evictions"] += 1
+
+    def _drop(self, ticker_symbol: str) -> None:
+        entry = self._cache.pop(ticker_symbol, None)
+        if entry is not None:
+            self.stats["bytes"] -= entry["bytes"]
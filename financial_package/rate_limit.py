@@ -0,0 +1,157 @@
+import time
+import random
+import threading
+import socket
+import logging
+
+# Fragments of error messages returned by the provider when a request should be retried later
+TRANSIENT_ERROR_MARKERS = (
+    "429",
+    "too many requests",
+    "rate limit",
+    "timed out",
+    "timeout",
+    "temporarily unavailable",
+    "502",
+    "503",
+    "504",
+    "connection reset",
+    "connection aborted",
+)
+
+
+def is_transient_error(error: Exception) -> bool:
+    """
+    Tells whether a fetch error is worth retrying (throttling, timeout, network or server error).
+
+    Args:
+        error (Exception): The error raised by the data source.
+
+    Returns:
+        bool: True if the request may succeed when retried later.
+    """
+    if isinstance(error, (TimeoutError, ConnectionError, socket.timeout)):
+        return True
+    status_code = getattr(getattr(error, "response", None), "status_code", None)
+    if status_code is not None and (status_code == 429 or status_code >= 500):
+        return True
+    if "RateLimit" in type(error).__name__ or "Timeout" in type(error).__name__:
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in TRANSIENT_ERROR_MARKERS)
+
+
+def is_throttling_error(error: Exception) -> bool:
+    """
+    Tells whether a fetch error is an explicit throttling response from the provider.
+    """
+    status_code = getattr(getattr(error, "response", None), "status_code", None)
+    if status_code == 429 or "RateLimit" in type(error).__name__:
+        return True
+    message = str(error).lower()
+    return any(marker in message for marker in ("429", "too many requests", "rate limit"))
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket shared by all the fetch workers, whose rate adapts to the provider responses.
+
+    Each request takes a token; tokens are refilled at `rate` per second up to `capacity`.
+    The rate is cut by `decrease_factor` on every throttling response and raised again by
+    `increase_step` on every success (additive increase, multiplicative decrease).
+
+    Attributes:
+        rate (float): Current number of requests allowed per second.
+        throttled (int): Number of throttling responses observed.
+    """
+
+    def __init__(self, rate: float = 2.0, capacity: float = 5.0, min_rate: float = 0.1, max_rate: float = None,
+                 increase_step: float = 0.05, decrease_factor: float = 0.5):
+        """
+        Initializes the limiter with a full bucket.
+
+        Args:
+            rate (float): Initial number of requests allowed per second.
+            capacity (float): Maximum number of tokens, i.e. the largest burst allowed.
+            min_rate (float): Lower bound of the adapted rate.
+            max_rate (float, optional): Upper bound of the adapted rate. Defaults to `rate`.
+            increase_step (float): Rate added after each successful request.
+            decrease_factor (float): Factor applied to the rate after each throttling response.
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.min_rate = min_rate
+        self.max_rate = rate if max_rate is None else max_rate
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.throttled = 0
+        self._tokens = capacity
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """
+        Blocks until a token is available and takes it.
+
+        Returns:
+            float: The time spent waiting, in seconds.
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+    def record_success(self) -> None:
+        """
+        Raises the rate after a successful request.
+        """
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase_step)
+
+    def record_throttle(self) -> None:
+        """
+        Cuts the rate and empties the bucket after a throttling response.
+        """
+        with self._lock:
+            self._refill()
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+            self._tokens = min(self._tokens, 0)
+            self.throttled += 1
+            logging.warning(f"Provider throttling detected, fetch rate lowered to {self.rate:.2f} requests/s.")
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with jitter for the fetches that failed with a transient error.
+
+    Attributes:
+        max_attempts (int): Total number of attempts per ticker, the first one included.
+        base_delay (float): Delay before the first retry, in seconds.
+        max_delay (float): Upper bound of the delay, in seconds.
+    """
+
+    def __init__(self, max_attempts: int = 4, base_delay: float = 2.0, max_delay: float = 60.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int) -> float:
+        """
+        Returns the delay before the retry following the failed attempt number `attempt` (starting at 0).
+
+        Half of the exponential delay is fixed and the other half is random, so that workers
+        throttled together do not retry together.
+        """
+        backoff = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return backoff / 2 + random.uniform(0, backoff / 2)
@@ -0,0 +1,84 @@
+import logging
+from typing import Dict
+import pandas as pd
+
+# Declared schema of the daily OHLCV histories: column -> (in-memory dtype, PostgreSQL type).
+# Prices fit in single precision (about 7 significant digits) and volumes can exceed the INTEGER range.
+PRICE_SCHEMA = {
+    "Date": ("datetime64[ns]", "DATE"),
+    "Open": ("float32", "REAL"),
+    "High": ("float32", "REAL"),
+    "Low": ("float32", "REAL"),
+    "Close": ("float32", "REAL"),
+    "Volume": ("int64", "BIGINT"),
+    "Dividends": ("float32", "REAL"),
+    "Stock_Splits": ("float32", "REAL"),
+    "date_modification": ("datetime64[ns]", "TIMESTAMP"),
+}
+
+# PostgreSQL types of the columns missing from the schema, by inferred dtype
+SQL_TYPES = {
+    "int64": "BIGINT",
+    "int32": "INTEGER",
+    "float64": "FLOAT",
+    "float32": "REAL",
+    "bool": "BOOLEAN",
+    "datetime64[ns]": "TIMESTAMP",
+    "object": "TEXT",
+}
+
+
+def read_dtypes() -> Dict[str, str]:
+    """
+    Returns the dtypes to pass to `pd.read_csv` for the non-date columns of the schema.
+
+    Integer columns are parsed as floats, so that a missing value does not fail the whole read;
+    `apply_schema` casts them afterwards.
+    """
+    return {
+        col: "float64" if dtype.startswith("int") else dtype
+        for col, (dtype, _) in PRICE_SCHEMA.items() if not dtype.startswith("datetime64")
+    }
+
+
+def apply_schema(data: pd.DataFrame, parse_dates: bool = True) -> pd.DataFrame:
+    """
+    Casts the columns of a history to the dtypes of the schema; the other columns are left as they are.
+
+    An integer column with missing values keeps its floating-point dtype rather than failing the cast.
+
+    Args:
+        data (pd.DataFrame): The history to cast.
+        parse_dates (bool): If False, the date columns are left as they are.
+
+    Returns:
+        pd.DataFrame: The history with the declared dtypes.
+    """
+    casts = {}
+    for col, (dtype, _) in PRICE_SCHEMA.items():
+        if col not in data.columns or str(data[col].dtype) == dtype:
+            continue
+        if dtype.startswith("datetime64"):
+            if not parse_dates:
+                continue
+            values = pd.to_datetime(data[col])
+            if values.dt.tz is not None:
+                values = values.dt.tz_localize(None)
+            casts[col] = values.astype(dtype)
+        elif dtype.startswith("int") and data[col].isna().any():
+            logging.warning(f"Column {col} has missing values, kept as {data[col].dtype}.")
+        else:
+            casts[col] = data[col].astype(dtype)
+    return data.assign(**casts) if casts else data
+
+
+def sql_type(column: str, dtype) -> str:
+    """
+    Returns the PostgreSQL type of a column: the declared type if the column is in the schema,
+    otherwise a type derived from its dtype.
+    """
+    if column in PRICE_SCHEMA:
+        return PRICE_SCHEMA[column][1]
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return "TIMESTAMP"
+    return SQL_TYPES.get(str(dtype), "TEXT")
@@ -0,0 +1,145 @@
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from financial_package.lake import CSVLake
+
+# Fixed-date closures of Euronext (month, day): New Year's Day, Labour Day, Christmas and Boxing Day
+FIXED_HOLIDAYS = [(1, 1), (5, 1), (12, 25), (12, 26)]
+# Closures relative to Easter Sunday, in days: Good Friday and Easter Monday
+EASTER_HOLIDAYS = [-2, 1]
+
+
+def easter_sundays(years: Iterable[int]) -> np.ndarray:
+    """
+    Returns the Easter Sunday of each year (Gregorian calendar), computed for all the years at once.
+    """
+    y = np.asarray(list(years), dtype=np.int64)
+    a, b, c = y % 19, y // 100, y % 100
+    d, e = b // 4, b % 4
+    g = (8 * b + 13) // 25
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 19 * l) // 433
+    month = (h + l - 7 * m + 90) // 25
+    day = (h + l - 7 * m + 33 * month + 19) % 32
+    return np.array([np.datetime64(f"{year:04d}-{mo:02d}-{da:02d}") for year, mo, da in zip(y, month, day)],
+                    dtype="datetime64[D]")
+
+
+def euronext_holidays(first_year: int, last_year: int, extra_closures: Optional[Iterable] = None) -> np.ndarray:
+    """
+    Returns the weekdays Euronext is closed on between two years, included, sorted.
+
+    Args:
+        first_year (int): The first year.
+        last_year (int): The last year.
+        extra_closures (Iterable, optional): Exceptional closures to add (dates).
+    """
+    years = np.arange(first_year, last_year + 1)
+    fixed = [np.datetime64(f"{year:04d}-{month:02d}-{day:02d}") for year in years for month, day in FIXED_HOLIDAYS]
+    easter = easter_sundays(years)
+    relative = [easter + np.timedelta64(offset, "D") for offset in EASTER_HOLIDAYS]
+    extra = [np.datetime64(pd.Timestamp(day).date(), "D") for day in (extra_closures or [])]
+    holidays = np.unique(np.concatenate([np.array(fixed + extra, dtype="datetime64[D]")] + relative))
+    return holidays[np.is_busday(holidays)]
+
+
+def trading_days(start, end, extra_closures: Optional[Iterable] = None) -> np.ndarray:
+    """
+    Returns the Euronext trading days between two dates, included, as datetime64[D].
+    """
+    start, end = np.datetime64(pd.Timestamp(start).date(), "D"), np.datetime64(pd.Timestamp(end).date(), "D")
+    if end < start:
+        return np.array([], dtype="datetime64[D]")
+    holidays = euronext_holidays(pd.Timestamp(start).year, pd.Timestamp(end).year, extra_closures)
+    days = np.arange(start, end + np.timedelta64(1, "D"), dtype="datetime64[D]")
+    return days[np.is_busday(days, holidays=holidays)]
+
+
+def missing_ranges(stored_dates, calendar: np.ndarray) -> Tuple[np.ndarray, List[Tuple[pd.Timestamp, pd.Timestamp]]]:
+    """
+    Finds the trading days of a calendar missing from the stored dates, grouped in ranges of
+    consecutive trading days.
+
+    Args:
+        stored_dates: The stored dates of a ticker.
+        calendar (np.ndarray): The expected trading days, sorted, as datetime64[D].
+
+    Returns:
+        Tuple[np.ndarray, List[Tuple[pd.Timestamp, pd.Timestamp]]]: The missing days, and the first
+            and last day of each range of consecutive missing trading days.
+    """
+    stored = np.asarray(pd.to_datetime(pd.Series(stored_dates)).dt.normalize().to_numpy(), dtype="datetime64[D]")
+    missing_positions = np.flatnonzero(~np.isin(calendar, stored))
+    if not len(missing_positions):
+        return calendar[:0], []
+    # A range breaks where the next missing day is not the next trading day
+    breaks = np.flatnonzero(np.diff(missing_positions) != 1)
+    firsts = missing_positions[np.concatenate([[0], breaks + 1])]
+    lasts = missing_positions[np.concatenate([breaks, [len(missing_positions) - 1]])]
+    ranges = [(pd.Timestamp(calendar[first]), pd.Timestamp(calendar[last])) for first, last in zip(firsts, lasts)]
+    return calendar[missing_positions], ranges
+
+
+def scan_gaps(lake: CSVLake, tickers_list: List[str], start=None, end=None,
+              extra_closures: Optional[Iterable] = None) -> Dict[str, dict]:
+    """
+    Compares the stored dates of each ticker with the Euronext trading calendar.
+
+    Only the `Date` column of each history is read. A ticker is checked from its first stored day
+    (or `start` if later) to `end`, so that the days before its listing are not reported.
+
+    Args:
+        lake (CSVLake): The lake holding the histories.
+        tickers_list (List[str]): The tickers to scan.
+        start (optional): The first day to check. Defaults to the first stored day of each ticker.
+        end (optional): The last day to check. Defaults to the last stored day of each ticker.
+        extra_closures (Iterable, optional): Exceptional closures of the market.
+
+    Returns:
+        Dict[str, dict]: For each stored ticker, the expected and stored trading days, the missing
+            days and their ranges.
+    """
+    scan = {}
+    for ticker_symbol in tickers_list:
+        history = lake.read(ticker_symbol, ["Date"])
+        if history is None or history.empty:
+            logging.warning(f"No history stored for {ticker_symbol}, gap scan skipped.")
+            continue
+        first = max(history["Date"].min(), pd.Timestamp(start)) if start is not None else history["Date"].min()
+        last = pd.Timestamp(end) if end is not None else history["Date"].max()
+        calendar = trading_days(first, last, extra_closures)
+        missing, ranges = missing_ranges(history["Date"], calendar)
+        scan[ticker_symbol] = {"expected": len(calendar), "stored": len(calendar) - len(missing),
+                               "missing": missing, "ranges": ranges}
+        if ranges:
+            logging.info(f"{len(missing)} missing trading day(s) for {ticker_symbol} in {len(ranges)} range(s).")
+    return scan
+
+
+def completeness_report(scan: Dict[str, dict], repaired: Optional[Dict[str, int]] = None) -> pd.DataFrame:
+    """
+    Summarizes a gap scan per ticker, with the days repaired by the backfill if any.
+
+    Returns:
+        pd.DataFrame: Indexed by ticker: expected, stored, missing, gaps, repaired, still_missing
+            and completeness (share of the expected trading days stored after the repair).
+    """
+    repaired = repaired or {}
+    rows = {
+        ticker_symbol: {
+            "expected": result["expected"],
+            "stored": result["stored"],
+            "missing": len(result["missing"]),
+            "gaps": len(result["ranges"]),
+            "repaired": repaired.get(ticker_symbol, 0),
+        }
+        for ticker_symbol, result in scan.items()
+    }
+    report = pd.DataFrame.from_dict(rows, orient="index",
+                                    columns=["expected", "stored", "missing", "gaps", "repaired"])
+    report["still_missing"] = report["missing"] - report["repaired"]
+    report["completeness"] = ((report["stored"] + report["repaired"]) / report["expected"].where(report["expected"] > 0)).fillna(1.0)
+    return report.rename_axis("ticker")
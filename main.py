@@ -1,7 +1,20 @@
 from financial_package.get_historical_data import CAC40HistoricalData
+from financial_package.rate_limit import AdaptiveRateLimiter, RetryPolicy
 from financial_package.postgres_utils import PostgresInserter
-from config import DB_CONFIG, TICKERS, SAVE_DIRECTORY
+from financial_package.db_pool import ConnectionPool
+from financial_package.cache import FetchCache
+from financial_package.lake import get_lake
+from financial_package.etl import QuarantineStore
+from financial_package.anomalies import AnomalyDetector
+from financial_package.features import FeatureStore
+from financial_package.datasets import WindowDatasetBuilder
+from config import (DB_CONFIG, TICKERS, SAVE_DIRECTORY, FETCH_WORKERS, CACHE_DIRECTORY, CACHE_MAX_SIZE_MB,
+                    FETCH_RATE_LIMIT, FETCH_MAX_ATTEMPTS, FETCH_RETRY_BASE_DELAY, LAKE_FORMAT, LAKE_OPTIONS,
+                    LOAD_BATCH_SIZE, COPY_MIN_ROWS, LOAD_CHUNK_ROWS, DB_POOL_SIZE, DB_WORKERS, DB_LAYOUT,
+                    QUARANTINE_PATH, ANOMALY_THRESHOLDS, FEATURE_DIRECTORY, FEATURE_WINDOWS,
+                    DATASET_DIRECTORY, DATASET_WINDOW, DATASET_COLUMNS)
 import os
+import logging
 
 def setup_directory(path: str):
     """Crée un répertoire s'il n'existe pas déjà."""
@@ -11,22 +24,53 @@ def setup_directory(path: str):
 def main():
     # Définir les répertoires de sauvegarde
     setup_directory(SAVE_DIRECTORY)
+    lake = get_lake(LAKE_FORMAT, SAVE_DIRECTORY, **LAKE_OPTIONS)
 
     # Création d'une instance de CAC40HistoricalData
-    cac40_data = CAC40HistoricalData(tickers_list=TICKERS, save_path=SAVE_DIRECTORY)
+    # Le cache évite de tout re-télécharger lors d'une relance après un échec partiel
+    cache = FetchCache(CACHE_DIRECTORY, max_size_bytes=CACHE_MAX_SIZE_MB * 1024 * 1024)
+    cac40_data = CAC40HistoricalData(
+        tickers_list=TICKERS,
+        save_path=SAVE_DIRECTORY,
+        max_workers=FETCH_WORKERS,
+        cache=cache,
+        rate_limiter=AdaptiveRateLimiter(rate=FETCH_RATE_LIMIT),
+        retry_policy=RetryPolicy(max_attempts=FETCH_MAX_ATTEMPTS, base_delay=FETCH_RETRY_BASE_DELAY),
+        lake=lake,
+        validate=True,  # Contrôles vectorisés de StockDataETL sur tout l'historique avant l'écriture
+        quarantine=QuarantineStore(QUARANTINE_PATH),
+        # Les historiques complets sont analysés d'un bloc ; l'état glissant est reconstruit
+        # depuis le datalake lors de la mise à jour quotidienne suivante
+        detector=AnomalyDetector(**ANOMALY_THRESHOLDS)
+    )
     cac40_data.process_and_save_all()
+    cache.flush()
+    logging.info(f"Fetch cache statistics: {cache.stats()}")
 
-    # Création d'une instance de PostgresInserter
-    inserter = PostgresInserter(
-        dbname=DB_CONFIG["dbname"],
-        user=DB_CONFIG["user"],
-        password=DB_CONFIG["password"],
-        host=DB_CONFIG["host"],
-        port=DB_CONFIG["port"],
-        save_path=SAVE_DIRECTORY
-    )
-    # inserter.delete_data(), pour relancer le traitement, vider les tables avant.
-    inserter.process_and_insert_all()
+    # Features techniques recalculées sur les historiques complets, lues ensuite par l'entraînement
+    feature_store = FeatureStore(get_lake(LAKE_FORMAT, FEATURE_DIRECTORY, **LAKE_OPTIONS), FEATURE_WINDOWS)
+    feature_store.update_all(TICKERS, lake, rebuild=True)
+    WindowDatasetBuilder(DATASET_DIRECTORY, DATASET_COLUMNS, DATASET_WINDOW).build(TICKERS, feature_store.lake)
+
+    # Création d'une instance de PostgresInserter, les tickers sont chargés en parallèle sur le pool
+    with ConnectionPool(**DB_CONFIG, size=DB_POOL_SIZE) as pool:
+        inserter = PostgresInserter(
+            dbname=DB_CONFIG["dbname"],
+            user=DB_CONFIG["user"],
+            password=DB_CONFIG["password"],
+            host=DB_CONFIG["host"],
+            port=DB_CONFIG["port"],
+            save_path=SAVE_DIRECTORY,
+            lake=lake,
+            batch_size=LOAD_BATCH_SIZE,
+            copy_threshold=COPY_MIN_ROWS,
+            chunk_size=LOAD_CHUNK_ROWS,
+            pool=pool,
+            max_workers=DB_WORKERS,
+            layout=DB_LAYOUT
+        )
+        # Les lignes sont fusionnées sur la clé "Date" : une relance ne crée pas de doublons
+        inserter.process_and_insert_all()
 
 if __name__ == "__main__":
     try : 
@@ -0,0 +1,64 @@
+import logging
+import os
+from financial_package.postgres_utils import PostgresInserter
+from financial_package.db_pool import ConnectionPool
+from financial_package.etl import QuarantineStore
+from financial_package.price_store import invalidate_price_stores
+from financial_package.lake import get_lake
+from config import (DB_CONFIG, TICKERS, SAVE_DIRECTORY, LAKE_FORMAT, LAKE_OPTIONS, LOAD_BATCH_SIZE, COPY_MIN_ROWS,
+                    DB_POOL_SIZE, DB_LAYOUT, QUARANTINE_PATH, RECONCILE_RESYNC,
+                    RECONCILE_REPORT_PATH)
+
+# Setup logging
+log_directory = os.path.abspath("logs")
+if not os.path.exists(log_directory):
+    os.makedirs(log_directory)
+
+log_file_path = os.path.join(log_directory, "reconcile_warehouse.log")
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    filename=log_file_path,
+    filemode='w'  # Overwrite the log file every time the script runs
+)
+
+def main():
+    logging.info("Starting the lake / warehouse reconciliation.")
+
+    with ConnectionPool(**DB_CONFIG, size=DB_POOL_SIZE) as pool:
+        inserter = PostgresInserter(
+            dbname=DB_CONFIG["dbname"],
+            user=DB_CONFIG["user"],
+            password=DB_CONFIG["password"],
+            host=DB_CONFIG["host"],
+            port=DB_CONFIG["port"],
+            save_path=SAVE_DIRECTORY,
+            lake=get_lake(LAKE_FORMAT, SAVE_DIRECTORY, **LAKE_OPTIONS),
+            batch_size=LOAD_BATCH_SIZE,
+            copy_threshold=COPY_MIN_ROWS,
+            pool=pool,
+            layout=DB_LAYOUT
+        )
+        # Sommes de contrôle mensuelles calculées par PostgreSQL et par NumPy : seuls les mois divergents sont rechargés,
+        # sans les lignes rejetées par la validation encore présentes dans le datalake
+        try:
+            divergent = inserter.reconcile(TICKERS, resync=RECONCILE_RESYNC, quarantine=QuarantineStore(QUARANTINE_PATH))
+        finally:
+            inserter.close()
+
+    invalidate_price_stores(divergent.loc[divergent["resynced"], "ticker"].unique())
+    os.makedirs(os.path.dirname(os.path.abspath(RECONCILE_REPORT_PATH)), exist_ok=True)
+    divergent.to_csv(RECONCILE_REPORT_PATH, index=False)
+    not_resynced = divergent[~divergent["resynced"]]
+    logging.info(f"Reconciliation completed: {len(divergent)} divergent month(s), "
+                 f"{len(divergent) - len(not_resynced)} reloaded, report saved in {RECONCILE_REPORT_PATH}.")
+    if not not_resynced.empty:
+        logging.warning(f"Months still divergent:\n{not_resynced.to_string(index=False)}")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        logging.error(f"Error in reconciliation: {e}", exc_info=True)
@@ -0,0 +1,95 @@
+import logging
+import os
+from financial_package.get_historical_data import CAC40HistoricalData
+from financial_package.rate_limit import AdaptiveRateLimiter, RetryPolicy
+from financial_package.postgres_utils import PostgresInserter
+from financial_package.db_pool import ConnectionPool
+from financial_package.etl import QuarantineStore
+from financial_package.features import FeatureStore
+from financial_package.datasets import WindowDatasetBuilder
+from financial_package.price_store import invalidate_price_stores
+from financial_package.trading_calendar import scan_gaps, completeness_report
+from financial_package.lake import get_lake
+from config import (DB_CONFIG, TICKERS, SAVE_DIRECTORY, FETCH_WORKERS, FETCH_RATE_LIMIT, FETCH_MAX_ATTEMPTS,
+                    FETCH_RETRY_BASE_DELAY, LAKE_FORMAT, LAKE_OPTIONS, LOAD_BATCH_SIZE, COPY_MIN_ROWS,
+                    DB_POOL_SIZE, DB_WORKERS, DB_LAYOUT, QUARANTINE_PATH, FEATURE_DIRECTORY, FEATURE_WINDOWS,
+                    DATASET_DIRECTORY, DATASET_WINDOW, DATASET_COLUMNS, GAP_SCAN_SINCE, GAP_EXTRA_CLOSURES,
+                    GAP_MAX_SPAN_DAYS, GAP_REPORT_PATH)
+
+# Setup logging
+log_directory = os.path.abspath("logs")
+if not os.path.exists(log_directory):
+    os.makedirs(log_directory)
+
+log_file_path = os.path.join(log_directory, "repair_gaps.log")
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    filename=log_file_path,
+    filemode='w'  # Overwrite the log file every time the script runs
+)
+
+def main():
+    logging.info("Starting the trading-day gap repair.")
+    lake = get_lake(LAKE_FORMAT, SAVE_DIRECTORY, **LAKE_OPTIONS)
+
+    # Jours de cotation Euronext absents du datalake, ticker par ticker
+    scan = scan_gaps(lake, TICKERS, start=GAP_SCAN_SINCE, extra_closures=GAP_EXTRA_CLOSURES)
+
+    # Seules les plages manquantes sont re-téléchargées, validées et ajoutées au datalake
+    cac40_data = CAC40HistoricalData(
+        tickers_list=TICKERS,
+        save_path=SAVE_DIRECTORY,
+        max_workers=FETCH_WORKERS,
+        rate_limiter=AdaptiveRateLimiter(rate=FETCH_RATE_LIMIT),
+        retry_policy=RetryPolicy(max_attempts=FETCH_MAX_ATTEMPTS, base_delay=FETCH_RETRY_BASE_DELAY),
+        lake=lake,
+        validate=True,
+        quarantine=QuarantineStore(QUARANTINE_PATH)
+    )
+    repaired = cac40_data.backfill_gaps(scan, max_span_days=GAP_MAX_SPAN_DAYS)
+
+    if repaired:
+        # Les lignes retrouvées sont fusionnées sur la clé "Date", sans recharger les historiques
+        with ConnectionPool(**DB_CONFIG, size=DB_POOL_SIZE) as pool:
+            inserter = PostgresInserter(
+                dbname=DB_CONFIG["dbname"],
+                user=DB_CONFIG["user"],
+                password=DB_CONFIG["password"],
+                host=DB_CONFIG["host"],
+                port=DB_CONFIG["port"],
+                save_path=SAVE_DIRECTORY,
+                batch_size=LOAD_BATCH_SIZE,
+                copy_threshold=COPY_MIN_ROWS,
+                pool=pool,
+                max_workers=DB_WORKERS,
+                layout=DB_LAYOUT
+            )
+            loaded = inserter.call_on_pool(lambda worker, tables: worker.merge_tables(tables), repaired)
+        for ticker in set(repaired) - set(loaded):
+            logging.error(f"Backfilled days of {ticker} not loaded in the database, rerun the repair.")
+        invalidate_price_stores(loaded)
+
+        # Les jours retrouvés sont au milieu de l'historique : features et fenêtres de ces tickers recalculées
+        feature_store = FeatureStore(get_lake(LAKE_FORMAT, FEATURE_DIRECTORY, **LAKE_OPTIONS), FEATURE_WINDOWS)
+        dataset = WindowDatasetBuilder(DATASET_DIRECTORY, DATASET_COLUMNS, DATASET_WINDOW)
+        for ticker in repaired:
+            feature_store.update(ticker, lake, rebuild=True)
+        dataset.extend(list(repaired), feature_store.lake, rewrite=True)
+
+    report = completeness_report(scan, {ticker: len(rows) for ticker, rows in repaired.items()})
+    os.makedirs(os.path.dirname(os.path.abspath(GAP_REPORT_PATH)), exist_ok=True)
+    report.to_csv(GAP_REPORT_PATH)
+    incomplete = report[report["still_missing"] > 0]
+    logging.info(f"Gap repair completed: {sum(len(rows) for rows in repaired.values())} day(s) backfilled "
+                 f"for {len(repaired)} ticker(s), report saved in {GAP_REPORT_PATH}.")
+    if not incomplete.empty:
+        logging.warning(f"Tickers still incomplete:\n{incomplete.to_string()}")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        logging.error(f"Error in gap repair: {e}", exc_info=True)
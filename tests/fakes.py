@@ -0,0 +1,116 @@
+import threading
+import time
+import pandas as pd
+
+
+def make_history(periods: int = 5, start: str = '1/1/2020') -> pd.DataFrame:
+    """
+    Builds a raw history shaped like the frames returned by yfinance.
+    """
+    return pd.DataFrame({
+        'Date': pd.date_range(start=start, periods=periods),
+        'Open': [float(i + 1) for i in range(periods)],
+        'High': [float(i + 2) for i in range(periods)],
+        'Low': [i + 0.5 for i in range(periods)],
+        'Close': [i + 1.5 for i in range(periods)],
+        'Volume': [100 * (i + 1) for i in range(periods)],
+        'Dividends': [0.0] * periods,
+        'Stock Splits': [0.0] * periods
+    }).set_index('Date')
+
+
+class FakeYahooSource:
+    """
+    Local fake of the Yahoo endpoint, with a configurable latency per request.
+
+    Attributes:
+        calls (list): The (ticker, kwargs) of every `history` request received.
+        max_in_flight (int): The highest number of requests served at the same time.
+    """
+
+    def __init__(self, latency: float = 0.0, failing_tickers=None, periods: int = 5):
+        self.latency = latency
+        self.failing_tickers = set(failing_tickers or [])
+        self.periods = periods
+        self.calls = []
+        self.download_calls = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def _serve(self, ticker_symbol: str) -> pd.DataFrame:
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.latency)
+            if ticker_symbol in self.failing_tickers:
+                raise ValueError(f"No data found for {ticker_symbol}")
+            return make_history(self.periods)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def history(self, ticker_symbol: str, **kwargs) -> pd.DataFrame:
+        with self._lock:
+            self.calls.append((ticker_symbol, kwargs))
+        return self._serve(ticker_symbol)
+
+    def download(self, tickers_list, **kwargs) -> dict:
+        with self._lock:
+            self.download_calls.append((list(tickers_list), kwargs))
+        time.sleep(self.latency)
+        return {
+            ticker_symbol: make_history(self.periods)
+            for ticker_symbol in tickers_list if ticker_symbol not in self.failing_tickers
+        }
+
+
+class FakeHTTPError(Exception):
+    """
+    Error shaped like the HTTP errors raised by requests, carrying the response status code.
+    """
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.response = type("Response", (), {"status_code": status_code})()
+
+
+class FlakyYahooSource(FakeYahooSource):
+    """
+    Local stub of the Yahoo endpoint injecting throttling responses and timeouts.
+
+    Each ticker listed in `failures` fails with the given errors, in order, before succeeding;
+    the batch downloads fail with the `download_failures` errors the same way.
+    """
+
+    def __init__(self, failures: dict, download_failures=None, **kwargs):
+        super().__init__(**kwargs)
+        self.failures = {ticker: list(errors) for ticker, errors in failures.items()}
+        self.download_failures = list(download_failures or [])
+
+    @staticmethod
+    def _raise(error):
+        if error == 429:
+            raise FakeHTTPError(429, "429 Client Error: Too Many Requests")
+        if error == "timeout":
+            raise TimeoutError("Read timed out")
+        if error is not None:
+            raise ValueError(error)
+
+    def history(self, ticker_symbol: str, **kwargs) -> pd.DataFrame:
+        with self._lock:
+            self.calls.append((ticker_symbol, kwargs))
+            errors = self.failures.get(ticker_symbol)
+            error = errors.pop(0) if errors else None
+        self._raise(error)
+        return self._serve(ticker_symbol)
+
+    def download(self, tickers_list, **kwargs) -> dict:
+        with self._lock:
+            error = self.download_failures.pop(0) if self.download_failures else None
+        if error is not None:
+            with self._lock:
+                self.download_calls.append((list(tickers_list), kwargs))
+            self._raise(error)
+        return super().download(tickers_list, **kwargs)
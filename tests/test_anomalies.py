@@ -0,0 +1,106 @@
+import unittest
+import os
+import shutil
+import time
+import numpy as np
+import pandas as pd
+from financial_package.anomalies import AnomalyDetector, RETURN_ZSCORE, OHLC_INCONSISTENT, ZERO_VOLUME
+from financial_package.etl import PanelETL, QuarantineStore
+
+def make_history(days, seed=0, start='2000-01-03'):
+    """
+    Builds a random walk history of business days with consistent OHLC prices.
+    """
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, days)))
+    return pd.DataFrame({
+        'Date': pd.bdate_range(start, periods=days),
+        'Open': close,
+        'High': close * 1.01,
+        'Low': close * 0.99,
+        'Close': close,
+        'Volume': rng.integers(1000, 5000, days),
+    })
+
+class TestAnomalyDetector(unittest.TestCase):
+    """
+    Test case for the statistical anomaly detection of the ETL.
+    """
+
+    def setUp(self):
+        """
+        Setup a history with a bad tick, an inconsistent row and a run of days without volume.
+        """
+        self.save_path = "./test_anomalies"
+        os.makedirs(self.save_path, exist_ok=True)
+        self.addCleanup(shutil.rmtree, self.save_path, ignore_errors=True)
+        history = make_history(300)
+        for col in ('Open', 'High', 'Low', 'Close'):
+            history.loc[150, col] *= 100
+        history.loc[200, 'High'] = history.loc[200, 'Low'] * 0.5
+        history.loc[250:256, 'Volume'] = 0
+        self.history = history
+
+    def test_detect_flags_the_bad_tick_only(self):
+        """
+        Test that the spike is flagged but not the day after, whose price is back in line, and that
+        the OHLC and zero volume checks flag their rows.
+        """
+        detector = AnomalyDetector(max_zero_volume_days=5)
+        reasons = detector.detect(self.history.sample(frac=1, random_state=0)).sort_index()
+        flagged = reasons[reasons != '']
+        self.assertEqual(flagged[150], RETURN_ZSCORE)
+        self.assertNotIn(151, flagged.index)
+        self.assertEqual(flagged[200], OHLC_INCONSISTENT)
+        # The run becomes anomalous from its fifth day
+        self.assertEqual(flagged[flagged == ZERO_VOLUME].index.tolist(), [254, 255, 256])
+        self.assertEqual(len(flagged), 5)
+
+    def test_incremental_check_and_saved_state(self):
+        """
+        Test that the new rows are checked against the saved rolling state, that a rerun on the
+        same rows does not flag them again, and that a bad tick is left out of the state.
+        """
+        state_path = os.path.join(self.save_path, 'state.json')
+        history = make_history(300)
+        detector = AnomalyDetector(state_path=state_path)
+        self.assertTrue((detector.screen('AI.PA', history.iloc[:-3]) == '').all())
+        detector.save_state()
+
+        detector = AnomalyDetector(state_path=state_path)
+        self.assertTrue(detector.has_state('AI.PA'))
+        new_rows = history.iloc[-5:].copy()
+        for col in ('Open', 'High', 'Low', 'Close'):
+            new_rows.loc[new_rows.index[-2], col] *= 50
+        reasons = detector.check('AI.PA', new_rows)
+        self.assertEqual(reasons.tolist(), ['', '', '', RETURN_ZSCORE, ''])
+        self.assertEqual(detector.check('AI.PA', new_rows).tolist(), [''] * 5)
+
+    def test_panel_quarantines_the_anomalies(self):
+        """
+        Test that PanelETL quarantines the anomalous rows with their reasons and counts them in its summary.
+        """
+        quarantine = QuarantineStore(os.path.join(self.save_path, 'invalid_rows.csv'))
+        frames = {'AI.PA': self.history, 'BNP.PA': make_history(300, seed=1)}
+        panel = PanelETL.from_frames(frames, quarantine=quarantine, detector=AnomalyDetector())
+        validated = panel.process()
+        self.assertEqual(len(validated['AI.PA']), 295)
+        self.assertEqual(len(validated['BNP.PA']), 300)
+        self.assertEqual(panel.summary.loc['AI.PA', 'invalid'], 5)
+        quarantined = quarantine.read()
+        self.assertEqual(len(quarantined), 5)
+        self.assertTrue(quarantined['type_error'].str.startswith('Anomaly: ').all())
+
+    def test_detection_throughput(self):
+        """
+        Test that the full histories of 40 tickers are screened in a few seconds.
+        """
+        detector = AnomalyDetector()
+        histories = [make_history(7500, seed=seed, start='1990-01-01') for seed in range(40)]
+        start = time.perf_counter()
+        for ticker, history in enumerate(histories):
+            detector.screen(str(ticker), history)
+        self.assertLess(time.perf_counter() - start, 5.0)
+
+if __name__ == "__main__":
+    unittest.main()
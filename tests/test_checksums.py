@@ -0,0 +1,93 @@
+import hashlib
+import unittest
+import numpy as np
+import pandas as pd
+from financial_package.checksums import CHECKSUM_COLUMNS, MISSING_VALUE, HASH_DIGITS, checksum_sql, month_checksums, combine_checksums, compare_checksums
+from financial_package.schema import apply_schema
+
+def make_rows(days, seed=0):
+    """
+    Builds a typed history of business days with random prices.
+    """
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, days)))
+    return apply_schema(pd.DataFrame({
+        'Date': pd.bdate_range('2020-01-01', periods=days),
+        'Open': close,
+        'High': close * 1.01,
+        'Low': close * 0.99,
+        'Close': close,
+        'Volume': rng.integers(1000, 10 ** 9, days),
+        'Dividends': 0.0,
+        'Stock_Splits': 0.0,
+    }))
+
+class TestChecksums(unittest.TestCase):
+    """
+    Test case for the monthly checksums of the lake and the warehouse.
+    """
+
+    def test_month_checksums_match_the_row_definition(self):
+        """
+        Test that the vectorized checksums equal the definition applied row by row, whatever the
+        order of the rows, and that the SQL aggregate follows the same definition.
+        """
+        rows = make_rows(70)
+        rows.loc[3, 'Close'] = np.nan
+        sums = month_checksums(rows.sample(frac=1, random_state=0))
+
+        expected = {}
+        for _, row in rows.iterrows():
+            month = row['Date'].to_period('M').start_time
+            values = [row['Date'].strftime('%Y-%m-%d')] + [
+                str(MISSING_VALUE if pd.isna(row[col]) else round(float(row[col]) * scale))
+                for col, scale in CHECKSUM_COLUMNS.items()]
+            row_hash = int(hashlib.md5('|'.join(values).encode()).hexdigest()[:HASH_DIGITS], 16)
+            count, checksum = expected.get(month, (0, 0))
+            expected[month] = (count + 1, checksum + row_hash)
+        self.assertEqual(list(sums['month']), sorted(expected))
+        self.assertEqual(list(zip(sums['rows'], sums['checksum'])), [expected[month] for month in sorted(expected)])
+
+        sql = checksum_sql()
+        self.assertTrue(sql.startswith("sum(('x' || left(md5(concat_ws('|', to_char(\"Date\", 'YYYY-MM-DD'), "
+                                       "coalesce(round(\"Open\"::double precision * 10000)::bigint, -1), "))
+        self.assertTrue(sql.endswith(f"{HASH_DIGITS}))::bit({4 * HASH_DIGITS})::bigint)::bigint"))
+
+        # Computed chunk by chunk, a month split across two chunks gets the same checksum
+        chunks = [month_checksums(rows.iloc[i:i + 13]) for i in range(0, len(rows), 13)]
+        pd.testing.assert_frame_equal(combine_checksums(chunks), sums)
+
+    def test_changes_are_detected(self):
+        """
+        Test that a changed value, values swapped between two days, a missing row, an extra month or
+        edits offsetting each other make their partition diverge, and only it.
+        """
+        rows = make_rows(70)
+        lake_sums = month_checksums(rows)
+        warehouse = rows.copy()
+        warehouse.loc[5, 'Close'] += 0.01
+        warehouse.loc[[30, 31], 'Volume'] = warehouse.loc[[31, 30], 'Volume'].to_numpy()
+        warehouse = warehouse.drop(index=60)
+        extra = warehouse.iloc[:1].assign(Date=pd.Timestamp('2019-12-31'))
+        warehouse_sums = month_checksums(pd.concat([extra, warehouse])).assign(ticker='AI.PA')
+
+        divergent = compare_checksums({'AI.PA': lake_sums, 'BNP.PA': lake_sums}, warehouse_sums)
+        months = [row['Date'].to_period('M').start_time for _, row in rows.iloc[[5, 30, 60]].iterrows()]
+        self.assertEqual(list(divergent.loc[divergent['ticker'] == 'AI.PA', 'month']),
+                         [pd.Timestamp('2019-12-01')] + months)
+        self.assertEqual(divergent.loc[divergent['ticker'] == 'AI.PA', 'lake_rows'].iloc[0], 0)
+        self.assertEqual(divergent.loc[divergent['ticker'] == 'BNP.PA', 'warehouse_rows'].sum(), 0)
+        self.assertEqual(len(divergent[divergent['ticker'] == 'BNP.PA']), len(lake_sums))
+        self.assertTrue(compare_checksums({'AI.PA': lake_sums}, lake_sums.assign(ticker='AI.PA')).empty)
+
+        # Edits offsetting each other within a row, or across two days of a column, are detected too
+        for edits in ({66: {'Open': 0.0007, 'Close': -0.0002}}, {66: {'Volume': 3}, 67: {'Volume': -2}}):
+            edited = rows.copy()
+            for index, changes in edits.items():
+                for col, change in changes.items():
+                    edited.loc[index, col] += change
+            divergent = compare_checksums({'AI.PA': lake_sums}, month_checksums(edited).assign(ticker='AI.PA'))
+            self.assertEqual(list(divergent['month']), [pd.Timestamp('2020-04-01')])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import unittest
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from unittest.mock import patch, MagicMock
+from financial_package.corporate_actions import new_actions, adjustment_factors, adjust_history
+from financial_package.get_historical_data import CAC40HistoricalData
+from financial_package.postgres_utils import PostgresInserter
+from financial_package.schema import apply_schema
+from tests.fakes import make_history
+
+class TestCorporateActions(unittest.TestCase):
+    """
+    Test case for the re-adjustment of the stored histories after a split or a dividend.
+    """
+
+    def setUp(self):
+        """
+        Setup a stored history of ten days and the rows fetched after a 2:1 split on its last day.
+        """
+        self.save_path = "./test_corporate_actions"
+        os.makedirs(self.save_path, exist_ok=True)
+        self.addCleanup(shutil.rmtree, self.save_path, ignore_errors=True)
+        stored = make_history(10).reset_index().rename(columns={'Stock Splits': 'Stock_Splits'})
+        self.stored = apply_schema(stored.assign(date_modification=pd.Timestamp('2024-01-01')))
+        # Fetched with an overlap of two days: the data source already halved the prices before the split
+        incoming = make_history(12).reset_index().rename(columns={'Stock Splits': 'Stock_Splits'}).iloc[8:]
+        incoming.loc[10, 'Stock_Splits'] = 2.0
+        incoming.loc[[8, 9], ['Open', 'High', 'Low', 'Close']] /= 2
+        self.incoming = apply_schema(incoming.reset_index(drop=True))
+
+    def test_factors_and_vectorized_adjustment(self):
+        """
+        Test that only the actions missing from the stored rows are new, and that the rows before
+        each action take the factors of all the actions after them.
+        """
+        self.assertEqual(new_actions(self.incoming, self.stored)['Date'].tolist(), [pd.Timestamp('2020-01-11')])
+        self.assertTrue(new_actions(self.incoming, self.incoming).empty)
+
+        actions = pd.DataFrame({'Date': pd.to_datetime(['2020-01-04', '2020-01-08']),
+                                'Dividends': [0.5, 0.0], 'Stock_Splits': [0.0, 2.0]})
+        factors = adjustment_factors(actions, self.stored)
+        # Close of 2020-01-03 is 3.5
+        np.testing.assert_allclose(factors['price_factor'], [1 - 0.5 / 3.5, 0.5])
+        np.testing.assert_allclose(factors['volume_factor'], [1.0, 2.0])
+
+        adjusted = adjust_history(self.stored, factors)
+        np.testing.assert_allclose(adjusted['Close'][:3], self.stored['Close'][:3] * (1 - 0.5 / 3.5) * 0.5, rtol=1e-6)
+        np.testing.assert_allclose(adjusted['Close'][3:7], self.stored['Close'][3:7] * 0.5, rtol=1e-6)
+        np.testing.assert_allclose(adjusted['Close'][7:], self.stored['Close'][7:])
+        self.assertEqual(adjusted['Volume'].tolist()[:7], [v * 2 for v in self.stored['Volume'][:7]])
+        self.assertEqual(adjusted['Close'].dtype, np.float32)
+
+    def test_readjust_history_rewrites_the_ticker_only(self):
+        """
+        Test that a new split rewrites the stored history of its ticker, consistently with the new
+        rows, and leaves the other tickers and the next runs alone.
+        """
+        cac40_data = CAC40HistoricalData(['AI.PA', 'BNP.PA'], self.save_path)
+        cac40_data.save_data(self.stored.copy(), 'AI.PA')
+        cac40_data.save_data(self.stored.copy(), 'BNP.PA')
+        other_file = cac40_data.lake.path('BNP.PA')
+        other_mtime = os.path.getmtime(other_file)
+
+        factors = cac40_data.readjust_history(self.incoming, 'AI.PA')
+        self.assertEqual(factors['volume_factor'].tolist(), [2.0])
+        cac40_data.append_data(self.incoming, 'AI.PA')
+        history = cac40_data.lake.read('AI.PA')
+        np.testing.assert_allclose(history['Close'], np.append(self.stored['Close'] / 2, self.incoming['Close'][2:]), rtol=1e-6)
+        self.assertEqual(os.path.getmtime(other_file), other_mtime)
+        # Once stored, the split is not applied again
+        self.assertIsNone(cac40_data.readjust_history(self.incoming, 'AI.PA'))
+
+    @patch('psycopg2.connect')
+    def test_adjust_rows_in_one_update(self, mock_connect):
+        """
+        Test that the stored rows are adjusted with a single UPDATE, one range of dates per action,
+        in the transaction of the merge.
+        """
+        inserter = PostgresInserter('test_db', 'test_user', 'test_password', 'localhost', '5432', save_path=self.save_path)
+        inserter.connect()
+        factors = pd.DataFrame({'Date': pd.to_datetime(['2020-01-04', '2020-01-08']),
+                                'price_factor': [0.9, 0.5], 'volume_factor': [1.0, 2.0]})
+        with patch.object(PostgresInserter, 'upsert_rows') as upsert_rows:
+            inserter.insert_tables({'AI.PA': self.incoming}, upsert=True, adjustments={'AI.PA': factors})
+        upsert_rows.assert_called_once()
+        updates = [call for call in inserter.cursor.execute.call_args_list if call.args[0].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        query, params = updates[0].args
+        self.assertIn('FROM (VALUES', query)
+        self.assertEqual(params[:4], [None, pd.Timestamp('2020-01-04').date(), 0.45, 2.0])
+        self.assertEqual(params[4:], [pd.Timestamp('2020-01-04').date(), pd.Timestamp('2020-01-08').date(), 0.5, 2.0])
+        inserter.conn.commit.assert_called_once()
+
+if __name__ == "__main__":
+    unittest.main()
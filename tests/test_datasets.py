@@ -0,0 +1,97 @@
+import unittest
+import os
+import json
+import shutil
+import numpy as np
+import pandas as pd
+from financial_package.datasets import WindowDataset, WindowDatasetBuilder
+from financial_package.lake import get_lake
+from financial_package.schema import apply_schema
+
+def make_rows(days, seed=0):
+    """
+    Builds a history of two feature columns, the first rows missing as after a warm-up.
+    """
+    rng = np.random.default_rng(seed)
+    rows = pd.DataFrame({
+        'Date': pd.bdate_range('2020-01-01', periods=days),
+        'a': rng.normal(size=days),
+        'b': np.arange(days, dtype='float64'),
+    })
+    rows.loc[:4, 'a'] = np.nan
+    return apply_schema(rows)
+
+class TestWindowDataset(unittest.TestCase):
+    """
+    Test case for the windowed training dataset.
+    """
+
+    def setUp(self):
+        """
+        Setup a lake with the rows of two tickers.
+        """
+        self.save_path = "./test_datasets"
+        self.addCleanup(shutil.rmtree, self.save_path, ignore_errors=True)
+        self.lake = get_lake('csv', os.path.join(self.save_path, 'features'))
+        self.rows = {'AI.PA': make_rows(40), 'BNP.PA': make_rows(30, seed=1)}
+        for ticker, rows in self.rows.items():
+            self.lake.write(ticker, rows.iloc[:-2])
+        self.dataset_path = os.path.join(self.save_path, 'windows')
+        self.builder = WindowDatasetBuilder(self.dataset_path, ['a', 'b'], window=10)
+
+    def test_build_and_windows(self):
+        """
+        Test that each window is a view of consecutive complete rows of one ticker, and that the
+        manifest describes the dataset.
+        """
+        manifest = self.builder.build(['AI.PA', 'BNP.PA', 'CA.PA'], self.lake)
+        self.assertEqual(manifest['tickers']['AI.PA']['rows'], 33)
+        self.assertEqual(manifest['windows'], (33 - 9) + (23 - 9))
+        with open(os.path.join(self.dataset_path, 'manifest.json')) as f:
+            self.assertEqual(json.load(f)['columns'], ['a', 'b'])
+
+        dataset = WindowDataset(self.dataset_path)
+        self.assertEqual(len(dataset), 38)
+        ticker, end_date, window = dataset.window_at(0)
+        self.assertEqual((ticker, window.shape), ('AI.PA', (10, 2)))
+        self.assertEqual(end_date, self.rows['AI.PA']['Date'].iloc[14])
+        np.testing.assert_array_equal(window[:, 1], np.arange(5, 15))
+        self.assertIsInstance(window.base, np.ndarray)
+
+    def test_shuffled_batches_cover_every_window(self):
+        """
+        Test that the shuffled batches visit every window once, in a reproducible order.
+        """
+        self.builder.build(['AI.PA', 'BNP.PA'], self.lake)
+        dataset = WindowDataset(self.dataset_path)
+        batches = list(dataset.batches(8, seed=3))
+        self.assertEqual([len(batch) for batch, _, _ in batches], [8, 8, 8, 8, 6])
+        seen = {(int(code), batch[i, -1, 1]) for batch, codes, _ in batches for i, code in enumerate(codes)}
+        self.assertEqual(len(seen), 38)
+        first, codes, end_dates = batches[0]
+        for window, code, end_date in zip(first, codes, end_dates):
+            rows = self.rows[dataset.tickers[code]]
+            self.assertEqual(rows.loc[rows['b'] == window[-1, 1], 'Date'].iloc[0], end_date)
+        np.testing.assert_array_equal(next(dataset.batches(8, seed=3))[0], first)
+
+    def test_extend_appends_the_new_days(self):
+        """
+        Test that extending the dataset appends the new rows to the files instead of rebuilding them.
+        """
+        self.builder.build(['AI.PA', 'BNP.PA'], self.lake)
+        for ticker, rows in self.rows.items():
+            self.lake.append(ticker, rows.iloc[-2:])
+        appended = WindowDatasetBuilder(self.dataset_path, ['a', 'b'], window=10).extend(['AI.PA', 'BNP.PA'], self.lake)
+        self.assertEqual(appended, {'AI.PA': 2, 'BNP.PA': 2})
+
+        dataset = WindowDataset(self.dataset_path)
+        self.assertEqual(len(dataset), 42)
+        expected = WindowDatasetBuilder(os.path.join(self.save_path, 'rebuilt'), ['a', 'b'], window=10)
+        expected.build(['AI.PA', 'BNP.PA'], self.lake)
+        rebuilt = WindowDataset(expected.path)
+        np.testing.assert_array_equal(next(dataset.batches(64, shuffle=False))[0], next(rebuilt.batches(64, shuffle=False))[0])
+        with self.assertRaises(ValueError):
+            WindowDatasetBuilder(self.dataset_path, ['a'], window=10).extend(['AI.PA'], self.lake)
+
+if __name__ == "__main__":
+    unittest.main()
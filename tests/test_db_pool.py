@@ -0,0 +1,113 @@
+import unittest
+import shutil
+import threading
+import time
+import pandas as pd
+from unittest.mock import patch, MagicMock
+from psycopg2.pool import PoolError
+from financial_package.db_pool import ConnectionPool
+from financial_package.postgres_utils import PostgresInserter, DataExporter
+from financial_package.lake import CSVLake
+
+DB_CONFIG = {
+    "dbname": "test_db",
+    "user": "test_user",
+    "password": "test_password",
+    "host": "localhost",
+    "port": "5432"
+}
+
+class TestConnectionPool(unittest.TestCase):
+    """
+    Test case for the ConnectionPool class and the parallel loader.
+    """
+
+    def setUp(self):
+        """
+        Make every psycopg2.connect call return a distinct connection.
+        """
+        patcher = patch('psycopg2.connect', side_effect=lambda *args, **kwargs: MagicMock(closed=False))
+        self.mock_connect = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_pool_blocks_when_exhausted_and_refuses_after_close(self):
+        """
+        Test that the pool waits for a free connection and refuses to lend connections once closed.
+        """
+        pool = ConnectionPool(**DB_CONFIG, size=2, timeout=0.05)
+        self.assertEqual(self.mock_connect.call_count, 2)
+        first = pool.getconn()
+        second = pool.getconn()
+        self.assertIsNot(first, second)
+        with self.assertRaises(PoolError):
+            pool.getconn()
+        pool.putconn(first)
+        self.assertIs(pool.getconn(), first)
+        pool.close()
+        second.close.assert_called()
+        with self.assertRaises(PoolError):
+            pool.getconn()
+
+    def test_parallel_load_is_bounded_by_the_pool(self):
+        """
+        Test that the tables are loaded on several pooled connections, never more than the pool size.
+        """
+        lake = CSVLake("./test_data_pool")
+        self.addCleanup(shutil.rmtree, "./test_data_pool", ignore_errors=True)
+        df = pd.DataFrame({'Date': pd.date_range(start='1/1/2020', periods=5), 'Close': [1.5] * 5})
+        table_names = ['AAPL', 'MSFT', 'GOOG', 'AMZN', 'META', 'NFLX']
+        for table_name in table_names:
+            lake.write(table_name, df)
+
+        pool = ConnectionPool(**DB_CONFIG, size=3)
+        inserter = PostgresInserter(**DB_CONFIG, lake=lake, batch_size=1, pool=pool, max_workers=6)
+        lock = threading.Lock()
+        state = {'in_flight': 0, 'max_in_flight': 0, 'connections': set()}
+        write_rows = PostgresInserter.write_rows
+
+        def slow_write_rows(worker, table_name, data, target=None):
+            with lock:
+                state['in_flight'] += 1
+                state['max_in_flight'] = max(state['max_in_flight'], state['in_flight'])
+                state['connections'].add(id(worker.conn))
+            time.sleep(0.05)
+            with lock:
+                state['in_flight'] -= 1
+            return write_rows(worker, table_name, data, target)
+
+        with patch.object(PostgresInserter, 'write_rows', slow_write_rows):
+            inserter.connect()
+            loaded = inserter.load_tables(table_names)
+            inserter.close()
+        pool.close()
+
+        self.assertEqual(loaded, table_names)
+        # One connection is held by the inserter itself, the two others are shared by the workers
+        self.assertEqual(state['max_in_flight'], 2)
+        self.assertEqual(len(state['connections']), 2)
+        self.assertTrue(all(lake.manifest.is_loaded(name, inserter.load_target()) for name in table_names))
+
+    def test_pooled_export_keeps_table_order(self):
+        """
+        Test that the exporter reads all the tables on one pooled connection and keeps their order.
+        """
+        pool = ConnectionPool(**DB_CONFIG, size=2)
+        exporter = DataExporter(**DB_CONFIG, save_path="./test_export_pool", pool=pool)
+        self.addCleanup(shutil.rmtree, "./test_export_pool", ignore_errors=True)
+        exporter.connect()
+        cursor = exporter.conn.cursor.return_value
+        cursor.description = [('ticker',), ('Date',), ('Close',)]
+        cursor.fetchmany.side_effect = [[('GOOG', '2020-01-02', 1.0), ('MSFT', '2020-01-02', 2.0)], []]
+        with patch.object(DataExporter, 'existing_tables', return_value=['MSFT', 'GOOG']), \
+                patch.object(DataExporter, 'export_to_excel') as export_to_excel:
+            exporter.export_all_tables(['MSFT', 'AAPL', 'GOOG'])
+        exporter.close()
+        pool.close()
+        table_data = export_to_excel.call_args[0][0]
+        self.assertEqual(list(table_data), ['MSFT', 'AAPL', 'GOOG'])
+        self.assertEqual(table_data['GOOG']['Close'].tolist(), [1.0])
+        self.assertTrue(table_data['AAPL'].empty)
+        self.assertEqual(cursor.execute.call_count, 1)
+
+if __name__ == "__main__":
+    unittest.main()
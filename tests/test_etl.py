@@ -0,0 +1,121 @@
+import unittest
+import os
+import shutil
+import time
+import numpy as np
+import pandas as pd
+from unittest.mock import patch
+from financial_package.etl import StockDataETL, PanelETL, QuarantineStore
+
+class TestStockDataETL(unittest.TestCase):
+    """
+    Test case for the StockDataETL class.
+    """
+
+    def setUp(self):
+        """
+        Setup a cleaned history of several days, as fetched after a few missed runs.
+        """
+        self.data = pd.DataFrame({
+            'Date': pd.date_range(start='1/1/2020', periods=4),
+            'Open': [1.0, 2.0, 3.0, 4.0],
+            'High': [2.0, 3.0, 4.0, 5.0],
+            'Low': [0.5, 1.5, 2.5, 3.5],
+            'Close': [1.5, 2.5, 3.5, 4.5],
+            'Volume': [100, 200, 300, 400],
+            'Dividends': [0.0] * 4,
+            'Stock_Splits': [0.0] * 4,
+            'date_modification': pd.Timestamp('2024-01-01 12:00:00')
+        })
+
+    def test_process_last_row(self):
+        """
+        Test that only the last row is processed by default.
+        """
+        processed = StockDataETL(self.data).process()
+        self.assertEqual(len(processed), 1)
+        self.assertEqual(processed['Date'].iloc[0], pd.Timestamp('2020-01-04'))
+
+    def test_process_all_rows(self):
+        """
+        Test that all the fetched rows are processed and recast when asked, so that no missed day is lost.
+        """
+        processed = StockDataETL(self.data, all_rows=True).process()
+        self.assertEqual(processed['Date'].tolist(), list(pd.date_range(start='1/1/2020', periods=4)))
+        self.assertTrue(pd.api.types.is_numeric_dtype(processed['Close']))
+
+    def test_vectorized_validation_of_a_full_history(self):
+        """
+        Test that the vectorized mode keeps the native dtypes, rejects only the invalid rows and
+        records the rules each of them breaks.
+        """
+        data = self.data.copy()
+        data.loc[1, 'Close'] = -1.0
+        data.loc[2, 'Volume'] = np.nan
+        data.loc[3, 'Date'] = pd.Timestamp('1980-01-01')
+        etl = StockDataETL(data, all_rows=True, vectorized=True)
+        with patch.object(StockDataETL, 'save_invalid_data') as save_invalid_data:
+            processed = etl.process()
+        save_invalid_data.assert_called_once()
+        self.assertEqual(processed['Date'].tolist(), [pd.Timestamp('2020-01-01')])
+        self.assertEqual(processed['Close'].dtype, np.float32)
+        self.assertEqual(etl.df_invalid['type_error'].tolist(), ['Num val', "'Volume' format", 'Date val'])
+
+    def test_vectorized_validation_of_the_last_row(self):
+        """
+        Test that the vectorized mode checks only the last row by default, and rejects text in numeric columns.
+        """
+        data = self.data.astype({'Close': object})
+        data.loc[0, 'Close'] = 'abc'
+        self.assertEqual(len(StockDataETL(data, vectorized=True).process()), 1)
+        data.loc[3, 'Close'] = 'abc'
+        etl = StockDataETL(data, vectorized=True)
+        with patch.object(StockDataETL, 'save_invalid_data'):
+            self.assertTrue(etl.process().empty)
+        self.assertEqual(etl.type_error, ["'Close' format"])
+
+    def test_vectorized_validation_throughput(self):
+        """
+        Test that the vectorized mode validates a million rows in about a second at most.
+        """
+        rows = 1_000_000
+        data = pd.DataFrame({
+            'Date': pd.date_range(start='1/1/1990', periods=rows, freq='min'),
+            'Open': np.ones(rows), 'High': np.ones(rows), 'Low': np.ones(rows), 'Close': np.ones(rows),
+            'Volume': np.arange(rows), 'Dividends': np.zeros(rows), 'Stock_Splits': np.zeros(rows)
+        })
+        start = time.perf_counter()
+        validated = StockDataETL(data, all_rows=True, vectorized=True).validate()
+        self.assertEqual(len(validated), rows)
+        self.assertLess(time.perf_counter() - start, 2.0)
+
+    def test_panel_validation_and_quarantine(self):
+        """
+        Test that the panel of all the tickers is validated in one call, with a per-ticker summary,
+        and that the rejected rows accumulate in the quarantine store across runs.
+        """
+        self.addCleanup(shutil.rmtree, "./test_quarantine", ignore_errors=True)
+        quarantine = QuarantineStore("./test_quarantine/invalid_rows.csv")
+        bad = self.data.copy()
+        bad.loc[2, 'Close'] = -1.0
+        bad.loc[3, 'Volume'] = np.nan
+        frames = {'AI.PA': self.data, 'BNP.PA': bad}
+
+        panel = PanelETL.from_frames(frames, quarantine=quarantine)
+        validated = panel.process()
+        self.assertEqual(list(validated), ['AI.PA', 'BNP.PA'])
+        self.assertEqual(len(validated['AI.PA']), 4)
+        self.assertEqual(validated['BNP.PA']['Date'].tolist(), list(pd.date_range(start='1/1/2020', periods=2)))
+        self.assertNotIn('ticker', validated['BNP.PA'].columns)
+        self.assertEqual(panel.summary.loc['BNP.PA'].tolist(), [4, 2, "'Volume' format, Num val"])
+        self.assertEqual(panel.summary.loc['AI.PA', 'invalid'], 0)
+
+        # A second run appends to the store instead of replacing it
+        PanelETL.from_frames({'BNP.PA': bad}, all_rows=False, quarantine=quarantine).process()
+        stored = quarantine.read()
+        self.assertEqual(stored['ticker'].tolist(), ['BNP.PA'] * 3)
+        self.assertEqual(stored['type_error'].tolist(), ['Num val', "'Volume' format", "'Volume' format"])
+        self.assertEqual(list(stored.columns), QuarantineStore.COLUMNS)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import unittest
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from datetime import date
+from unittest.mock import patch
+from financial_package.exports import write_export, export_format
+from financial_package.postgres_utils import DataExporter
+
+class TestExports(unittest.TestCase):
+    """
+    Test case for the streaming export writers.
+    """
+
+    def setUp(self):
+        """
+        Setup batches of rows as streamed by the exporter, a ticker spanning two batches.
+        """
+        self.save_path = "./test_exports"
+        os.makedirs(self.save_path, exist_ok=True)
+        self.batches = [
+            pd.DataFrame({'ticker': ['AI.PA', 'AI.PA'], 'Date': [date(2020, 1, 2), date(2020, 1, 3)],
+                          'Close': [1.5, None], 'Volume': [100, 200]}),
+            pd.DataFrame({'ticker': ['AI.PA', 'BNP.PA'], 'Date': [date(2020, 1, 6), date(2020, 1, 2)],
+                          'Close': [2.5, 3.5], 'Volume': [300, 400]}),
+        ]
+
+    def tearDown(self):
+        """
+        Clean up the export directory.
+        """
+        shutil.rmtree(self.save_path, ignore_errors=True)
+
+    def test_xlsx_one_sheet_per_ticker(self):
+        """
+        Test that the write-only Excel writer puts each ticker in its own sheet, across batches.
+        """
+        report = write_export(iter(self.batches), os.path.join(self.save_path, 'range.xlsx'))
+        self.assertEqual((report['format'], report['rows']), ('xlsx', 4))
+        self.assertGreater(report['bytes'], 0)
+        sheets = pd.read_excel(report['path'], sheet_name=None)
+        self.assertEqual(list(sheets), ['AI.PA', 'BNP.PA'])
+        self.assertEqual(list(sheets['AI.PA'].columns), ['Date', 'Close', 'Volume'])
+        self.assertEqual(sheets['AI.PA']['Volume'].tolist(), [100, 200, 300])
+        self.assertTrue(np.isnan(sheets['AI.PA']['Close'].iloc[1]))
+
+    def test_empty_xlsx_has_info_sheet(self):
+        """
+        Test that an export without rows still produces a readable workbook.
+        """
+        report = write_export(iter([]), os.path.join(self.save_path, 'empty.xlsx'))
+        self.assertEqual(report['rows'], 0)
+        self.assertEqual(list(pd.read_excel(report['path'], sheet_name=None)), ['Info'])
+
+    def test_csv_gz_and_npz(self):
+        """
+        Test that the compressed CSV and the columnar archive round-trip the rows, with the schema dtypes.
+        """
+        csv_report = write_export(iter(self.batches), os.path.join(self.save_path, 'range.csv.gz'))
+        self.assertEqual(csv_report['format'], 'csv.gz')
+        self.assertEqual(len(pd.read_csv(csv_report['path'])), 4)
+
+        npz_report = write_export(iter(self.batches), os.path.join(self.save_path, 'range.npz'))
+        with np.load(npz_report['path']) as archive:
+            self.assertEqual(archive['ticker'].tolist(), ['AI.PA', 'AI.PA', 'AI.PA', 'BNP.PA'])
+            self.assertEqual(archive['Date'].dtype, np.dtype('datetime64[ns]'))
+            self.assertEqual(archive['Close'].dtype, np.float32)
+            self.assertEqual(archive['Volume'].tolist(), [100, 200, 300, 400])
+
+    def test_export_format(self):
+        """
+        Test that the format is taken from the extension, and that unknown ones are rejected.
+        """
+        self.assertEqual(export_format('Today_Data.csv.gz'), 'csv.gz')
+        self.assertEqual(export_format('Today_Data.csv'), 'csv')
+        with self.assertRaises(ValueError):
+            export_format('Today_Data.parquet')
+
+    @patch('psycopg2.connect')
+    def test_export_for_recipient_falls_back_to_a_smaller_format(self, mock_connect):
+        """
+        Test that the exporter keeps the first format of the recipient that fits, and deletes the others.
+        """
+        exporter = DataExporter('test_db', 'test_user', 'test_password', 'localhost', '5432', save_path=self.save_path)
+        with patch.object(DataExporter, 'stream_range', side_effect=lambda *args: iter(self.batches)):
+            xlsx_bytes = exporter.export_range(['AI.PA', 'BNP.PA'], 'probe.xlsx')['bytes']
+            gz_bytes = exporter.export_range(['AI.PA', 'BNP.PA'], 'probe.csv.gz')['bytes']
+            # Halfway between the two sizes, as the timestamps embedded in an xlsx file vary its size by a few bytes
+            report = exporter.export_for_recipient(['AI.PA', 'BNP.PA'], 'Today_Data', ['xlsx', 'csv.gz'],
+                                                   max_bytes=(xlsx_bytes + gz_bytes) // 2)
+            self.assertEqual(report['format'], 'csv.gz')
+            self.assertFalse(os.path.exists(os.path.join(self.save_path, 'Today_Data.xlsx')))
+
+            report = exporter.export_for_recipient(['AI.PA', 'BNP.PA'], 'Today_Data', ['xlsx', 'csv'], max_bytes=1)
+            self.assertEqual(report['format'], 'csv')
+            self.assertFalse(os.path.exists(os.path.join(self.save_path, 'Today_Data.xlsx')))
+
+if __name__ == "__main__":
+    unittest.main()
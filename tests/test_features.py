@@ -0,0 +1,79 @@
+import unittest
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from financial_package.features import FeatureStore, compute_features, rolling_mean, rolling_std
+from financial_package.lake import get_lake
+from financial_package.schema import apply_schema
+
+def make_prices(days, seed=0):
+    """
+    Builds a random walk price history of business days.
+    """
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, days)))
+    return apply_schema(pd.DataFrame({
+        'Date': pd.bdate_range('2000-01-03', periods=days),
+        'Open': close,
+        'High': close * 1.01,
+        'Low': close * 0.99,
+        'Close': close,
+        'Volume': rng.integers(1000, 5000, days),
+        'Dividends': 0.0,
+        'Stock_Splits': 0.0,
+    }))
+
+class TestFeatures(unittest.TestCase):
+    """
+    Test case for the technical features and the feature store.
+    """
+
+    def setUp(self):
+        """
+        Setup a price lake and a feature lake in a test directory.
+        """
+        self.save_path = "./test_features"
+        self.addCleanup(shutil.rmtree, self.save_path, ignore_errors=True)
+        self.prices = make_prices(1000)
+
+    def test_kernels_match_pandas(self):
+        """
+        Test that the vectorized kernels give the values of the pandas rolling and exponential windows.
+        """
+        close = pd.Series(self.prices['Close'].to_numpy(dtype='float64'))
+        np.testing.assert_allclose(rolling_mean(close, 20), close.rolling(20).mean(), rtol=1e-10)
+        np.testing.assert_allclose(rolling_std(close, 20), close.rolling(20).std(), rtol=1e-8)
+
+        features = compute_features(self.prices)
+        np.testing.assert_allclose(features['ema_12'], close.ewm(span=12, adjust=False).mean(), rtol=1e-10)
+        changes = close.diff()
+        gains = changes.clip(lower=0).fillna(0).ewm(alpha=1 / 14, adjust=False).mean()
+        losses = (-changes).clip(lower=0).fillna(0).ewm(alpha=1 / 14, adjust=False).mean()
+        np.testing.assert_allclose(features['rsi_14'][14:], (100 - 100 / (1 + gains / losses))[14:], rtol=1e-10)
+        self.assertTrue(features['sma_50'][:49].isna().all())
+        self.assertTrue(((features['rsi_14'][14:] >= 0) & (features['rsi_14'][14:] <= 100)).all())
+
+    def test_incremental_update_matches_full_computation(self):
+        """
+        Test that the features of the appended days, computed from a warm-up tail of the prices,
+        match those of a full recomputation, and that an update without new days writes nothing.
+        """
+        for lake_format in ('csv', 'columnar'):
+            price_lake = get_lake(lake_format, os.path.join(self.save_path, lake_format, 'prices'))
+            store = FeatureStore(get_lake(lake_format, os.path.join(self.save_path, lake_format, 'features')))
+            price_lake.write('AI.PA', self.prices.iloc[:-3])
+            self.assertEqual(store.update('AI.PA', price_lake), 997)
+            price_lake.append('AI.PA', self.prices.iloc[-3:])
+            self.assertEqual(store.update('AI.PA', price_lake), 3)
+            self.assertEqual(store.update('AI.PA', price_lake), 0)
+
+            expected = compute_features(self.prices)
+            stored = store.read('AI.PA')
+            self.assertEqual(len(stored), 1000)
+            columns = [col for col in expected.columns if col != 'Date']
+            np.testing.assert_allclose(stored[columns].to_numpy(), expected[columns].to_numpy(), rtol=1e-8, atol=1e-8)
+            self.assertEqual(len(store.read('AI.PA', ['Date', 'rsi_14'], start=self.prices['Date'].iloc[-2])), 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+import os
+import shutil
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from financial_package.cache import FetchCache
+from financial_package.get_historical_data import CAC40HistoricalData
+from tests.fakes import FakeYahooSource, make_history
+
+class TestFetchCache(unittest.TestCase):
+    """
+    Test case for the FetchCache class.
+    """
+
+    def setUp(self):
+        """
+        Setup an empty cache directory for each test.
+        """
+        self.cache_dir = "./test_cache"
+        self.save_path = "./test_cache_lake"
+        self.cache = FetchCache(self.cache_dir)
+
+    def tearDown(self):
+        """
+        Clean up the cache and lake directories.
+        """
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        shutil.rmtree(self.save_path, ignore_errors=True)
+
+    def test_fetch_data_served_from_cache(self):
+        """
+        Test that a repeated fetch is served from the cache without calling the data source.
+        """
+        source = FakeYahooSource()
+        cac40_data = CAC40HistoricalData(['AI.PA'], self.save_path, data_source=source, cache=self.cache)
+        # Force the entry to stay fresh whatever the current time
+        self.cache.expires_at = lambda fetched_at: fetched_at + 3600
+        first = cac40_data.fetch_data('AI.PA')
+        second = cac40_data.fetch_data('AI.PA')
+        self.assertEqual(len(source.calls), 1)
+        self.assertEqual(self.cache.stats()['hits'], 1)
+        self.assertEqual(self.cache.stats()['misses'], 1)
+        self.assertListEqual(list(first.columns), list(second.columns))
+
+    def test_lru_eviction(self):
+        """
+        Test that the least recently used entries are evicted when the size cap is exceeded.
+        """
+        self.cache.expires_at = lambda fetched_at: fetched_at + 3600
+        self.cache.put('a', make_history(50))
+        entry_size = self.cache.total_size()
+        self.cache.max_size_bytes = 2 * entry_size
+        self.cache.put('b', make_history(50))
+        self.cache.get('a')
+        self.cache.put('c', make_history(50))
+        self.assertIsNotNone(self.cache.get('a'))
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 3)  # two entries and the index
+
+    def test_hits_do_not_rewrite_the_index(self):
+        """
+        Test that the access times of the hits are written to the index every `index_flush_hits`
+        hits only, and by `flush`.
+        """
+        self.cache.expires_at = lambda fetched_at: fetched_at + 3600
+        self.cache.index_flush_hits = 3
+        self.cache.put('a', make_history(50))
+        index_path = os.path.join(self.cache_dir, FetchCache.INDEX_FILENAME)
+        saved_at = os.stat(index_path).st_mtime_ns
+        os.utime(index_path, ns=(0, 0))
+        for _ in range(2):
+            self.assertIsNotNone(self.cache.get('a'))
+        self.assertEqual(os.stat(index_path).st_mtime_ns, 0)
+        self.cache.get('a')
+        self.assertGreaterEqual(os.stat(index_path).st_mtime_ns, saved_at)
+
+        os.utime(index_path, ns=(0, 0))
+        self.cache.get('a')
+        self.cache.flush()
+        last_access = self.cache._index['a']['last_access']
+        self.assertEqual(FetchCache(self.cache_dir)._index['a']['last_access'], last_access)
+
+    def test_expiry_tied_to_market_close(self):
+        """
+        Test that entries expire at the close during the session and at the next open otherwise.
+        """
+        paris = ZoneInfo("Europe/Paris")
+        during_session = datetime(2024, 6, 7, 17, 28, tzinfo=paris).timestamp()  # Friday
+        after_close = datetime(2024, 6, 7, 18, 0, tzinfo=paris).timestamp()
+        self.assertEqual(self.cache.expires_at(during_session), datetime(2024, 6, 7, 17, 30, tzinfo=paris).timestamp())
+        self.assertEqual(self.cache.expires_at(after_close), datetime(2024, 6, 10, 9, 0, tzinfo=paris).timestamp())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+import unittest
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from financial_package.get_historical_data import CAC40HistoricalData
+from financial_package.rate_limit import RetryPolicy
+from financial_package.trading_calendar import trading_days, scan_gaps, completeness_report, easter_sundays
+from financial_package.lake import get_lake
+from tests.fakes import FakeYahooSource, make_history
+
+class RangeYahooSource(FakeYahooSource):
+    """
+    Fake of the Yahoo endpoint serving the business days of the requested range only.
+    """
+
+    def _range(self, kwargs):
+        start = pd.Timestamp(kwargs['start'])
+        end = pd.Timestamp(kwargs['end'])
+        days = pd.bdate_range(start, end - pd.Timedelta(days=1))
+        history = make_history(len(days), start=days[0])
+        history.index = days.rename('Date')
+        return history
+
+    def __init__(self, throttled=None):
+        super().__init__()
+        # Number of throttling errors still to answer to each request (ticker, start)
+        self.throttled = dict(throttled or {})
+
+    def history(self, ticker_symbol, **kwargs):
+        with self._lock:
+            self.calls.append((ticker_symbol, kwargs))
+            key = (ticker_symbol, kwargs.get('start'))
+            throttled = self.throttled.get(key, 0) > 0
+            if throttled:
+                self.throttled[key] -= 1
+        if 'start' not in kwargs:
+            raise AssertionError("The whole history was requested.")
+        if throttled:
+            raise RuntimeError("429 Too Many Requests")
+        return self._range(kwargs)
+
+class TestGaps(unittest.TestCase):
+    """
+    Test case for the trading calendar, the gap scan and the targeted backfill.
+    """
+
+    def setUp(self):
+        """
+        Setup a lake with the trading days of 2024 of two tickers, some of them removed.
+        """
+        self.save_path = "./test_gaps"
+        self.addCleanup(shutil.rmtree, self.save_path, ignore_errors=True)
+        self.days = pd.DatetimeIndex(trading_days('2024-01-02', '2024-06-28'))
+        self.source = RangeYahooSource()
+        self.cac40_data = CAC40HistoricalData(['AI.PA', 'BNP.PA'], save_path=self.save_path,
+                                              data_source=self.source, lake=get_lake('csv', self.save_path))
+        self.removed = {
+            'AI.PA': self.days[[10, 11, 12, 50, 51]],
+            'BNP.PA': self.days[:0],
+        }
+        for ticker, removed in self.removed.items():
+            data = self.source._range({'start': self.days[0], 'end': self.days[-1] + pd.Timedelta(days=1)})
+            data = data[data.index.isin(self.days) & ~data.index.isin(removed)]
+            self.cac40_data.save_data(self.cac40_data.prepare_data(data, ticker), ticker)
+        self.source.calls.clear()
+
+    def test_calendar(self):
+        """
+        Test that the calendar leaves out the weekends and the Euronext holidays, Easter included.
+        """
+        np.testing.assert_array_equal(easter_sundays([2019, 2024, 2025]),
+                                      np.array(['2019-04-21', '2024-03-31', '2025-04-20'], dtype='datetime64[D]'))
+        days = pd.DatetimeIndex(trading_days('2024-03-27', '2024-04-03'))
+        self.assertEqual(list(days.strftime('%Y-%m-%d')), ['2024-03-27', '2024-03-28', '2024-04-02', '2024-04-03'])
+        days = pd.DatetimeIndex(trading_days('2024-12-20', '2025-01-03'))
+        for holiday in ['2024-12-25', '2024-12-26', '2025-01-01']:
+            self.assertNotIn(pd.Timestamp(holiday), days)
+        self.assertIn(pd.Timestamp('2024-12-24'), days)
+        self.assertNotIn(pd.Timestamp('2024-05-01'), pd.DatetimeIndex(trading_days('2024-04-29', '2024-05-03', ['2024-05-02'])))
+        self.assertEqual(len(trading_days('2024-05-02', '2024-05-02', ['2024-05-02'])), 0)
+
+    def test_scan_groups_missing_days_in_ranges(self):
+        """
+        Test that the scan finds the missing trading days of each ticker, grouped in ranges.
+        """
+        scan = scan_gaps(self.cac40_data.lake, ['AI.PA', 'BNP.PA', 'CA.PA'])
+        self.assertNotIn('CA.PA', scan)
+        self.assertEqual(scan['AI.PA']['expected'], len(self.days))
+        self.assertEqual(list(pd.DatetimeIndex(scan['AI.PA']['missing'])), list(self.removed['AI.PA']))
+        self.assertEqual(scan['AI.PA']['ranges'], [(self.days[10], self.days[12]), (self.days[50], self.days[51])])
+        self.assertEqual(scan['BNP.PA']['ranges'], [])
+        # Checked from `start` only
+        self.assertEqual(scan_gaps(self.cac40_data.lake, ['AI.PA'], start=self.days[40])['AI.PA']['ranges'],
+                         [(self.days[50], self.days[51])])
+
+    def test_backfill_fetches_only_the_missing_ranges(self):
+        """
+        Test that the backfill requests the missing ranges only, appends the missing days to the
+        lake, and that the report shows the tickers complete.
+        """
+        scan = scan_gaps(self.cac40_data.lake, ['AI.PA', 'BNP.PA'])
+        repaired = self.cac40_data.backfill_gaps(scan, max_span_days=7)
+        self.assertEqual(list(repaired), ['AI.PA'])
+        self.assertEqual(list(repaired['AI.PA']['Date']), list(self.removed['AI.PA']))
+        self.assertEqual([ticker for ticker, _ in self.source.calls], ['AI.PA', 'AI.PA'])
+        self.assertEqual(self.source.calls[0][1], {'start': self.days[10].strftime('%Y-%m-%d'),
+                                                   'end': (self.days[12] + pd.Timedelta(days=1)).strftime('%Y-%m-%d')})
+
+        stored = self.cac40_data.lake.read('AI.PA')
+        self.assertEqual(list(stored['Date']), list(self.days))
+        self.assertTrue(stored['Date'].is_unique)
+        self.assertEqual(scan_gaps(self.cac40_data.lake, ['AI.PA'])['AI.PA']['ranges'], [])
+
+        report = completeness_report(scan, {ticker: len(rows) for ticker, rows in repaired.items()})
+        self.assertEqual(report.loc['AI.PA', 'missing'], 5)
+        self.assertEqual(report.loc['AI.PA', 'gaps'], 2)
+        self.assertEqual(report.loc['AI.PA', 'still_missing'], 0)
+        self.assertEqual(report['completeness'].tolist(), [1.0, 1.0])
+        self.assertAlmostEqual(completeness_report(scan).loc['AI.PA', 'completeness'], 1 - 5 / len(self.days))
+
+        # The ranges closer than `max_span_days` are requested together
+        self.assertEqual(CAC40HistoricalData._request_spans(scan['AI.PA']['ranges'], 90),
+                         [(self.days[10], self.days[51])])
+
+    def test_throttled_span_retried_by_one_mechanism(self):
+        """
+        Test that a throttled span is retried by the requeue only, at most `max_attempts` times in
+        total, without fetching the spans already received again.
+        """
+        scan = scan_gaps(self.cac40_data.lake, ['AI.PA'])
+        first, second = self.days[10].strftime('%Y-%m-%d'), self.days[50].strftime('%Y-%m-%d')
+        self.cac40_data.retry_policy = RetryPolicy(max_attempts=3, base_delay=0.01)
+
+        self.source.throttled = {('AI.PA', second): 1}
+        repaired = self.cac40_data.backfill_gaps(scan, max_span_days=7)
+        self.assertEqual(list(repaired['AI.PA']['Date']), list(self.removed['AI.PA']))
+        self.assertEqual([kwargs['start'] for _, kwargs in self.source.calls], [first, second, second])
+
+        self.source.calls.clear()
+        self.source.throttled = {('AI.PA', second): 10}
+        self.assertEqual(self.cac40_data.backfill_gaps(scan, max_span_days=7), {})
+        self.assertEqual([kwargs['start'] for _, kwargs in self.source.calls], [first] + [second] * 3)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,10 @@
 import unittest
 import os
+import shutil
 import pandas as pd
 from unittest.mock import patch
 from financial_package.get_historical_data import CAC40HistoricalData
+from tests.fakes import FakeYahooSource
 
 class TestCAC40HistoricalData(unittest.TestCase):
     """
@@ -75,5 +77,54 @@ class TestCAC40HistoricalData(unittest.TestCase):
         self.cac40_data.save_to_csv(data, 'AAPL')
         self.assertTrue(os.path.exists(os.path.join(self.save_path, 'AAPL_Historical_Data.csv')))
 
+    def test_fetch_all_concurrent(self):
+        """
+        Test that fetch_all fetches tickers concurrently and isolates per-ticker failures.
+        """
+        source = FakeYahooSource(latency=0.05, failing_tickers=['BAD.PA'])
+        tickers = ['AI.PA', 'AIR.PA', 'BAD.PA', 'BNP.PA']
+        cac40_data = CAC40HistoricalData(tickers, self.save_path, data_source=source, max_workers=4)
+        results = cac40_data.fetch_all()
+        self.assertEqual(list(results.keys()), ['AI.PA', 'AIR.PA', 'BNP.PA'])
+        self.assertGreater(source.max_in_flight, 1)
+        self.assertIn('Stock_Splits', results['AI.PA'].columns)
+
+    def test_process_and_save_all_batched(self):
+        """
+        Test that process_and_save_all downloads tickers in batches and saves each of them.
+        """
+        source = FakeYahooSource()
+        tickers = ['AI.PA', 'AIR.PA', 'BNP.PA']
+        cac40_data = CAC40HistoricalData(tickers, self.save_path, data_source=source)
+        cac40_data.process_and_save_all(batch_size=2)
+        self.assertEqual([call[0] for call in source.download_calls], [['AI.PA', 'AIR.PA'], ['BNP.PA']])
+        for ticker in tickers:
+            self.assertTrue(os.path.exists(os.path.join(self.save_path, f'{ticker}_Historical_Data.csv')))
+
+    def test_incremental_process_ticker(self):
+        """
+        Test that the incremental mode only requests the range after the last stored date
+        and appends the new rows without rewriting the stored history.
+        """
+        save_path = "./test_data_incremental"
+        self.addCleanup(shutil.rmtree, save_path, ignore_errors=True)
+        source = FakeYahooSource(periods=5)
+        cac40_data = CAC40HistoricalData(['INC.PA'], save_path, data_source=source)
+        cac40_data.process_ticker('INC.PA')
+        self.assertEqual(cac40_data.get_last_stored_date('INC.PA'), pd.Timestamp('2020-01-05'))
+        history_file = cac40_data.lake.path('INC.PA')
+        history_mtime = os.path.getmtime(history_file)
+
+        source.periods = 8
+        cac40_data.process_ticker('INC.PA', incremental=True, overlap_days=2)
+        self.assertEqual(source.calls[-1][1]['start'], '2020-01-03')
+        self.assertEqual(os.path.getmtime(history_file), history_mtime)
+        self.assertEqual(len(cac40_data.lake.segment_files('INC.PA')), 1)
+        stored = cac40_data.load_stored_data('INC.PA')
+        self.assertEqual(len(stored), 8)
+        self.assertTrue(stored['Date'].is_unique)
+        self.assertNotIn('index', stored.columns)
+        self.assertEqual(cac40_data.get_last_stored_date('INC.PA'), pd.Timestamp('2020-01-08'))
+
 if __name__ == "__main__":
     unittest.main()
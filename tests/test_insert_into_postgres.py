@@ -1,8 +1,16 @@
 import unittest
 import os
+import shutil
+import tracemalloc
+import numpy as np
 import pandas as pd
+import psycopg2
+from datetime import date, timedelta
 from unittest.mock import patch, MagicMock
-from financial_package.postgres_utils import PostgresInserter
+from financial_package.postgres_utils import PostgresInserter, DataExporter
+from financial_package.lake import CSVLake
+from financial_package.checksums import month_checksums
+from financial_package.etl import QuarantineStore
 
 class TestPostgresInserter(unittest.TestCase):
     """
@@ -96,6 +104,384 @@ class TestPostgresInserter(unittest.TestCase):
         self.inserter.close()
         self.assertTrue(mock_connect.called)
 
+    @patch('psycopg2.connect')
+    def test_get_last_dates(self, mock_connect):
+        """
+        Test that get_last_dates reads the last date of every existing table in a single query.
+        """
+        cursor = mock_connect.return_value.cursor.return_value
+        cursor.fetchall.side_effect = [
+            [('AAPL',), ('MSFT',)],
+            [('AAPL', pd.Timestamp('2020-01-05')), ('MSFT', None)]
+        ]
+        self.inserter.connect()
+        last_dates = self.inserter.get_last_dates(['AAPL', 'MSFT', 'GOOG'])
+        self.inserter.close()
+        self.assertEqual(last_dates, {'AAPL': pd.Timestamp('2020-01-05')})
+        self.assertIn('UNION ALL', cursor.execute.call_args[0][0])
+
+    @patch('psycopg2.connect')
+    def test_process_and_insert_all_skips_unchanged_files(self, mock_connect):
+        """
+        Test that the loader streams each lake file at most once and skips the files loaded already.
+        """
+        lake = CSVLake("./test_data_manifest")
+        self.addCleanup(shutil.rmtree, "./test_data_manifest", ignore_errors=True)
+        df = pd.DataFrame({
+            'Date': pd.date_range(start='1/1/2020', periods=5),
+            'Close': [1.5, 2.5, 3.5, 4.5, 5.5],
+            'Volume': [100, 200, 300, 400, 500]
+        })
+        lake.write('AAPL', df)
+        lake.write('MSFT', df)
+        inserter = PostgresInserter('test_db', 'test_user', 'test_password', 'localhost', '5432', lake=lake)
+        cursor = mock_connect.return_value.cursor.return_value
+
+        with patch.object(lake, 'iter_chunks', wraps=lake.iter_chunks) as read, \
+                patch.object(inserter, 'write_rows', wraps=inserter.write_rows) as write_rows:
+            inserter.process_and_insert_all()
+            self.assertEqual(read.call_count, 2)
+            self.assertEqual(write_rows.call_count, 2)
+            create_query = cursor.execute.call_args_list[0][0][0]
+            self.assertIn('"Date" DATE, "Close" REAL, "Volume" BIGINT', create_query)
+
+            inserter.process_and_insert_all()
+            self.assertEqual(read.call_count, 2)
+            self.assertEqual(write_rows.call_count, 2)
+
+            lake.append('MSFT', df.assign(Date=df['Date'] + pd.Timedelta(days=5)))
+            inserter.process_and_insert_all()
+            self.assertEqual(read.call_count, 3)
+            self.assertEqual(write_rows.call_args[0][0], 'MSFT')
+            self.assertEqual(len(write_rows.call_args[0][1]), 10)
+
+    @patch('psycopg2.connect')
+    def test_load_streams_lake_files_in_chunks(self, mock_connect):
+        """
+        Test that the lake files are loaded chunk by chunk with COPY, one transaction per batch, and
+        that the peak memory of the load does not grow with the length or the number of histories.
+        """
+        self.addCleanup(shutil.rmtree, "./test_data_chunks", ignore_errors=True)
+        cursor = mock_connect.return_value.cursor.return_value
+        copied_rows = []
+        # Plain functions rather than mocks, which would keep every query and buffer alive
+        cursor.execute = lambda query, params=None: None
+        cursor.copy_expert = lambda query, buffer: copied_rows.append(buffer.getvalue().count('\n'))
+
+        def load(rows, tickers):
+            shutil.rmtree("./test_data_chunks", ignore_errors=True)
+            lake = CSVLake("./test_data_chunks")
+            for ticker in tickers:
+                lake.write(ticker, pd.DataFrame({
+                    'Date': pd.date_range(start='1/1/1900', periods=rows),
+                    'Close': np.arange(rows, dtype='float64'),
+                    'Volume': np.arange(rows, dtype='int64')
+                }))
+            inserter = PostgresInserter('test_db', 'test_user', 'test_password', 'localhost', '5432', lake=lake,
+                                        copy_threshold=500, chunk_size=1000)
+            inserter.connect()
+            copied_rows.clear()
+            tracemalloc.start()
+            with patch.object(lake, 'read', wraps=lake.read) as read:
+                loaded = inserter.load_tables(tickers)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            inserter.close()
+            self.assertEqual(loaded, tickers)
+            self.assertEqual(read.call_count, 0)
+            return peak
+
+        load(4000, ['AAPL'])
+        short_peak = load(16000, ['AAPL'])
+        self.assertEqual(copied_rows, [1000] * 16)
+        self.assertLess(load(48000, ['AAPL']), 1.25 * short_peak)
+        self.assertLess(load(16000, ['AAPL', 'MSFT', 'GOOG']), 1.25 * short_peak)
+        self.assertEqual(copied_rows, [1000] * 48)
+
+    @patch('psycopg2.connect')
+    def test_insert_data_uses_copy_for_large_frames(self, mock_connect):
+        """
+        Test that large frames are streamed with COPY and small ones inserted with multi-row VALUES.
+        """
+        cursor = mock_connect.return_value.cursor.return_value
+        inserter = PostgresInserter('test_db', 'test_user', 'test_password', 'localhost', '5432', copy_threshold=100)
+        inserter.VALUES_PAGE_SIZE = 2
+        df = pd.DataFrame({
+            'Date': pd.date_range(start='1/1/2020', periods=150),
+            'Close': [1.5] * 149 + [None],
+            'Volume': range(150)
+        })
+        inserter.connect()
+        self.assertTrue(inserter.insert_data('AAPL', df))
+        copy_query, buffer = cursor.copy_expert.call_args[0]
+        self.assertEqual(copy_query, 'COPY stocks."AAPL" ("Date", "Close", "Volume") FROM STDIN WITH (FORMAT csv)')
+        lines = buffer.getvalue().splitlines()
+        self.assertEqual(len(lines), 150)
+        self.assertEqual(lines[-1], '2020-05-29,,149')
+
+        self.assertTrue(inserter.insert_data('AAPL', df.tail(3)))
+        self.assertEqual(cursor.copy_expert.call_count, 1)
+        insert_queries = [call[0] for call in cursor.execute.call_args_list]
+        self.assertEqual(len(insert_queries), 2)
+        self.assertEqual(insert_queries[0][0].count('(%s, %s, %s)'), 2)
+        self.assertEqual(insert_queries[1][1], [pd.Timestamp('2020-05-29'), None, 149])
+        inserter.close()
+
+    @patch('psycopg2.connect')
+    def test_insert_tables_commits_once_per_batch(self, mock_connect):
+        """
+        Test that the tables are loaded with one transaction per batch and that a failed batch is rolled back.
+        """
+        conn = mock_connect.return_value
+        cursor = conn.cursor.return_value
+        inserter = PostgresInserter('test_db', 'test_user', 'test_password', 'localhost', '5432', batch_size=2)
+        df = pd.DataFrame({'Date': pd.date_range(start='1/1/2020', periods=5), 'Close': [1.5] * 5})
+        tables = {name: df for name in ['AAPL', 'MSFT', 'GOOG', 'AMZN', 'META']}
+        cursor.execute.side_effect = lambda query, *args: self._fail_on(query, 'GOOG')
+        inserter.connect()
+        loaded = inserter.insert_tables(tables, replace=True)
+        inserter.close()
+        self.assertEqual(loaded, ['AAPL', 'MSFT', 'META'])
+        self.assertEqual(conn.commit.call_count, 2)
+        self.assertEqual(conn.rollback.call_count, 1)
+
+    @patch('psycopg2.connect')
+    def test_create_table_adds_date_key(self, mock_connect):
+        """
+        Test that new tables get a primary key on "Date" and that older tables are migrated to it.
+        """
+        cursor = mock_connect.return_value.cursor.return_value
+        cursor.fetchone.return_value = None
+        df = pd.DataFrame({'Date': pd.date_range(start='1/1/2020', periods=5), 'Close': [1.5] * 5})
+        self.inserter.connect()
+        self.inserter.create_table('AAPL', df)
+        self.inserter.close()
+        queries = [call[0][0] for call in cursor.execute.call_args_list]
+        self.assertIn('PRIMARY KEY ("Date")', queries[0])
+        self.assertIn('information_schema.columns', queries[1])
+        self.assertTrue(queries[3].startswith('DELETE FROM stocks."AAPL" AS old USING stocks."AAPL" AS new'))
+        self.assertIn('old."Date"::timestamp::date = new."Date"::timestamp::date', queries[3])
+        self.assertEqual(queries[4], 'ALTER TABLE stocks."AAPL" ADD PRIMARY KEY ("Date");')
+
+    @patch('psycopg2.connect')
+    def test_date_key_on_text_dates(self, mock_connect):
+        """
+        Test that a table keyed on text dates is deduplicated on the day before its dates are converted.
+        """
+        cursor = mock_connect.return_value.cursor.return_value
+        cursor.fetchall.return_value = [('Date', 'text'), ('Close', 'real')]
+        cursor.fetchone.return_value = (1,)
+        self.inserter.connect()
+        self.inserter.ensure_date_key('AAPL')
+        self.inserter.close()
+        queries = [call[0][0] for call in cursor.execute.call_args_list]
+        self.assertEqual(len(queries), 4)
+        self.assertTrue(queries[2].startswith('DELETE FROM stocks."AAPL"'))
+        self.assertEqual(queries[3], 'ALTER TABLE stocks."AAPL" ALTER COLUMN "Date" TYPE DATE USING "Date"::timestamp::date;')
+
+    @patch('psycopg2.connect')
+    def test_merge_tables_migrates_before_merging(self, mock_connect):
+        """
+        Test that merge_tables creates or migrates each table before merging its rows on the key.
+        """
+        df = pd.DataFrame({'Date': pd.date_range(start='1/1/2020', periods=2), 'Close': [1.5, 2.5]})
+        inserter = PostgresInserter(**self.db_config, save_path=self.save_path)
+        with patch.object(PostgresInserter, 'create_table') as create_table, \
+                patch.object(PostgresInserter, 'upsert_rows') as upsert_rows:
+            self.assertEqual(inserter.call_on_pool(PostgresInserter.merge_tables, {'AAPL': df, 'MSFT': df}),
+                             ['AAPL', 'MSFT'])
+        inserter.close()
+        self.assertEqual([call[0][0] for call in create_table.call_args_list], ['AAPL', 'MSFT'])
+        self.assertEqual(upsert_rows.call_count, 2)
+
+    @patch('psycopg2.connect')
+    def test_migrate_types_of_text_tables(self, mock_connect):
+        """
+        Test that the columns stored as TEXT by the first loads are converted to the declared types.
+        """
+        cursor = mock_connect.return_value.cursor.return_value
+        cursor.fetchall.return_value = [('Date', 'text'), ('Close', 'text'), ('Volume', 'double precision'),
+                                        ('date_modification', 'timestamp without time zone'), ('Source', 'text')]
+        self.inserter.connect()
+        self.inserter.migrate_types('AAPL')
+        self.inserter.close()
+        self.assertEqual(cursor.execute.call_args[0][0],
+                         'ALTER TABLE stocks."AAPL" ALTER COLUMN "Date" TYPE DATE USING "Date"::timestamp::date, '
+                         'ALTER COLUMN "Close" TYPE REAL USING "Close"::real, '
+                         'ALTER COLUMN "Volume" TYPE BIGINT USING round("Volume"::numeric)::bigint;')
+
+    @patch('psycopg2.connect')
+    def test_upsert_data_merges_on_date(self, mock_connect):
+        """
+        Test that upsert_data stages the rows and merges only the new or changed ones on the "Date" key.
+        """
+        cursor = mock_connect.return_value.cursor.return_value
+        df = pd.DataFrame({
+            'Date': pd.to_datetime(['2020-01-01', '2020-01-02', '2020-01-02']),
+            'Close': [1.5, 2.5, 2.6],
+            'date_modification': pd.Timestamp('2024-01-01 12:00:00')
+        })
+        self.inserter.connect()
+        self.assertTrue(self.inserter.upsert_data('AAPL', df))
+        self.inserter.close()
+        queries = [call[0] for call in cursor.execute.call_args_list]
+        self.assertEqual(queries[0][0], 'CREATE TEMP TABLE IF NOT EXISTS "staging_AAPL" '
+                                        '(LIKE stocks."AAPL" INCLUDING DEFAULTS) ON COMMIT DROP;')
+        self.assertTrue(queries[1][0].startswith('INSERT INTO "staging_AAPL"'))
+        # The duplicated date is staged once, with its last value
+        self.assertEqual(len(queries[1][1]), 6)
+        self.assertEqual(queries[1][1][4], 2.6)
+        merge_query = queries[2][0]
+        self.assertIn('ON CONFLICT ("Date") DO UPDATE SET "Close" = EXCLUDED."Close", '
+                      '"date_modification" = EXCLUDED."date_modification"', merge_query)
+        self.assertTrue(merge_query.endswith('WHERE (stored."Close") IS DISTINCT FROM (EXCLUDED."Close");'))
+        self.assertEqual(queries[3][0], 'DROP TABLE "staging_AAPL";')
+
+    @patch('psycopg2.connect')
+    def test_unified_layout_loads_into_partitioned_prices_table(self, mock_connect):
+        """
+        Test that the unified layout creates stocks.prices and merges each ticker on (ticker, "Date").
+        """
+        cursor = mock_connect.return_value.cursor.return_value
+        inserter = PostgresInserter('test_db', 'test_user', 'test_password', 'localhost', '5432', layout='unified')
+        df = pd.DataFrame({'Date': pd.to_datetime(['2019-12-31', '2020-01-02']), 'Close': [1.5, 2.5]})
+        inserter.connect()
+        inserter.create_table('AAPL', df)
+        self.assertTrue(inserter.upsert_data('AAPL', df))
+        inserter.close()
+        queries = [call[0] for call in cursor.execute.call_args_list]
+        self.assertEqual(queries[0][0], 'CREATE TABLE IF NOT EXISTS stocks.prices ("ticker" TEXT NOT NULL, '
+                                        '"Date" DATE, "Close" REAL, PRIMARY KEY ("ticker", "Date")) '
+                                        'PARTITION BY RANGE ("Date");')
+        self.assertEqual(queries[1][0], 'CREATE INDEX IF NOT EXISTS prices_date_idx ON stocks.prices ("Date");')
+        self.assertIn("stocks.prices_2019 PARTITION OF stocks.prices FOR VALUES FROM ('2019-01-01') TO ('2020-01-01')",
+                      queries[2][0])
+        self.assertIn('stocks.prices_2020 PARTITION OF', queries[3][0])
+        self.assertIn('(LIKE stocks.prices INCLUDING DEFAULTS)', queries[4][0])
+        self.assertEqual(queries[5][1][:3], ['AAPL', pd.Timestamp('2019-12-31'), 1.5])
+        self.assertIn('INSERT INTO stocks.prices AS stored ("ticker", "Date", "Close")', queries[6][0])
+        self.assertIn('ON CONFLICT ("ticker", "Date") DO UPDATE SET "Close" = EXCLUDED."Close"', queries[6][0])
+
+    @patch('psycopg2.connect')
+    def test_unified_layout_exports_today_in_one_query(self, mock_connect):
+        """
+        Test that the exporter reads today's rows of every ticker with a single query in the unified layout.
+        """
+        cursor = mock_connect.return_value.cursor.return_value
+        cursor.description = [('ticker',), ('Date',), ('Close',)]
+        cursor.fetchmany.side_effect = [
+            [('AAPL', pd.Timestamp('2020-01-02'), 2.5), ('MSFT', pd.Timestamp('2020-01-02'), 3.5)],
+            []
+        ]
+        exporter = DataExporter('test_db', 'test_user', 'test_password', 'localhost', '5432',
+                                save_path="./test_export_unified", layout='unified')
+        self.addCleanup(shutil.rmtree, "./test_export_unified", ignore_errors=True)
+        with patch.object(DataExporter, 'export_to_excel') as export_to_excel:
+            exporter.export_all_tables(['AAPL', 'MSFT', 'GOOG'])
+        exporter.close()
+        self.assertEqual(cursor.execute.call_count, 1)
+        self.assertIn('"ticker" = ANY(%s)', cursor.execute.call_args[0][0])
+        self.assertEqual(cursor.execute.call_args[0][1][1:], [date.today(), date.today() + timedelta(days=1)])
+        table_data = export_to_excel.call_args[0][0]
+        self.assertEqual(list(table_data['MSFT'].columns), ['Date', 'Close'])
+        self.assertEqual(table_data['MSFT']['Close'].tolist(), [3.5])
+        self.assertTrue(table_data['GOOG'].empty)
+
+    @patch('psycopg2.connect')
+    def test_export_range_to_csv_streams_batches(self, mock_connect):
+        """
+        Test that a range of days is exported to CSV batch by batch, with a single query over the existing tables.
+        """
+        cursor = mock_connect.return_value.cursor.return_value
+        cursor.fetchall.return_value = [('AAPL',), ('MSFT',)]
+        cursor.description = [('ticker',), ('Date',), ('Close',)]
+        cursor.fetchmany.side_effect = [
+            [('AAPL', date(2020, 1, 2), 2.5), ('AAPL', date(2020, 1, 3), 2.75)],
+            [('MSFT', date(2020, 1, 2), 3.5)],
+            []
+        ]
+        exporter = DataExporter('test_db', 'test_user', 'test_password', 'localhost', '5432',
+                                save_path="./test_export_range", fetch_size=2)
+        self.addCleanup(shutil.rmtree, "./test_export_range", ignore_errors=True)
+        rows = exporter.export_range_to_csv(['AAPL', 'MSFT', 'GOOG'], 'range.csv', start='2020-01-02', end='2020-01-03')
+        exporter.close()
+
+        self.assertEqual(rows, 3)
+        exported = pd.read_csv(os.path.join("./test_export_range", 'range.csv'))
+        self.assertEqual(list(exported.columns), ['ticker', 'Date', 'Close'])
+        self.assertEqual(exported['ticker'].tolist(), ['AAPL', 'AAPL', 'MSFT'])
+        query, params = cursor.execute.call_args[0]
+        self.assertEqual(query.count('UNION ALL'), 1)
+        self.assertTrue(query.endswith('ORDER BY "ticker", "Date";'))
+        # The end day is included: the upper bound is exclusive
+        self.assertEqual(params, ['AAPL', date(2020, 1, 2), date(2020, 1, 4), 'MSFT', date(2020, 1, 2), date(2020, 1, 4)])
+        cursor.fetchmany.assert_called_with(2)
+
+    def test_date_bounds(self):
+        """
+        Test that the exported range defaults to today and includes its last day.
+        """
+        self.assertEqual(DataExporter.date_bounds(), (date.today(), date.today() + timedelta(days=1)))
+        self.assertEqual(DataExporter.date_bounds('2020-01-02'), (date(2020, 1, 2), date(2020, 1, 3)))
+        self.assertEqual(DataExporter.date_bounds(date(2020, 1, 2), pd.Timestamp('2020-02-01 15:30')),
+                         (date(2020, 1, 2), date(2020, 2, 2)))
+
+    def test_unknown_layout(self):
+        """
+        Test that an unknown table layout is rejected.
+        """
+        with self.assertRaises(ValueError):
+            PostgresInserter('test_db', 'test_user', 'test_password', 'localhost', '5432', layout='sharded')
+
+    @staticmethod
+    def _fail_on(query: str, table_name: str):
+        if f'"{table_name}"' in query:
+            raise psycopg2.Error(f"relation {table_name} is locked")
+
+    @patch('psycopg2.connect')
+    def test_reconcile_reloads_only_divergent_months(self, mock_connect):
+        """
+        Test that the checksums of the warehouse are computed in one query, and that only the months
+        differing from the lake are deleted and reloaded, in one transaction, without the quarantined rows.
+        """
+        lake = CSVLake("./test_data_reconcile")
+        self.addCleanup(shutil.rmtree, "./test_data_reconcile", ignore_errors=True)
+        df = pd.DataFrame({
+            'Date': pd.bdate_range('2020-01-01', periods=60),
+            'Close': [float(i) + 0.5 for i in range(60)],
+            'Volume': [100 * (i + 1) for i in range(60)]
+        })
+        lake.write('AAPL', df)
+        # Rows rejected by the validation, written to the lake before being quarantined
+        quarantine = QuarantineStore("./test_quarantine_reconcile/unvalid_data.csv")
+        self.addCleanup(shutil.rmtree, "./test_quarantine_reconcile", ignore_errors=True)
+        quarantine.append(lake.read('AAPL').iloc[[3, 30]].assign(type_error='Invalid price'), 'AAPL')
+        sums = month_checksums(lake.read('AAPL').drop(index=[3, 30]))
+        stored = [('AAPL', month.date(), rows, checksum) for month, rows, checksum in sums.itertuples(index=False)]
+        stored[1] = stored[1][:3] + (stored[1][3] + 1,)
+        stored.append(('AAPL', date(2019, 12, 1), 3, 42))
+
+        cursor = mock_connect.return_value.cursor.return_value
+        cursor.fetchall.side_effect = [[('AAPL',)], stored]
+        inserter = PostgresInserter('test_db', 'test_user', 'test_password', 'localhost', '5432', lake=lake)
+        with patch.object(inserter, 'create_table'), \
+                patch.object(inserter, 'write_rows', wraps=inserter.write_rows) as write_rows:
+            divergent = inserter.reconcile(resync=True, quarantine=quarantine)
+        inserter.close()
+
+        self.assertEqual(list(divergent['month']), [pd.Timestamp('2019-12-01'), pd.Timestamp('2020-02-01')])
+        self.assertTrue(divergent['resynced'].all())
+        queries = [call[0] for call in cursor.execute.call_args_list]
+        self.assertIn('GROUP BY 2', queries[1][0])
+        self.assertEqual(queries[2][1], [[date(2019, 12, 1), date(2020, 2, 1)]])
+        self.assertTrue(queries[2][0].startswith('DELETE FROM stocks."AAPL" AS stored USING unnest(%s::date[])'))
+        reloaded = write_rows.call_args[0][1]
+        self.assertEqual(len(reloaded), 19)
+        self.assertTrue((reloaded['Date'].dt.month == 2).all())
+        self.assertNotIn(df['Date'][30], list(reloaded['Date']))
+        self.assertEqual(mock_connect.return_value.commit.call_count, 1)
+        self.assertTrue(lake.manifest.is_loaded('AAPL', inserter.load_target()))
+
     @patch('psycopg2.connect')
     def test_delete_data(self, mock_connect):
         """
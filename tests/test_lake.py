@@ -0,0 +1,190 @@
+import unittest
+import unittest.mock
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from financial_package.lake import CSVLake, ColumnarLake, get_lake, copy_lake
+
+class TestLake(unittest.TestCase):
+    """
+    Test case for the lake storage backends.
+    """
+
+    def setUp(self):
+        """
+        Setup a small history and an empty lake directory for each test.
+        """
+        self.save_path = "./test_lake"
+        self.data = pd.DataFrame({
+            'Date': pd.date_range(start='1/1/2020', periods=5),
+            'Open': [1.0, 2.0, 3.0, 4.0, 5.0],
+            'High': [2.0, 3.0, 4.0, 5.0, 6.0],
+            'Low': [0.5, 1.5, 2.5, 3.5, 4.5],
+            'Close': [1.5, 2.5, 3.5, 4.5, 5.5],
+            'Volume': np.array([100, 200, 300, 400, 500], dtype='int64'),
+            'Dividends': [0.0] * 5,
+            'Stock_Splits': [0.0] * 5,
+            'date_modification': pd.Timestamp('2024-01-01 12:00:00')
+        })
+
+    def tearDown(self):
+        """
+        Clean up the lake directory.
+        """
+        shutil.rmtree(self.save_path, ignore_errors=True)
+
+    def test_columnar_round_trip_keeps_dtypes(self):
+        """
+        Test that the columnar lake returns the stored dtypes and memory-maps the columns.
+        """
+        lake = ColumnarLake(self.save_path)
+        lake.write('AI.PA', self.data)
+        arrays = lake.read_arrays('AI.PA', columns=['Close'])
+        self.assertIsInstance(arrays['Close'], np.memmap)
+        stored = lake.read('AI.PA')
+        self.assertEqual(list(stored.columns), list(self.data.columns))
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(stored['Date']))
+        self.assertEqual(stored['Volume'].dtype, np.int64)
+        pd.testing.assert_frame_equal(stored, self.data, check_dtype=False)
+
+    def test_compressed_columnar_lake(self):
+        """
+        Test that the compressed columnar lake round-trips the data.
+        """
+        lake = ColumnarLake(self.save_path, compression=True)
+        lake.write('AI.PA', self.data)
+        lake.write('AI.PA', self.data.head(3))
+        self.assertEqual(lake.read_metadata('AI.PA')['rows'], 3)
+        pd.testing.assert_frame_equal(lake.read('AI.PA'), self.data.head(3), check_dtype=False)
+
+    def test_copy_csv_lake_to_columnar(self):
+        """
+        Test that a CSV lake can be migrated to the columnar format.
+        """
+        csv_lake = get_lake('csv', self.save_path)
+        csv_lake.write('AI.PA', self.data)
+        csv_lake.write('BNP.PA', self.data)
+        columnar_lake = get_lake('columnar', self.save_path)
+        copy_lake(csv_lake, columnar_lake)
+        self.assertEqual(columnar_lake.tickers(), ['AI.PA', 'BNP.PA'])
+        self.assertEqual(csv_lake.tickers(), ['AI.PA', 'BNP.PA'])
+        self.assertTrue((columnar_lake.read('BNP.PA')['Date'] == self.data['Date']).all())
+
+    def test_append_writes_only_new_and_revised_rows(self):
+        """
+        Test that append de-duplicates on Date, keeps revisions and compacts the segments.
+        """
+        for lake in (CSVLake(self.save_path, compact_after=3), ColumnarLake(self.save_path, compact_after=3)):
+            lake.write('AI.PA', self.data.head(3))
+            self.assertEqual(lake.append('AI.PA', self.data.head(3)), 0)
+            revised = self.data.iloc[2:4].copy()
+            revised.loc[2, 'Close'] = 9.0
+            self.assertEqual(lake.append('AI.PA', revised), 2)
+            self.assertEqual(lake.last_date('AI.PA'), pd.Timestamp('2020-01-04'))
+            self.assertEqual(lake.read('AI.PA')['Close'].tolist(), [1.5, 2.5, 9.0, 4.5])
+            self.assertEqual(len(lake.read_since('AI.PA', '2020-01-03')), 2)
+
+            lake.append('AI.PA', self.data.iloc[4:5])
+            self.assertEqual(len(lake.segment_files('AI.PA')), 2)
+            lake.append('AI.PA', self.data.iloc[4:5].assign(Volume=600))
+            # The third segment triggers the compaction into the main file
+            self.assertEqual(lake.segment_files('AI.PA'), [])
+            stored = lake.read('AI.PA')
+            self.assertEqual(stored['Close'].tolist(), [1.5, 2.5, 9.0, 4.5, 5.5])
+            self.assertEqual(stored['Volume'].tolist(), [100, 200, 300, 400, 600])
+            shutil.rmtree(self.save_path)
+
+    def test_interrupted_write_keeps_a_consistent_history(self):
+        """
+        Test that segments retired by a rewrite are ignored even if their files were not deleted yet.
+        """
+        lake = CSVLake(self.save_path)
+        lake.write('AI.PA', self.data.head(3))
+        lake.append('AI.PA', self.data.iloc[3:5])
+        segment = lake.segment_files('AI.PA')[0]
+        lake._retire_segments('AI.PA')
+        # Simulate a stop between the retirement of the segments and the rewrite
+        self.assertTrue(os.path.exists(segment))
+        self.assertEqual(len(lake.read('AI.PA')), 3)
+        self.assertEqual(lake.last_date('AI.PA'), pd.Timestamp('2020-01-03'))
+
+    def test_columnar_write_stopped_between_renames(self):
+        """
+        Test that the previous version of a columnar history is restored if a write stopped after setting it aside.
+        """
+        lake = ColumnarLake(self.save_path)
+        lake.write('AI.PA', self.data)
+        # Simulate a stop after the live directory was moved aside, before the new one took its place
+        os.replace(lake.path('AI.PA'), f"{lake.path('AI.PA')}.old")
+        recovered = ColumnarLake(self.save_path)
+        self.assertEqual(recovered.tickers(), ['AI.PA'])
+        self.assertEqual(len(recovered.read('AI.PA')), 5)
+
+        # A failed rename puts the previous version back as well
+        real_replace = os.replace
+        def failing_replace(src, dst):
+            if src.endswith('.tmp'):
+                raise OSError("disk full")
+            real_replace(src, dst)
+        with unittest.mock.patch('os.replace', failing_replace), self.assertRaises(OSError):
+            recovered.write('AI.PA', self.data.head(2))
+        self.assertEqual(len(recovered.read('AI.PA')), 5)
+
+    def test_manifest_tracks_writes(self):
+        """
+        Test that the manifest records each history and detects files changed outside of the lake.
+        """
+        lake = CSVLake(self.save_path)
+        lake.write('AI.PA', self.data.head(3))
+        entry = lake.describe('AI.PA')
+        self.assertEqual((entry['rows'], entry['min_date'], entry['max_date']), (3, '2020-01-01', '2020-01-03'))
+        self.assertEqual(entry['columns']['Volume'], 'int64')
+        self.assertEqual(entry['bytes'], lake.size('AI.PA'))
+
+        lake.append('AI.PA', self.data.iloc[2:5])
+        appended = lake.describe('AI.PA')
+        self.assertEqual((appended['rows'], appended['max_date']), (5, '2020-01-05'))
+        self.assertNotEqual(appended['hash'], entry['hash'])
+
+        lake.compact('AI.PA')
+        self.assertEqual(lake.describe('AI.PA')['hash'], appended['hash'])
+
+        # Rewriting the same content keeps the hash, whatever the modification date
+        lake.write('AI.PA', self.data.assign(date_modification=pd.Timestamp('2024-02-01')))
+        rewritten_hash = lake.describe('AI.PA')['hash']
+        lake.write('AI.PA', self.data)
+        self.assertEqual(lake.describe('AI.PA')['hash'], rewritten_hash)
+
+        self.data.head(2).to_csv(lake.path('AI.PA'), index=False)
+        self.assertIsNone(lake.describe('AI.PA'))
+        self.assertEqual(lake.refresh_manifest('AI.PA')['rows'], 2)
+
+    def test_iter_chunks_streams_typed_rows(self):
+        """
+        Test that the chunks of a history, appended segments included, hold at most `chunk_size`
+        rows of the main file, have the dtypes of the schema and add up to the merged history.
+        """
+        history = pd.concat([self.data.assign(Date=self.data['Date'] + pd.Timedelta(days=5 * i)) for i in range(4)],
+                            ignore_index=True)
+        for lake_format in ('csv', 'columnar'):
+            lake = get_lake(lake_format, os.path.join(self.save_path, lake_format))
+            lake.write('AI.PA', history.iloc[:18])
+            lake.append('AI.PA', history.iloc[16:].assign(Close=history['Close'].iloc[16:] + 10))
+            chunks = list(lake.iter_chunks('AI.PA', chunk_size=6))
+            self.assertEqual([len(chunk) for chunk in chunks], [6, 6, 8])
+            self.assertEqual(chunks[0]['Close'].dtype, np.float32)
+            self.assertEqual(chunks[0]['Volume'].dtype, np.int64)
+            pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), lake.read('AI.PA'))
+            self.assertEqual(list(next(lake.iter_chunks('AI.PA', 6, ['Close'])).columns), ['Close'])
+            self.assertEqual(list(lake.iter_chunks('BNP.PA')), [])
+
+    def test_unknown_format(self):
+        """
+        Test that an unknown lake format is rejected.
+        """
+        with self.assertRaises(ValueError):
+            get_lake('xlsx', self.save_path)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+import threading
+import time
+from financial_package.pipeline import Pipeline, Stage
+
+class TestPipeline(unittest.TestCase):
+    """
+    Test case for the staged pipeline of the daily update.
+    """
+
+    def test_stages_overlap(self):
+        """
+        Test that the stages run at the same time, so the run takes less than the sum of the stages.
+        """
+        def slow(key, value):
+            time.sleep(0.05)
+            return value + 1
+
+        pipeline = Pipeline([Stage("fetch", slow), Stage("validate", slow), Stage("load", slow)])
+        start = time.perf_counter()
+        results = pipeline.run((key, 0) for key in range(6))
+        elapsed = time.perf_counter() - start
+        self.assertEqual(results, {key: 3 for key in range(6)})
+        # 0.9s one stage after the other, about 0.4s pipelined
+        self.assertLess(elapsed, 0.75)
+        self.assertEqual(pipeline.timings["validate"]["items"], 6)
+        self.assertGreaterEqual(pipeline.timings["load"]["seconds"], 0.25)
+
+    def test_failures_are_isolated(self):
+        """
+        Test that an item failing or dropped in a stage does not stop the others.
+        """
+        def fetch(key, value):
+            if key == 'AIR.PA':
+                raise TimeoutError("Read timed out")
+            return value
+
+        def validate(key, value):
+            return None if key == 'BNP.PA' else value
+
+        pipeline = Pipeline([Stage("fetch", fetch, workers=2), Stage("validate", validate)])
+        results = pipeline.run((key, key.lower()) for key in ['AI.PA', 'AIR.PA', 'BNP.PA', 'CA.PA'])
+        self.assertEqual(results, {'AI.PA': 'ai.pa', 'CA.PA': 'ca.pa'})
+        self.assertEqual(pipeline.failures, {'AIR.PA': 'fetch', 'BNP.PA': 'validate'})
+        self.assertEqual(pipeline.timings["fetch"]["failed"], 1)
+
+    def test_batched_stage_and_bounded_queues(self):
+        """
+        Test that a batched stage gets at most batch_size items at once, and that a fast stage
+        waits for a slow one instead of running ahead of it by more than the queue size.
+        """
+        lock = threading.Lock()
+        state = {'fetched': 0, 'loaded': 0, 'max_ahead': 0, 'batches': []}
+
+        def fetch(key, value):
+            with lock:
+                state['fetched'] += 1
+                state['max_ahead'] = max(state['max_ahead'], state['fetched'] - state['loaded'])
+            return value
+
+        def load(batch):
+            time.sleep(0.01)
+            with lock:
+                state['batches'].append(len(batch))
+                state['loaded'] += len(batch)
+            return {key: True for key, _ in batch}
+
+        pipeline = Pipeline([Stage("fetch", fetch, workers=4), Stage("load", load, batch_size=3)], queue_size=2)
+        results = pipeline.run((key, key) for key in range(20))
+        self.assertEqual(len(results), 20)
+        self.assertLessEqual(max(state['batches']), 3)
+        # Queued items, the batch being loaded and one item held by each fetch worker
+        self.assertLessEqual(state['max_ahead'], 2 + 3 + 4)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import unittest
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from unittest.mock import MagicMock
+from financial_package.price_store import PriceStore, invalidate_price_stores
+from financial_package.lake import get_lake
+from financial_package.schema import apply_schema
+
+def make_prices(dates, close):
+    """
+    Builds a price history with the given dates and closes.
+    """
+    close = np.asarray(close, dtype='float64')
+    return apply_schema(pd.DataFrame({
+        'Date': pd.to_datetime(dates), 'Open': close, 'High': close, 'Low': close, 'Close': close,
+        'Volume': np.arange(len(close)) + 100, 'Dividends': 0.0, 'Stock_Splits': 0.0,
+    }))
+
+class TestPriceStore(unittest.TestCase):
+    """
+    Test case for the cached read API of the price histories.
+    """
+
+    def setUp(self):
+        """
+        Setup a lake with two tickers trading on different days.
+        """
+        self.save_path = "./test_price_store"
+        self.addCleanup(shutil.rmtree, self.save_path, ignore_errors=True)
+        self.lake = get_lake('csv', self.save_path)
+        self.lake.write('AI.PA', make_prices(['2024-01-02', '2024-01-03', '2024-01-04', '2024-01-05'], [1, 2, 3, 4]))
+        self.lake.write('BNP.PA', make_prices(['2024-01-03', '2024-01-05'], [10, 20]))
+
+    def test_get_aligns_the_tickers(self):
+        """
+        Test that the values are aligned on the union of the dates of the range, NaN where a ticker has no row.
+        """
+        store = PriceStore(self.lake)
+        result = store.get(['AI.PA', 'BNP.PA', 'CA.PA'], '2024-01-03', '2024-01-05', ['Close'])
+        self.assertEqual(list(result['dates']), list(pd.to_datetime(['2024-01-03', '2024-01-04', '2024-01-05'])))
+        np.testing.assert_array_equal(result['Close'], [[2, 10, np.nan], [3, np.nan, np.nan], [4, 20, np.nan]])
+
+        frame = store.get('BNP.PA', columns=['Close', 'Volume'], as_frame=True)
+        self.assertEqual(frame[('Close', 'BNP.PA')].tolist(), [10.0, 20.0])
+        self.assertEqual(frame[('Volume', 'BNP.PA')].tolist(), [100.0, 101.0])
+
+    def test_cache_hits_and_invalidation(self):
+        """
+        Test that repeated queries are served from the cache, and that a write to the lake, or the
+        invalidation by the daily update, makes the next query read the history again.
+        """
+        store = PriceStore(self.lake)
+        store.get(['AI.PA', 'BNP.PA'])
+        store.get(['AI.PA'], '2024-01-04')
+        self.assertEqual((store.stats['misses'], store.stats['hits']), (2, 1))
+
+        self.lake.append('AI.PA', make_prices(['2024-01-08'], [5]))
+        self.assertEqual(store.get('AI.PA', columns=['Close'])['Close'][-1, 0], 5)
+        self.assertEqual(store.stats['misses'], 3)
+
+        invalidate_price_stores(['BNP.PA'])
+        store.get('BNP.PA')
+        self.assertEqual(store.stats['misses'], 4)
+
+    def test_memory_based_eviction(self):
+        """
+        Test that the least recently used histories are evicted once the cache exceeds its size.
+        """
+        store = PriceStore(self.lake)
+        store.get('AI.PA')
+        history_bytes = store.stats['bytes']
+        store.max_bytes = history_bytes + 10
+        store.get('BNP.PA')
+        self.assertEqual((store.stats['evictions'], list(store._cache)), (1, ['BNP.PA']))
+        store.get('AI.PA')
+        self.assertEqual((store.stats['evictions'], list(store._cache)), (2, ['AI.PA']))
+        self.assertLessEqual(store.stats['bytes'], store.max_bytes)
+
+    def test_warehouse_backend_loads_missing_tickers_at_once(self):
+        """
+        Test that the histories missing from the cache are read from the warehouse in one query.
+        """
+        exporter = MagicMock()
+        exporter.stream_range.return_value = iter([
+            make_prices(['2024-01-02', '2024-01-03'], [1, 2]).assign(ticker='AI.PA'),
+            make_prices(['2024-01-03'], [10]).assign(ticker='BNP.PA'),
+        ])
+        store = PriceStore(exporter=exporter)
+        result = store.get(['AI.PA', 'BNP.PA'], columns=['Close'])
+        np.testing.assert_array_equal(result['Close'], [[1, np.nan], [2, 10]])
+        store.get(['AI.PA', 'BNP.PA'], '2024-01-03')
+        exporter.stream_range.assert_called_once()
+        with self.assertRaises(ValueError):
+            PriceStore()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import unittest
+import shutil
+import time
+from financial_package.get_historical_data import CAC40HistoricalData
+from financial_package.rate_limit import AdaptiveRateLimiter, RetryPolicy, is_transient_error
+from tests.fakes import FlakyYahooSource, FakeHTTPError
+
+class TestRateLimit(unittest.TestCase):
+    """
+    Test case for the adaptive rate limiter and the retry scheduler of the fetch layer.
+    """
+
+    def setUp(self):
+        """
+        Setup the save path used by the fetch tests.
+        """
+        self.save_path = "./test_rate_limit"
+
+    def tearDown(self):
+        """
+        Clean up the save path.
+        """
+        shutil.rmtree(self.save_path, ignore_errors=True)
+
+    def test_transient_errors_are_requeued(self):
+        """
+        Test that tickers failing with 429s or timeouts are retried at the end of the run,
+        while permanent errors are dropped.
+        """
+        source = FlakyYahooSource({'AI.PA': [429, 'timeout'], 'AIR.PA': ['No data found']})
+        limiter = AdaptiveRateLimiter(rate=1000, capacity=10)
+        cac40_data = CAC40HistoricalData(
+            ['AI.PA', 'AIR.PA', 'BNP.PA'], self.save_path, data_source=source, max_workers=3,
+            rate_limiter=limiter, retry_policy=RetryPolicy(max_attempts=3, base_delay=0.01)
+        )
+        results = cac40_data.fetch_all()
+        self.assertEqual(list(results.keys()), ['AI.PA', 'BNP.PA'])
+        self.assertEqual([call[0] for call in source.calls].count('AI.PA'), 3)
+        self.assertEqual([call[0] for call in source.calls].count('AIR.PA'), 1)
+        self.assertEqual(limiter.throttled, 1)
+
+    def test_gives_up_after_max_attempts(self):
+        """
+        Test that a ticker is dropped once the retry policy is exhausted.
+        """
+        source = FlakyYahooSource({'AI.PA': ['timeout'] * 5})
+        cac40_data = CAC40HistoricalData(
+            ['AI.PA'], self.save_path, data_source=source, retry_policy=RetryPolicy(max_attempts=2, base_delay=0.01)
+        )
+        self.assertEqual(cac40_data.fetch_all(), {})
+        self.assertEqual(len(source.calls), 2)
+
+    def test_batch_download_is_retried(self):
+        """
+        Test that a batch download failing with a 429 or a timeout is retried, and a permanent error is not.
+        """
+        source = FlakyYahooSource({}, download_failures=[429, 'timeout'])
+        limiter = AdaptiveRateLimiter(rate=1000, capacity=10)
+        cac40_data = CAC40HistoricalData(
+            ['AI.PA', 'AIR.PA'], self.save_path, data_source=source,
+            rate_limiter=limiter, retry_policy=RetryPolicy(max_attempts=3, base_delay=0.01)
+        )
+        self.assertEqual(list(cac40_data.fetch_batch(batch_size=2)), ['AI.PA', 'AIR.PA'])
+        self.assertEqual(len(source.download_calls), 3)
+        self.assertEqual(limiter.throttled, 1)
+
+        source = FlakyYahooSource({}, download_failures=['Invalid ticker list'])
+        cac40_data.data_source = source
+        self.assertEqual(cac40_data.fetch_batch(batch_size=2), {})
+        self.assertEqual(len(source.download_calls), 1)
+
+    def test_limiter_adapts_rate(self):
+        """
+        Test that the rate is cut on throttling and raised back on success, within its bounds.
+        """
+        limiter = AdaptiveRateLimiter(rate=4.0, min_rate=1.0, increase_step=0.5)
+        limiter.record_throttle()
+        self.assertEqual(limiter.rate, 2.0)
+        limiter.record_throttle()
+        limiter.record_throttle()
+        self.assertEqual(limiter.rate, 1.0)
+        for _ in range(10):
+            limiter.record_success()
+        self.assertEqual(limiter.rate, 4.0)
+
+    def test_limiter_bounds_request_rate(self):
+        """
+        Test that requests beyond the burst capacity are spaced according to the rate.
+        """
+        limiter = AdaptiveRateLimiter(rate=50.0, capacity=1.0)
+        start = time.monotonic()
+        for _ in range(6):
+            limiter.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+    def test_is_transient_error(self):
+        """
+        Test the classification of fetch errors.
+        """
+        self.assertTrue(is_transient_error(FakeHTTPError(429, "Too Many Requests")))
+        self.assertTrue(is_transient_error(FakeHTTPError(503, "Service Unavailable")))
+        self.assertTrue(is_transient_error(TimeoutError("Read timed out")))
+        self.assertFalse(is_transient_error(ValueError("No data found, symbol may be delisted")))
+
+if __name__ == "__main__":
+    unittest.main()
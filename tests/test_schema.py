@@ -0,0 +1,76 @@
+import unittest
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from financial_package.schema import apply_schema, sql_type, PRICE_SCHEMA
+from financial_package.lake import CSVLake
+from financial_package.postgres_utils import PostgresInserter
+
+class TestSchema(unittest.TestCase):
+    """
+    Test case for the declared OHLCV schema.
+    """
+
+    def setUp(self):
+        """
+        Setup a history with the dtypes returned by the data source.
+        """
+        self.save_path = "./test_schema"
+        self.data = pd.DataFrame({
+            'Date': pd.date_range(start='1/1/2020', periods=3, tz='Europe/Paris'),
+            'Open': [1.0, 2.0, 3.0],
+            'High': [2.0, 3.0, 4.0],
+            'Low': [0.5, 1.5, 2.5],
+            'Close': [1.5, 2.5, 3.5],
+            'Volume': [3_000_000_000, 200, 300],
+            'Dividends': [0.0] * 3,
+            'Stock_Splits': [0.0] * 3,
+            'date_modification': ['2024-01-01 12:00:00'] * 3
+        })
+
+    def tearDown(self):
+        """
+        Clean up the lake directory.
+        """
+        shutil.rmtree(self.save_path, ignore_errors=True)
+
+    def test_apply_schema(self):
+        """
+        Test that the history is cast to the declared dtypes.
+        """
+        typed = apply_schema(self.data)
+        self.assertEqual({col: str(dtype) for col, dtype in typed.dtypes.items()},
+                         {col: dtype for col, (dtype, _) in PRICE_SCHEMA.items()})
+        self.assertEqual(typed['Date'].iloc[0], pd.Timestamp('2020-01-01'))
+        self.assertEqual(typed['Volume'].iloc[0], 3_000_000_000)
+
+    def test_lake_reads_declared_dtypes(self):
+        """
+        Test that the CSV lake parses the dates and reads the declared dtypes, older files included.
+        """
+        os.makedirs(self.save_path)
+        legacy = self.data.assign(Date=['2020-01-01', '2020-01-02', '2020-01-03'], Volume=[100, None, 300])
+        legacy.to_csv(os.path.join(self.save_path, 'AI.PA_Historical_Data.csv'), index=True, index_label='index')
+        stored = CSVLake(self.save_path).read('AI.PA')
+        self.assertNotIn('index', stored.columns)
+        self.assertEqual(stored['Close'].dtype, np.float32)
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(stored['Date']))
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(stored['date_modification']))
+        # A missing volume keeps the column readable
+        self.assertTrue(np.isnan(stored['Volume'].iloc[1]))
+
+    def test_ddl_types(self):
+        """
+        Test that the generated DDL uses the declared types, and derived types for the other columns.
+        """
+        columns = PostgresInserter.column_definitions(apply_schema(self.data).assign(Source='yahoo', Rank=1))
+        self.assertEqual(columns, [
+            '"Date" DATE', '"Open" REAL', '"High" REAL', '"Low" REAL', '"Close" REAL', '"Volume" BIGINT',
+            '"Dividends" REAL', '"Stock_Splits" REAL', '"date_modification" TIMESTAMP',
+            '"Source" TEXT', '"Rank" BIGINT'
+        ])
+        self.assertEqual(sql_type('Spread', np.dtype('float64')), 'FLOAT')
+
+if __name__ == "__main__":
+    unittest.main()